@@ -0,0 +1,10 @@
+import { BaseUserDORequest } from "./base_user_do_request";
+
+export interface ScheduleMessageDeletionRequest extends BaseUserDORequest {
+	messageID : number
+	deleteAtMS : number
+};
+
+export interface ScheduleMessageDeletionResponse {
+
+}
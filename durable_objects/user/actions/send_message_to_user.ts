@@ -4,6 +4,8 @@ export interface SendMessageToUserRequest {
     fromTelegramUserID : number
     toTelegramUserID : number
     fromTelegramUserName : string
+    // the same messageKey is only ever delivered once, so a send can be retried safely
+    messageKey : string
 }
 
 export function isSendMessageToUserRequest(x : any) : x is SendMessageToUserRequest {
@@ -0,0 +1,146 @@
+import { ChangeTrackedValue } from "../../../util";
+
+/*
+    This class tracks the user's inbox: messages sent to the user through the bot (sendMessageToUser) that haven't been delivered yet.
+    Each message is stored under its own key, in the order it arrived:
+        inbox:<seq> -> InboxMessage
+    and is only removed once Telegram has accepted it, so delivery is at-least-once and survives the UserDO being evicted.
+    Every message has a messageKey from its sender.  A message whose key is already queued (or was recently delivered) is ignored,
+    so a sender can safely retry.
+    Messages are delivered strictly in order, no faster than one per minSendIntervalMS (Telegram allows about one message
+    per second per chat), and a failed send is retried with backoff (or after Telegram's retry_after, for a 429).
+    This has dirty tracking, and flushes any changes to storage on demand by flushToStorage
+*/
+export interface InboxMessage {
+    messageKey : string
+    seq : number
+    from : string
+    fromTelegramUserID : number
+    message : string
+    enqueuedAtMS : number
+    attempts : number
+    nextAttemptAtMS : number
+}
+
+export type InboxSendOutcome = 'retrying'|'dropped';
+
+const INBOX_KEY_PREFIX = "inbox";
+const MAX_REMEMBERED_DELIVERED_KEYS = 100;
+export const DEFAULT_INBOX_MIN_SEND_INTERVAL_MS = 1000;
+const MAX_INBOX_SEND_ATTEMPTS = 8;
+const BASE_RETRY_DELAY_MS = 2000;
+const MAX_RETRY_DELAY_MS = 10 * 60 * 1000;
+
+export class InboxTracker {
+    messages : Map<string,InboxMessage> = new Map<string,InboxMessage>();
+    // the most recently delivered messageKeys (-> when), so a retried send of an already delivered message is still ignored
+    deliveredKeys : ChangeTrackedValue<Record<string,number>> = new ChangeTrackedValue<Record<string,number>>("inboxDeliveredKeys", {});
+    dirtyTracking : Set<string> = new Set<string>();
+    deletedKeys : Set<string> = new Set<string>();
+    minSendIntervalMS : number;
+    // not persisted: after an eviction, at worst one message goes out a little early
+    lastSentAtMS : number = 0;
+    nextSeq : number = 1;
+    constructor(minSendIntervalMS : number = DEFAULT_INBOX_MIN_SEND_INTERVAL_MS) {
+        this.minSendIntervalMS = minSendIntervalMS;
+    }
+    initialize(entries : Map<string,any>) {
+        for (const [key,value] of entries) {
+            if (key.startsWith(`${INBOX_KEY_PREFIX}:`)) {
+                const message = value as InboxMessage;
+                this.messages.set(key, message);
+                this.nextSeq = Math.max(this.nextSeq, message.seq + 1);
+            }
+        }
+        this.deliveredKeys.initialize(entries);
+    }
+    async flushToStorage(storage : DurableObjectStorage) {
+
+        if (this.deletedKeys.size == 0 && this.dirtyTracking.size == 0) {
+            await this.deliveredKeys.flushToStorage(storage);
+            return;
+        }
+
+        const putEntries : Record<string,InboxMessage> = {};
+        for (const key of this.dirtyTracking) {
+            putEntries[key] = this.messages.get(key)!!;
+        }
+
+        const putPromise = storage.put(putEntries).then(() => {
+            this.dirtyTracking.clear();
+        });
+        const deletePromise = storage.delete([...this.deletedKeys]).then(() => {
+            this.deletedKeys.clear();
+        });
+        await Promise.all([putPromise, deletePromise, this.deliveredKeys.flushToStorage(storage)]);
+    }
+    // returns false (and queues nothing) if a message with this messageKey is already queued or was recently delivered
+    enqueue(messageKey : string, from : string, fromTelegramUserID : number, message : string, nowMS : number) : boolean {
+        if (messageKey in this.deliveredKeys.value || [...this.messages.values()].some(queued => queued.messageKey === messageKey)) {
+            return false;
+        }
+        const seq = this.nextSeq++;
+        const key = makeInboxKey(seq);
+        this.messages.set(key, { messageKey, seq, from, fromTelegramUserID, message, enqueuedAtMS: nowMS, attempts: 0, nextAttemptAtMS: nowMS });
+        this.markAsDirty(key);
+        return true;
+    }
+    head() : InboxMessage|null {
+        let head : InboxMessage|null = null;
+        for (const message of this.messages.values()) {
+            if (head == null || message.seq < head.seq) {
+                head = message;
+            }
+        }
+        return head;
+    }
+    // when the head of the inbox may next be sent (messages behind it wait their turn), or null if the inbox is empty
+    nextAttemptMS() : number|null {
+        const head = this.head();
+        if (head == null) {
+            return null;
+        }
+        return Math.max(head.nextAttemptAtMS, this.lastSentAtMS + this.minSendIntervalMS);
+    }
+    markDelivered(message : InboxMessage, nowMS : number) {
+        this.remove(message);
+        this.lastSentAtMS = nowMS;
+        const deliveredKeys = Object.entries({ ...this.deliveredKeys.value, [message.messageKey]: nowMS })
+            .sort(([,a],[,b]) => a - b)
+            .slice(-MAX_REMEMBERED_DELIVERED_KEYS);
+        this.deliveredKeys.value = Object.fromEntries(deliveredKeys);
+    }
+    // errorCode and retryAfterS are from Telegram's error response, if there was one
+    markFailed(message : InboxMessage, nowMS : number, errorCode ?: number, retryAfterS ?: number) : InboxSendOutcome {
+        this.lastSentAtMS = nowMS;
+        message.attempts += 1;
+        // a 400 or 403 (chat not found, bot blocked by the user...) won't go away by retrying
+        const permanent = errorCode === 400 || errorCode === 403;
+        if (permanent || message.attempts >= MAX_INBOX_SEND_ATTEMPTS) {
+            this.remove(message);
+            return 'dropped';
+        }
+        const backoffMS = Math.min(MAX_RETRY_DELAY_MS, BASE_RETRY_DELAY_MS * Math.pow(2, message.attempts - 1));
+        message.nextAttemptAtMS = nowMS + Math.max(backoffMS, (retryAfterS || 0) * 1000);
+        this.markAsDirty(makeInboxKey(message.seq));
+        return 'retrying';
+    }
+    get size() : number {
+        return this.messages.size;
+    }
+    private remove(message : InboxMessage) {
+        const key = makeInboxKey(message.seq);
+        this.messages.delete(key);
+        this.dirtyTracking.delete(key);
+        this.deletedKeys.add(key);
+    }
+    private markAsDirty(key : string) {
+        this.deletedKeys.delete(key);
+        this.dirtyTracking.add(key);
+    }
+}
+
+function makeInboxKey(seq : number) : string {
+    // zero-padded, so storage lists the inbox in order
+    return `${INBOX_KEY_PREFIX}:${seq.toString().padStart(12, "0")}`;
+}
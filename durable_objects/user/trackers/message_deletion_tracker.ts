@@ -0,0 +1,84 @@
+/*
+    This class tracks messages in the user's chat that should be deleted at a due time (like reply questions that time out).
+    Each one is stored under its own key:
+        messageDeletion:<chatID>:<messageID> -> { chatID, messageID, deleteAtMS }
+    so a pending deletion survives the UserDO being evicted.  The UserDO's alarm is set for the earliest due time,
+    and takes everything due (or nearly due) in one batch.
+    This has dirty tracking, and flushes any changes to storage on demand by flushToStorage
+*/
+export interface ScheduledMessageDeletion {
+    chatID : number
+    messageID : number
+    deleteAtMS : number
+}
+
+const MESSAGE_DELETION_KEY_PREFIX = "messageDeletion";
+
+export class MessageDeletionTracker {
+    deletions : Map<string,ScheduledMessageDeletion> = new Map<string,ScheduledMessageDeletion>();
+    dirtyTracking : Set<string> = new Set<string>();
+    deletedKeys : Set<string> = new Set<string>();
+    constructor() {
+    }
+    initialize(entries : Map<string,any>) {
+        for (const [key,value] of entries) {
+            if (key.startsWith(`${MESSAGE_DELETION_KEY_PREFIX}:`)) {
+                this.deletions.set(key, value as ScheduledMessageDeletion);
+            }
+        }
+    }
+    async flushToStorage(storage : DurableObjectStorage) {
+
+        if (this.deletedKeys.size == 0 && this.dirtyTracking.size == 0) {
+            return;
+        }
+
+        const putEntries : Record<string,ScheduledMessageDeletion> = {};
+        for (const key of this.dirtyTracking) {
+            putEntries[key] = this.deletions.get(key)!!;
+        }
+
+        const putPromise = storage.put(putEntries).then(() => {
+            this.dirtyTracking.clear();
+        });
+        const deletePromise = storage.delete([...this.deletedKeys]).then(() => {
+            this.deletedKeys.clear();
+        });
+        await Promise.all([putPromise, deletePromise]);
+    }
+    schedule(chatID : number, messageID : number, deleteAtMS : number) {
+        const key = makeMessageDeletionKey(chatID, messageID);
+        this.deletions.set(key, { chatID, messageID, deleteAtMS });
+        this.deletedKeys.delete(key);
+        this.dirtyTracking.add(key);
+    }
+    // removes and returns the deletions due by nowMS (plus batchWindowMS, so deletions a moment apart share one alarm)
+    takeDue(nowMS : number, batchWindowMS : number = 0) : ScheduledMessageDeletion[] {
+        const due : ScheduledMessageDeletion[] = [];
+        for (const [key,deletion] of this.deletions) {
+            if (deletion.deleteAtMS <= nowMS + batchWindowMS) {
+                due.push(deletion);
+                this.deletions.delete(key);
+                this.dirtyTracking.delete(key);
+                this.deletedKeys.add(key);
+            }
+        }
+        return due.sort((a,b) => a.deleteAtMS - b.deleteAtMS);
+    }
+    nextDueMS() : number|null {
+        let nextDueMS : number|null = null;
+        for (const deletion of this.deletions.values()) {
+            if (nextDueMS == null || deletion.deleteAtMS < nextDueMS) {
+                nextDueMS = deletion.deleteAtMS;
+            }
+        }
+        return nextDueMS;
+    }
+    get size() : number {
+        return this.deletions.size;
+    }
+}
+
+function makeMessageDeletionKey(chatID : number, messageID : number) : string {
+    return `${MESSAGE_DELETION_KEY_PREFIX}:${chatID}:${messageID}`;
+}
@@ -1,9 +1,12 @@
+import { randomUUID } from "node:crypto";
 import { Env } from "../../env";
 import { makeJSONRequest, makeRequest } from "../../http";
+import { recordUserDOFetch } from "../../profiling";
 import { Structural } from "../../util";
 import { DeleteSessionRequest } from "./actions/delete_session";
 import { GetSessionValuesRequest, GetSessionValuesWithPrefixRequest, GetSessionValuesWithPrefixResponse, SessionValuesResponse } from "./actions/get_session_values";
 import { GetUserDataRequest } from "./actions/get_user_data";
+import { ScheduleMessageDeletionRequest, ScheduleMessageDeletionResponse } from "./actions/schedule_message_deletion";
 import { SendMessageToUserRequest, SendMessageToUserResponse } from "./actions/send_message_to_user";
 import { StoreSessionValuesRequest, StoreSessionValuesResponse } from "./actions/store_session_values";
 import { SessionKey } from "./model/session";
@@ -16,15 +19,25 @@ export enum UserDOFetchMethod {
 	getSessionValuesWithPrefix = "getSessionValuesWithPrefix",
 	deleteSession = "deleteSession",
 	sendMessageToUser = "sendMessageToUser",
+	scheduleMessageDeletion = "scheduleMessageDeletion",
 }
 
-export async function sendMessageToUser(toTelegramUserID : number, fromTelegramUserName : string, fromTelegramUserID: number, message : string, env : Env) : Promise<SendMessageToUserResponse> {
-	const request : SendMessageToUserRequest = { toTelegramUserID, fromTelegramUserName, fromTelegramUserID, message };
+/* Queues the message in the recipient's UserDO inbox, which delivers it (see InboxTracker) */
+export async function sendMessageToUser(toTelegramUserID : number, fromTelegramUserName : string, fromTelegramUserID: number, message : string, env : Env, messageKey : string = randomUUID()) : Promise<SendMessageToUserResponse> {
+	const request : SendMessageToUserRequest = { toTelegramUserID, fromTelegramUserName, fromTelegramUserID, message, messageKey };
 	const method = UserDOFetchMethod.sendMessageToUser;
-	const response = await sendJSONRequestToUserDO<SendMessageToUserRequest,SendMessageToUserResponse>(toTelegramUserID, method, request, env);
+	// the inbox ignores a messageKey it has already seen, so if the DO request fails (ex: the DO was reset), it's safe to send it again
+	const response = await sendJSONRequestToUserDO<SendMessageToUserRequest,SendMessageToUserResponse>(toTelegramUserID, method, request, env)
+		.catch(() => sendJSONRequestToUserDO<SendMessageToUserRequest,SendMessageToUserResponse>(toTelegramUserID, method, request, env));
 	return response;
 }
 
+/* The UserDO deletes the message at deleteAtMS (from its alarm), so nothing has to stay alive waiting for it */
+export async function scheduleMessageDeletion(telegramUserID : number, chatID : number, messageID : number, deleteAtMS : number, env : Env) : Promise<ScheduleMessageDeletionResponse> {
+	const request : ScheduleMessageDeletionRequest = { telegramUserID, chatID, messageID, deleteAtMS };
+	return await sendJSONRequestToUserDO<ScheduleMessageDeletionRequest,ScheduleMessageDeletionResponse>(telegramUserID, UserDOFetchMethod.scheduleMessageDeletion, request, env);
+}
+
 export function parseUserDOFetchMethod(value : string) : UserDOFetchMethod|null {
 	return Object.values(UserDOFetchMethod).find(x => x === value)||null;
 }
@@ -42,9 +55,10 @@ export function makeUserDOFetchRequest<T>(method : UserDOFetchMethod, body?: T,
 async function sendJSONRequestToUserDO<TRequest,TResponse>(telegramUserID : number, method : UserDOFetchMethod, body: TRequest, env : Env) : Promise<TResponse> {
 	const request = makeUserDOFetchRequest(method, body);
 	const userDO = getUserDO(telegramUserID, env);
-	const response = await userDO.fetch(request);
-	const jsonResponse = await response.json();
-	return jsonResponse as TResponse;
+	const response : Response = await userDO.fetch(request);
+	const responseText = await response.text();
+	recordUserDOFetch(method, JSON.stringify(body).length, responseText.length, response);
+	return JSON.parse(responseText) as TResponse;
 }
 
 export function getUserDO(telegramUserID : number, env : Env) : any {
@@ -59,7 +73,9 @@ export async function deleteSession(telegramUserID : number, chatID : number, me
 	const deleteSessionRequestBody : DeleteSessionRequest = { telegramUserID, chatID, messageID };
 	const request = makeUserDOFetchRequest(UserDOFetchMethod.deleteSession, deleteSessionRequestBody);
 	const userDO = getUserDO(telegramUserID, env);
-	return await userDO.fetch(request);
+	const response : Response = await userDO.fetch(request);
+	recordUserDOFetch(UserDOFetchMethod.deleteSession, JSON.stringify(deleteSessionRequestBody).length, 0, response);
+	return response;
 }
 
 export async function getSessionState(telegramUserID : number, chatID : number, messageID : number, sessionKeys : SessionKey[], env : Env) {
@@ -2,24 +2,32 @@ import { isAdminOrSuperAdmin } from "../../admins";
 import { Env } from "../../env";
 import { makeFailureResponse, makeJSONResponse, makeSuccessResponse, maybeGetJson } from "../../http";
 import { logDebug, logError, logInfo } from "../../logging";
-import { sendMessageToTG } from "../../telegram";
-import { ChangeTrackedValue, Structural, assertNever, sleep } from "../../util";
+import { countStorageOps, isStorageProfilingEnabled, makeCountingStorage } from "../../profiling";
+import { TgMessageSentInfo, deleteTGMessage, sendMessageToTG } from "../../telegram";
+import { ChangeTrackedValue, Structural, assertNever } from "../../util";
 import { BaseUserDORequest, isBaseUserDORequest } from "./actions/base_user_do_request";
 import { DeleteSessionRequest, DeleteSessionResponse } from "./actions/delete_session";
 import { GetSessionValuesRequest, GetSessionValuesWithPrefixRequest, GetSessionValuesWithPrefixResponse } from "./actions/get_session_values";
 import { GetUserDataRequest } from "./actions/get_user_data";
+import { ScheduleMessageDeletionRequest, ScheduleMessageDeletionResponse } from "./actions/schedule_message_deletion";
 import { SendMessageToUserRequest, SendMessageToUserResponse, isSendMessageToUserRequest } from "./actions/send_message_to_user";
 import { StoreSessionValuesRequest, StoreSessionValuesResponse } from "./actions/store_session_values";
 import { UserData } from "./model/user_data";
+import { InboxMessage, InboxTracker } from "./trackers/inbox_tracker";
+import { MessageDeletionTracker } from "./trackers/message_deletion_tracker";
 import { SessionTracker } from "./trackers/session_tracker";
 import { UserDOFetchMethod, parseUserDOFetchMethod } from "./userDO_interop";
 
+// deletions due within this long of an alarm are done in the same batch
+const MESSAGE_DELETION_BATCH_WINDOW_MS = 1000;
+
 /* Durable Object storing state of user */
 export class UserDO {
 
     // boilerplate DO stuff
     env : Env;
     state: DurableObjectState;
+    storage : DurableObjectStorage;
     loadFromStorageFailed : boolean|undefined = undefined
 
     // user's ID
@@ -31,11 +39,23 @@ export class UserDO {
     // tracks variable values associated with the current messageID
     sessionTracker : SessionTracker = new SessionTracker();
 
-    inbox: { from : string, message : string }[] = [];
+    // messages to delete from the chat later (timed out reply questions), done by the alarm
+    messageDeletionTracker : MessageDeletionTracker = new MessageDeletionTracker();
+
+    // messages sent to this user through the bot, delivered in order by the alarm
+    inboxTracker : InboxTracker = new InboxTracker();
+
+    // when STORAGE_PROFILING is on, each response reports the storage ops made while handling it
+    storageProfiling : boolean = false;
 
     constructor(state : DurableObjectState, env : any) {
         this.env                = env;
         this.state              = state;
+        this.storage            = state.storage;
+        if (isStorageProfilingEnabled(env)) {
+            this.storageProfiling = true;
+            this.storage = makeCountingStorage(state.storage);
+        }
         this.state.blockConcurrencyWhile(async () => {
             await this.loadStateFromStorage();
         });
@@ -43,18 +63,22 @@ export class UserDO {
 
     async loadStateFromStorage() {
         logDebug("Loading userDO from storage");
-        const storage = await this.state.storage.list();
+        const storage = await this.storage.list();
         this.telegramUserID.initialize(storage);
         this.sessionTracker.initialize(storage);
+        this.messageDeletionTracker.initialize(storage);
+        this.inboxTracker.initialize(storage);
         this.chatID.initialize(storage);
         //logInfo("Loaded userDO from storage: ", this.telegramUserID.value);
     }
 
     async flushToStorage() {
         await Promise.allSettled([
-            this.telegramUserID.flushToStorage(this.state.storage),
-            this.sessionTracker.flushToStorage(this.state.storage),
-            this.chatID.flushToStorage(this.state.storage)
+            this.telegramUserID.flushToStorage(this.storage),
+            this.sessionTracker.flushToStorage(this.storage),
+            this.messageDeletionTracker.flushToStorage(this.storage),
+            this.inboxTracker.flushToStorage(this.storage),
+            this.chatID.flushToStorage(this.storage)
         ]);
     }
     
@@ -64,8 +88,15 @@ export class UserDO {
 
     async fetch(request : Request) : Promise<Response> {
         try {
-            const [method,jsonRequestBody,response] = await this._fetch(request);
-            return response;
+            if (this.storageProfiling) {
+                return await countStorageOps(async () => {
+                    const response = await this.handleFetch(request);
+                    // when profiling, flush before responding so that the writes are counted against this request
+                    await this.flushToStorage();
+                    return response;
+                });
+            }
+            return await this.handleFetch(request);
         }
         catch(e) {
             logError("Error in userDO fetch", e, this.telegramUserID);
@@ -77,6 +108,15 @@ export class UserDO {
         }
     }
 
+    async handleFetch(request : Request) : Promise<Response> {
+        const [method,jsonRequestBody,response] = await this._fetch(request);
+        if (this.inboxTracker.size > 0 && this.chatID.value != null) {
+            // messages that arrived before we knew the user's chatID can go out now
+            await this.scheduleAlarm();
+        }
+        return response;
+    }
+
     async ensureIsInitialized(userAction : BaseUserDORequest) {
         // make sure telegramUserID is populated
         if (this.telegramUserID.value == null) {
@@ -121,6 +161,9 @@ export class UserDO {
             case UserDOFetchMethod.sendMessageToUser:
                 response = await this.handleSendMessageToUser(userAction);
                 break;
+            case UserDOFetchMethod.scheduleMessageDeletion:
+                response = await this.handleScheduleMessageDeletion(userAction);
+                break;
             default:
                 assertNever(method);
         }
@@ -128,39 +171,90 @@ export class UserDO {
         return [method,userAction,response];
     }
 
-    async handleSendMessageToUser(request : SendMessageToUserRequest) : Promise<Response> {
-        await this.handleSendMessageToUserInternal(request);
-        const response: SendMessageToUserResponse = {};
-        return makeJSONResponse(response);
+    async handleScheduleMessageDeletion(request : ScheduleMessageDeletionRequest) : Promise<Response> {
+        this.messageDeletionTracker.schedule(request.chatID, request.messageID, request.deleteAtMS);
+        await this.messageDeletionTracker.flushToStorage(this.storage);
+        await this.scheduleAlarm();
+        return makeJSONResponse<ScheduleMessageDeletionResponse>({});
     }
 
-    async handleSendMessageToUserInternal(request : SendMessageToUserRequest) : Promise<void> {
-        this.inbox.push({ from: request.fromTelegramUserName,  message: request.message });
+    async alarm() {
+        await this.deleteDueMessages();
+        await this.deliverInbox();
+        await this.flushToStorage();
+        await this.scheduleAlarm();
+    }
+
+    async deleteDueMessages() {
+        const dueDeletions = this.messageDeletionTracker.takeDue(Date.now(), MESSAGE_DELETION_BATCH_WINDOW_MS);
+        const results = await Promise.allSettled(dueDeletions.map(deletion => deleteTGMessage(deletion.messageID, deletion.chatID, this.env)));
+        const failures = results.filter(result => result.status === 'rejected' || !result.value.success).length;
+        if (failures > 0) {
+            // most likely already deleted by the user, so these aren't retried
+            logDebug(`${failures} of ${dueDeletions.length} scheduled message deletions failed`, this.telegramUserID.value);
+        }
+    }
+
+    /* Sends the inbox in order, stopping at the first message that isn't ready (rate limited, or backing off after a failure) */
+    async deliverInbox() {
         if (this.chatID.value == null) {
             return;
         }
         const chatID = this.chatID.value;
-        const sendSuccessIdxs : number[] = [];
-        this.inbox.forEach(async (message,index) => {
-            let messageWithContext = `$<b>${message.from} - ${this.env.TELEGRAM_BOT_INSTANCE_DISPLAY_NAME}</b>: ${message.message}`;
-            if (this.telegramUserID.value != null && isAdminOrSuperAdmin(this.telegramUserID.value, this.env)) {
-                messageWithContext += `(from user ID: ${request.fromTelegramUserID})`;
-            }
-            const result = await sendMessageToTG(chatID, messageWithContext, this.env);
+        let message = this.inboxTracker.head();
+        while (message != null && this.inboxTracker.nextAttemptMS()!! <= Date.now()) {
+            const result = await sendMessageToTG(chatID, this.formatInboxMessage(message), this.env)
+                .catch(() : TgMessageSentInfo => ({ success: false }));
             if (result.success) {
-                sendSuccessIdxs.push(index);
+                this.inboxTracker.markDelivered(message, Date.now());
             }
-            if (index !== this.inbox.length - 1) {
-                sleep(500);
-            }  
-        });
-        const inboxMinusSentMessages : { from : string, message:string }[] = [];
-        this.inbox.forEach((message,index) => {
-            if (!sendSuccessIdxs.includes(index)) {
-                inboxMinusSentMessages.push(message);
+            else if (this.inboxTracker.markFailed(message, Date.now(), result.errorCode, result.retryAfterS) === 'dropped') {
+                logError(`Dropped inbox message after ${message.attempts} attempts (error code: ${result.errorCode})`, this.telegramUserID.value);
             }
-        })
-        this.inbox = inboxMinusSentMessages;
+            message = this.inboxTracker.head();
+        }
+    }
+
+    formatInboxMessage(message : InboxMessage) : string {
+        let messageWithContext = `<b>${message.from} - ${this.env.TELEGRAM_BOT_INSTANCE_DISPLAY_NAME}</b>: ${message.message}`;
+        if (this.telegramUserID.value != null && isAdminOrSuperAdmin(this.telegramUserID.value, this.env)) {
+            messageWithContext += `(from user ID: ${message.fromTelegramUserID})`;
+        }
+        return messageWithContext;
+    }
+
+    /* The alarm is set for whatever is due next.  Setting it when one is already set for earlier would push that one back. */
+    async scheduleAlarm() {
+        const dueTimes = [this.messageDeletionTracker.nextDueMS()];
+        if (this.chatID.value != null) {
+            // without a chatID, the inbox waits until the user talks to the bot
+            dueTimes.push(this.inboxTracker.nextAttemptMS());
+        }
+        const nextDueMS = dueTimes.reduce<number|null>((a,b) => (a == null) ? b : (b == null) ? a : Math.min(a,b), null);
+        if (nextDueMS == null) {
+            return;
+        }
+        const currentAlarmMS = await this.storage.getAlarm();
+        if (currentAlarmMS == null || currentAlarmMS > nextDueMS) {
+            await this.storage.setAlarm(nextDueMS);
+        }
+    }
+
+    async handleSendMessageToUser(request : SendMessageToUserRequest) : Promise<Response> {
+        await this.handleSendMessageToUserInternal(request);
+        const response: SendMessageToUserResponse = {};
+        return makeJSONResponse(response);
+    }
+
+    async handleSendMessageToUserInternal(request : SendMessageToUserRequest) : Promise<void> {
+        const enqueued = this.inboxTracker.enqueue(request.messageKey, request.fromTelegramUserName, request.fromTelegramUserID, request.message, Date.now());
+        if (!enqueued) {
+            logDebug(`Ignoring already received message ${request.messageKey}`, this.telegramUserID.value);
+            return;
+        }
+        // persisted before responding, so the sender knows it won't be lost
+        await this.inboxTracker.flushToStorage(this.storage);
+        await this.scheduleAlarm();
     }
 
     handleGetSessionValuesWithPrefix(request : GetSessionValuesWithPrefixRequest) : Response {
@@ -190,7 +284,7 @@ export class UserDO {
     async handleDeleteSession(jsonRequestBody : DeleteSessionRequest) : Promise<Response> {
         const messageID = jsonRequestBody.messageID;
         this.sessionTracker.deleteSession(messageID);
-        return await this.sessionTracker.flushToStorage(this.state.storage).then(() => {
+        return await this.sessionTracker.flushToStorage(this.storage).then(() => {
             return makeJSONResponse<DeleteSessionResponse>({});
         });
     }
@@ -201,7 +295,7 @@ export class UserDO {
             const value = jsonRequestBody.sessionValues[sessionKey];
             this.sessionTracker.storeSessionValue(messageID, sessionKey, value);
         }
-        return await this.sessionTracker.flushToStorage(this.state.storage).then(() => {
+        return await this.sessionTracker.flushToStorage(this.storage).then(() => {
             return makeJSONResponse<StoreSessionValuesResponse>({});
         });
     }
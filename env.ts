@@ -32,6 +32,9 @@ export interface EnvironmentVariables {
 	// feature switches
 	
 	QUESTION_TIMEOUT_MS : string
+
+	// dev tooling: attribute UserDO round trips and storage ops to each webhook update (see scripts/profile_storage_ops.py)
+	STORAGE_PROFILING? : string
 }
 
 interface DurableObjects {
@@ -0,0 +1,4 @@
+// Generated from generated/photo_assets.json by scripts/deployment/upload_photos.py. Do not edit.
+
+// environment -> photo URL -> the file_id of that photo, as uploaded to the environment's bot
+export const PHOTO_FILE_IDS : Record<string,Record<string,string>> = {};
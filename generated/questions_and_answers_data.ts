@@ -0,0 +1,376 @@
+// Generated from questions_and_answers.toml by scripts/deployment/generate_questions_and_answers.py. Do not edit.
+
+export type QUESTION_CODE = 'CAN_I_PARTNER'|'CAN_I_APPLY_FOR_GRANT'|'CAN_I_CONNECT_WITH_BD_TEAM'|'HOW_CAN_I_BE_RETWEETED'|'HOW_CAN_I_GET_PR_COMMS_SUPPORT'|'WHAT_ARE_THE_BRAND_GUIDELINES'|'I_HAVE_TECHNICAL_ISSUE'|'HOW_CAN_I_HELP_COMMUNITY_GROW';
+
+export type QuestionAnswerSpec = {
+    code: QUESTION_CODE,
+    question: string,
+    answer: string|string[]
+}
+
+export const CANNED_QUESTIONS_AND_ANSWERS : QuestionAnswerSpec[] = [
+    {
+        code: "CAN_I_PARTNER",
+        question: "Can I partner with Solana?",
+        answer: [
+            "As a decentralized network, no one officially represents Solana.",
+            "The Solana Foundation, which is a neutral entity in the ecosystem, does not do direct partnerships.",
+        ]
+    },
+    {
+        code: "CAN_I_APPLY_FOR_GRANT",
+        question: "Can I apply for a grant?",
+        answer: [
+            "You can apply for grants <a href='https://www.solana.org/grants'>here</a>. Our grant process is typically used for funding open-source public goods that benefit everyone.",
+            "Make sure to check out the growing list of other ecosystem members offering funding for <a href=\"https://solana.org/grants-funding#ecosystem_funding\">different initiatives</a>",
+        ]
+    },
+    {
+        code: "CAN_I_CONNECT_WITH_BD_TEAM",
+        question: "Can you connect me to the Solana Foundation BD team?",
+        answer: [
+            "The BD team is typically heads down working on initiatives of their own, so they are not generally available.  However, if there is a specific need you have you can reach out to a Solana Foundation representative.",
+        ]
+    },
+    {
+        code: "HOW_CAN_I_BE_RETWEETED",
+        question: "How can we get social media exposure / tweets from the Solana Foundation?",
+        answer: [
+            "We can't guarantee that your news will be retweeted, but to maximize your chances here are some social media guidelines that give you an idea of what we are looking for:",
+            "  :bullet: <b>Community Focused</b>: News that focuses on the Solana community forward is more likely to be retweeted by our account.",
+            "  :bullet: <b>Forward-Looking</b>: We are more likely to re-tweet content that highlights how Solana is breaking new ground and how the ecosystem and community is growing.",
+            "  :bullet: <b>Visually Interesting</b>: Most content we retweet contains either a compelling image, video, or link. Plain text is not as compelling.",
+        ]
+    },
+    {
+        code: "HOW_CAN_I_GET_PR_COMMS_SUPPORT",
+        question: "We have a major release coming up, can you help us with PR/comms?",
+        answer: [
+            "We can't guarantee personalized PR support for any specific project or development, but to maximize your changes of success <a href='https://solana.com/branding'>here</a> is a PR 101 Kit from our Head of Comms.",
+        ]
+    },
+    {
+        code: "WHAT_ARE_THE_BRAND_GUIDELINES",
+        question: "What are your brand guidelines? Can I use the Solana logo?",
+        answer: [
+            "Check out our brand guidelines and assets <a href='https://solana.com/branding'>here</a>.",
+        ]
+    },
+    {
+        code: "I_HAVE_TECHNICAL_ISSUE",
+        question: "I have a technical issue. What resources are available?",
+        answer: [
+            ":bullet: <a href=\"https://solana.stackexchange.com/\">Solana Stack Exchange</a>",
+            ":bullet: <a href=\"https://solana.com/developers\">Official Solana Development Resource Portal</a>",
+            ":bullet: <a href=\"https://solana.com/docs/intro/dev\">Getting Started With Solana Development</a>",
+            ":bullet: <a href=\"https://solanacookbook.com/\">Solana Cookbook</a>",
+            ":bullet: <a href='https://discord.com/invite/kBbATFA7PW'>Solana Tech Discord Server</a>",
+        ]
+    },
+    {
+        code: "HOW_CAN_I_HELP_COMMUNITY_GROW",
+        question: "How Can I Help The Solana Community Grow?",
+        answer: [
+            "Interested in helping the Solana community grow?  You can check out a playbook and apply for a small microgrant for individual meetups and events <a href=\"https://www.solana.com/events\">here</a>.",
+            "",
+            "If you are looking to execute a larger initiative, you can apply for a <a href=\"https://www.solana.org/grants\">grant</a> under the funding category 'Community'.",
+        ]
+    },
+];
+
+export const QUESTION_NGRAM_SIZE = 3;
+
+// normalized question (or alias) -> index into CANNED_QUESTIONS_AND_ANSWERS
+export const QUESTION_LOOKUP = new Map<string,number>([
+    ["can i partner with solana", 0],
+    ["can i apply for a grant", 1],
+    ["can you connect me to the solana foundation bd team", 2],
+    ["how can we get social media exposure tweets from the solana foundation", 3],
+    ["we have a major release coming up can you help us with pr comms", 4],
+    ["what are your brand guidelines can i use the solana logo", 5],
+    ["i have a technical issue what resources are available", 6],
+    ["i have a technical issue", 6],
+    ["where can i get technical support", 6],
+    ["how can i help the solana community grow", 7],
+]);
+
+// every normalized question and alias: which question it is, and how many distinct n-grams it has
+export const QUESTION_KEYS : { question : number, ngrams : number }[] = [
+    { question: 0, ngrams: 25 },
+    { question: 1, ngrams: 23 },
+    { question: 2, ngrams: 51 },
+    { question: 3, ngrams: 69 },
+    { question: 4, ngrams: 61 },
+    { question: 5, ngrams: 56 },
+    { question: 6, ngrams: 52 },
+    { question: 6, ngrams: 24 },
+    { question: 6, ngrams: 33 },
+    { question: 7, ngrams: 39 },
+];
+
+// n-gram -> indices into QUESTION_KEYS of the phrasings containing it
+export const QUESTION_NGRAM_INDEX = new Map<string,number[]>([
+    [" a ", [1, 4, 6, 7]],
+    [" ap", [1]],
+    [" ar", [5, 6]],
+    [" av", [6]],
+    [" bd", [2]],
+    [" br", [5]],
+    [" ca", [0, 1, 2, 3, 4, 5, 8, 9]],
+    [" co", [2, 4, 9]],
+    [" ex", [3]],
+    [" fo", [1, 2, 3]],
+    [" fr", [3]],
+    [" ge", [3, 8]],
+    [" gr", [1, 9]],
+    [" gu", [5]],
+    [" ha", [4, 6, 7]],
+    [" he", [4, 9]],
+    [" ho", [3, 9]],
+    [" i ", [0, 1, 5, 6, 7, 8, 9]],
+    [" is", [6, 7]],
+    [" lo", [5]],
+    [" ma", [4]],
+    [" me", [2, 3]],
+    [" pa", [0]],
+    [" pr", [4]],
+    [" re", [4, 6]],
+    [" so", [0, 2, 3, 5, 9]],
+    [" su", [8]],
+    [" te", [2, 6, 7, 8]],
+    [" th", [2, 3, 5, 9]],
+    [" to", [2]],
+    [" tw", [3]],
+    [" up", [4]],
+    [" us", [4, 5]],
+    [" we", [3, 4]],
+    [" wh", [5, 6, 8]],
+    [" wi", [0, 4]],
+    [" yo", [2, 4, 5]],
+    ["a c", [9]],
+    ["a e", [3]],
+    ["a f", [2, 3]],
+    ["a g", [1]],
+    ["a l", [5]],
+    ["a m", [4]],
+    ["a t", [6, 7]],
+    ["abl", [6]],
+    ["ail", [6]],
+    ["ajo", [4]],
+    ["al ", [3, 6, 7, 8]],
+    ["am ", [2]],
+    ["an ", [0, 1, 2, 3, 4, 5, 8, 9]],
+    ["ana", [0, 2, 3, 5, 9]],
+    ["and", [5]],
+    ["ant", [1]],
+    ["app", [1]],
+    ["are", [5, 6]],
+    ["art", [0]],
+    ["ase", [4]],
+    ["at ", [5, 6]],
+    ["ati", [2, 3]],
+    ["ava", [6]],
+    ["ave", [4, 6, 7]],
+    ["bd ", [2]],
+    ["ble", [6]],
+    ["bra", [5]],
+    ["cal", [6, 7, 8]],
+    ["can", [0, 1, 2, 3, 4, 5, 8, 9]],
+    ["ces", [6]],
+    ["chn", [6, 7, 8]],
+    ["cia", [3]],
+    ["com", [4, 9]],
+    ["con", [2]],
+    ["ct ", [2]],
+    ["d g", [5]],
+    ["d t", [2]],
+    ["dat", [2, 3]],
+    ["del", [5]],
+    ["dia", [3]],
+    ["e a", [4, 6, 7]],
+    ["e c", [4, 8]],
+    ["e g", [3]],
+    ["e h", [4]],
+    ["e s", [2, 3, 5, 9]],
+    ["e t", [2, 3, 5]],
+    ["e w", [6]],
+    ["e y", [5]],
+    ["eam", [2]],
+    ["eas", [4]],
+    ["ech", [6, 7, 8]],
+    ["ect", [2]],
+    ["edi", [3]],
+    ["eet", [3]],
+    ["ele", [4]],
+    ["eli", [5]],
+    ["elp", [4, 9]],
+    ["er ", [0]],
+    ["ere", [8]],
+    ["es ", [5, 6]],
+    ["eso", [6]],
+    ["et ", [3, 8]],
+    ["ets", [3]],
+    ["exp", [3]],
+    ["for", [1]],
+    ["fou", [2, 3]],
+    ["fro", [3]],
+    ["g u", [4]],
+    ["get", [3, 8]],
+    ["go ", [5]],
+    ["gra", [1]],
+    ["gro", [9]],
+    ["gui", [5]],
+    ["h p", [4]],
+    ["h s", [0]],
+    ["hat", [5, 6]],
+    ["hav", [4, 6, 7]],
+    ["he ", [2, 3, 5, 9]],
+    ["hel", [4, 9]],
+    ["her", [8]],
+    ["hni", [6, 7, 8]],
+    ["how", [3, 9]],
+    ["i a", [1]],
+    ["i g", [8]],
+    ["i h", [6, 7, 9]],
+    ["i p", [0]],
+    ["i u", [5]],
+    ["ia ", [3]],
+    ["ial", [3]],
+    ["ica", [6, 7, 8]],
+    ["ide", [5]],
+    ["ila", [6]],
+    ["ine", [5]],
+    ["ing", [4]],
+    ["ion", [2, 3]],
+    ["iss", [6, 7]],
+    ["ith", [0, 4]],
+    ["ity", [9]],
+    ["jor", [4]],
+    ["l i", [6, 7]],
+    ["l m", [3]],
+    ["l s", [8]],
+    ["lab", [6]],
+    ["lan", [0, 2, 3, 5, 9]],
+    ["le ", [6]],
+    ["lea", [4]],
+    ["lin", [5]],
+    ["log", [5]],
+    ["lp ", [4, 9]],
+    ["ly ", [1]],
+    ["m t", [3]],
+    ["maj", [4]],
+    ["me ", [2]],
+    ["med", [3]],
+    ["min", [4]],
+    ["mms", [4]],
+    ["mmu", [9]],
+    ["ms ", [4]],
+    ["mun", [9]],
+    ["n b", [2]],
+    ["n i", [0, 1, 5, 8, 9]],
+    ["n w", [3]],
+    ["n y", [2, 4]],
+    ["na ", [0, 2, 3, 5, 9]],
+    ["nd ", [5]],
+    ["nda", [2, 3]],
+    ["nec", [2]],
+    ["ner", [0]],
+    ["nes", [5]],
+    ["ng ", [4]],
+    ["nic", [6, 7, 8]],
+    ["nit", [9]],
+    ["nne", [2]],
+    ["nt ", [1]],
+    ["o t", [2]],
+    ["oci", [3]],
+    ["ogo", [5]],
+    ["ola", [0, 2, 3, 5, 9]],
+    ["om ", [3]],
+    ["omi", [4]],
+    ["omm", [4, 9]],
+    ["on ", [2, 3]],
+    ["onn", [2]],
+    ["or ", [1, 4]],
+    ["ort", [8]],
+    ["osu", [3]],
+    ["ou ", [2, 4]],
+    ["oun", [2, 3]],
+    ["our", [5, 6]],
+    ["ow ", [3, 9]],
+    ["p c", [4]],
+    ["p t", [9]],
+    ["p u", [4]],
+    ["par", [0]],
+    ["ply", [1]],
+    ["por", [8]],
+    ["pos", [3]],
+    ["ppl", [1]],
+    ["ppo", [8]],
+    ["pr ", [4]],
+    ["r a", [1]],
+    ["r b", [5]],
+    ["r c", [4]],
+    ["r r", [4]],
+    ["r w", [0]],
+    ["ran", [1, 5]],
+    ["rce", [6]],
+    ["re ", [3, 5, 6, 8]],
+    ["rel", [4]],
+    ["res", [6]],
+    ["rom", [3]],
+    ["row", [9]],
+    ["rt ", [8]],
+    ["rtn", [0]],
+    ["s a", [6]],
+    ["s c", [5]],
+    ["s f", [3]],
+    ["s w", [4]],
+    ["se ", [4, 5]],
+    ["soc", [3]],
+    ["sol", [0, 2, 3, 5, 9]],
+    ["sou", [6]],
+    ["ssu", [6, 7]],
+    ["sue", [6, 7]],
+    ["sup", [8]],
+    ["sur", [3]],
+    ["t a", [5]],
+    ["t m", [2]],
+    ["t r", [6]],
+    ["t s", [3]],
+    ["t t", [8]],
+    ["tea", [2]],
+    ["tec", [6, 7, 8]],
+    ["th ", [0, 4]],
+    ["the", [2, 3, 5, 9]],
+    ["tio", [2, 3]],
+    ["tne", [0]],
+    ["to ", [2]],
+    ["ts ", [3]],
+    ["twe", [3]],
+    ["ty ", [9]],
+    ["u c", [2]],
+    ["u h", [4]],
+    ["ue ", [6, 7]],
+    ["uid", [5]],
+    ["und", [2, 3]],
+    ["uni", [9]],
+    ["up ", [4]],
+    ["upp", [8]],
+    ["ur ", [5]],
+    ["urc", [6]],
+    ["ure", [3]],
+    ["us ", [4]],
+    ["use", [5]],
+    ["vai", [6]],
+    ["ve ", [4, 6, 7]],
+    ["w c", [3, 9]],
+    ["we ", [3, 4]],
+    ["wee", [3]],
+    ["wha", [5, 6]],
+    ["whe", [8]],
+    ["wit", [0, 4]],
+    ["xpo", [3]],
+    ["y f", [1]],
+    ["y g", [9]],
+    ["you", [2, 4, 5]],
+]);
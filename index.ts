@@ -8,8 +8,9 @@ import { CallbackHandler as Handler } from "./worker/handler";
 import { maybeReadSessionObj } from "./durable_objects/user/userDO_interop";
 import { UserDO } from "./durable_objects/user/user_DO";
 import { makeFakeFailedRequestResponse, makeSuccessResponse } from "./http";
-import { logError } from "./logging";
+import { logError, logWebhook } from "./logging";
 import { logoHack } from "./menus";
+import { isStorageProfilingEnabled, profileStorageOps } from "./profiling";
 import { ReplyQuestionData } from "./reply_question/reply_question_data";
 import { CallbackHandlerParams } from "./worker/model/callback_handler_params";
 
@@ -38,6 +39,14 @@ export default {
 
 	// Worker fetch method (this is what the TG webhook calls)
 	async fetch(req : Request, env : Env, context : FetchEvent) {
+		// dev only: report the UserDO round trips / storage ops this update cost in a response header
+		if (isStorageProfilingEnabled(env)) {
+			return await profileStorageOps(() => this.fetchCatchingErrors(req, env, context));
+		}
+		return await this.fetchCatchingErrors(req, env, context);
+	},
+
+	async fetchCatchingErrors(req : Request, env : Env, context : FetchEvent) {
 		try {
 			return await this._fetch(req, context, env);
 		}
@@ -88,6 +97,9 @@ export default {
 		// alias some things
 		const messageType = telegramWebhookInfo.messageType;
 
+		// what kind of update this is, for live latency breakdowns (scripts/tail_stats.py)
+		logWebhook({ messageType: messageType, command: telegramWebhookInfo.command, menuCode: telegramWebhookInfo.callbackData?.menuCode ?? null });
+
 		// user responds to a bot question
 		if (messageType === 'replyToBot') {
 			return await callbackHandler.handleReplyToBot(telegramWebhookInfo);
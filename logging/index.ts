@@ -1,3 +1,3 @@
-import { logDebug, logError, logInfo } from "./smart_logger";
+import { WEBHOOK_LOG_MARKER, logDebug, logError, logInfo, logWebhook } from "./smart_logger";
 
-export { logDebug, logError, logInfo };
+export { WEBHOOK_LOG_MARKER, logDebug, logError, logInfo, logWebhook };
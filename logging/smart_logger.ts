@@ -140,4 +140,16 @@ export function logInfo(...xs : any[]) {
 
 export function logDebug(...xs : any[]) {
     logItSafe(xs, 'debug');
+}
+
+/* One machine-readable line per webhook update, picked out of `wrangler tail` by scripts/tail_stats.py */
+export const WEBHOOK_LOG_MARKER = ':::WEBHOOK:::';
+
+export function logWebhook(fields : { [key : string] : string|number|null }) {
+    try {
+        console.info(`${WEBHOOK_LOG_MARKER} ${JSON.stringify(fields)}`);
+    }
+    catch {
+        console.error("There was trying to generate a log message.");
+    }
 }
\ No newline at end of file
@@ -1,5 +1,6 @@
 import { Env } from "../env";
 import { fetchAndReadResponse, makeJSONRequest } from "../http/http_helpers";
+import { PHOTO_FILE_IDS } from "../generated/photo_file_ids";
 import { CallbackButton, makeTelegramBotUrl, subInEmojisOnButtons } from "../telegram";
 
 export interface PhotoCapabilities {
@@ -8,6 +9,22 @@ export interface PhotoCapabilities {
     renderOptions() : CallbackButton[][];
 }
 
+/*
+    Photos are sent by file_id when scripts/deployment/upload_photos.py has uploaded them to this environment's bot,
+    so Telegram doesn't download the image from photoURL() on every send.
+    A file_id Telegram rejects isn't used again by this isolate - the photo goes by URL until the next deploy.
+*/
+const staleFileIDs = new Set<string>();
+
+export function lookUpPhotoFileID(photoURL : string, env : Env) : string|undefined {
+    const fileIDs = PHOTO_FILE_IDS[env.ENVIRONMENT] || {};
+    const fileID = Object.prototype.hasOwnProperty.call(fileIDs, photoURL) ? fileIDs[photoURL] : undefined;
+    return (fileID != null && !staleFileIDs.has(fileID)) ? fileID : undefined;
+}
+
+function isRejectedFileID(response : { body: any, ok : boolean }) : boolean {
+    return !response.ok && response.body?.error_code === 400 && /file/i.test(response.body?.description || '');
+}
 
 export abstract class BasePhoto {
 
@@ -22,12 +39,15 @@ export abstract class BasePhoto {
         
         // sometimes, updating a menu takes more than one request (only if sending photos)
 
-        let request : Request|null = null;
+        const photoURL = (this as unknown as PhotoCapabilities).photoURL();
+        const fileID = lookUpPhotoFileID(photoURL, env);
 
-        request = this.getSendPhotoRequest(params.chatID, env);
-        
+        let response = await fetchAndReadResponse(this.getSendPhotoRequest(params.chatID, env, fileID));
 
-        const response = await fetchAndReadResponse(request);
+        if (fileID != null && response != null && isRejectedFileID(response)) {
+            staleFileIDs.add(fileID);
+            response = await fetchAndReadResponse(this.getSendPhotoRequest(params.chatID, env));
+        }
 
         if (response == null || !response.ok) {
             return false;
@@ -38,21 +58,21 @@ export abstract class BasePhoto {
     }    
 
 
-    getSendPhotoRequest(chatID : number, env : Env) : Request {
-        const body = this.createRequestBodyForSendPhoto(chatID);
+    getSendPhotoRequest(chatID : number, env : Env, fileID? : string) : Request {
+        const body = this.createRequestBodyForSendPhoto(chatID, fileID);
         const method = 'sendPhoto';
         const url = makeTelegramBotUrl(method, env);
         const request = makeJSONRequest(url, body);
         return request;  
     }    
 
-    createRequestBodyForSendPhoto(chatID : number) {
+    createRequestBodyForSendPhoto(chatID : number, fileID? : string) {
         const photoURL = (this as unknown as PhotoCapabilities).photoURL();
         const caption = (this as unknown as PhotoCapabilities).caption();
         const invisibleNonce = `<a href="t.me/share?url=google.com&text=${Date.now()}">\u200B</a>`;
         const body : any = { 
             chat_id: chatID,
-            photo: photoURL,
+            photo: fileID ?? photoURL,
             parse_mode: 'HTML',
             caption: caption + invisibleNonce
         };
@@ -0,0 +1,9 @@
+import {
+    STORAGE_OPS_HEADER, STORAGE_OPS_PROFILE_HEADER, StorageOpCounts, StorageOpsProfile, attachStorageOpCounts, countStorageOps,
+    isStorageProfilingEnabled, makeCountingStorage, makeStorageOpCounts, profileStorageOps, recordUserDOFetch
+} from "./storage_ops_profile";
+
+export {
+    STORAGE_OPS_HEADER, STORAGE_OPS_PROFILE_HEADER, StorageOpCounts, StorageOpsProfile, attachStorageOpCounts, countStorageOps,
+    isStorageProfilingEnabled, makeCountingStorage, makeStorageOpCounts, profileStorageOps, recordUserDOFetch
+};
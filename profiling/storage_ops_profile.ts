@@ -0,0 +1,153 @@
+import { AsyncLocalStorage } from "node:async_hooks";
+import { tryParseBoolean } from "../util";
+
+/*
+    Storage-op profiling (dev only, enabled by the STORAGE_PROFILING var).
+    The UserDO counts the storage operations it makes and reports them on each response in the X-Storage-Ops header.
+    The worker adds those up, along with its own round trips to the UserDO, for each webhook update it handles,
+    and reports the total on the webhook response in the X-Storage-Ops-Profile header.
+    scripts/profile_storage_ops.py aggregates them into a cost-per-interaction table.
+*/
+
+export const STORAGE_OPS_HEADER = "X-Storage-Ops";
+export const STORAGE_OPS_PROFILE_HEADER = "X-Storage-Ops-Profile";
+
+export interface StorageOpCounts {
+    gets : number
+    getKeys : number
+    lists : number
+    listedKeys : number
+    puts : number
+    putKeys : number
+    putBytes : number
+    deletes : number
+    deleteKeys : number
+}
+
+export interface StorageOpsProfile {
+    doFetches : Record<string,number>
+    doRequestBytes : number
+    doResponseBytes : number
+    storage : StorageOpCounts
+}
+
+export function isStorageProfilingEnabled(env : { STORAGE_PROFILING? : string }) : boolean {
+    return tryParseBoolean(env.STORAGE_PROFILING||'') === true;
+}
+
+export function makeStorageOpCounts() : StorageOpCounts {
+    return { gets: 0, getKeys: 0, lists: 0, listedKeys: 0, puts: 0, putKeys: 0, putBytes: 0, deletes: 0, deleteKeys: 0 };
+}
+
+function addStorageOpCounts(total : StorageOpCounts, counts : StorageOpCounts) {
+    for (const key of Object.keys(total) as (keyof StorageOpCounts)[]) {
+        total[key] += counts[key]||0;
+    }
+}
+
+// Approximate: the stored value is V8-serialized, not JSON, but it's within a few bytes for plain data
+function estimateBytes(value : any) : number {
+    return (JSON.stringify(value)||'').length;
+}
+
+const currentStorageOpCounts = new AsyncLocalStorage<StorageOpCounts>();
+
+/*
+    Wraps DurableObjectStorage so that get/list/put/delete are counted into 'counts',
+    or if not given, into the counts of the request being handled by countStorageOps (ops outside of one, like from an alarm, aren't counted)
+*/
+export function makeCountingStorage(storage : DurableObjectStorage, fixedCounts? : StorageOpCounts) : DurableObjectStorage {
+    return new Proxy(storage, {
+        get(target, property, receiver) {
+            const value = Reflect.get(target, property, receiver);
+            if (typeof value !== 'function') {
+                return value;
+            }
+            const counts = fixedCounts || currentStorageOpCounts.getStore() || makeStorageOpCounts();
+            switch(property) {
+                case 'get':
+                    return (keyOrKeys : string|string[], options? : any) => {
+                        counts.gets += 1;
+                        counts.getKeys += Array.isArray(keyOrKeys) ? keyOrKeys.length : 1;
+                        return target.get(keyOrKeys as any, options);
+                    };
+                case 'list':
+                    return async (options? : any) => {
+                        counts.lists += 1;
+                        const entries = await target.list(options);
+                        counts.listedKeys += entries.size;
+                        return entries;
+                    };
+                case 'put':
+                    return (keyOrEntries : string|Record<string,any>, valueOrOptions? : any, options? : any) => {
+                        counts.puts += 1;
+                        if (typeof keyOrEntries === 'string') {
+                            counts.putKeys += 1;
+                            counts.putBytes += keyOrEntries.length + estimateBytes(valueOrOptions);
+                            return target.put(keyOrEntries, valueOrOptions, options);
+                        }
+                        for (const key of Object.keys(keyOrEntries)) {
+                            counts.putKeys += 1;
+                            counts.putBytes += key.length + estimateBytes(keyOrEntries[key]);
+                        }
+                        return target.put(keyOrEntries, valueOrOptions);
+                    };
+                case 'delete':
+                    return (keyOrKeys : string|string[], options? : any) => {
+                        counts.deletes += 1;
+                        counts.deleteKeys += Array.isArray(keyOrKeys) ? keyOrKeys.length : 1;
+                        return target.delete(keyOrKeys as any, options);
+                    };
+                default:
+                    return value.bind(target);
+            }
+        }
+    });
+}
+
+/* Returns the response with the counts so far in the X-Storage-Ops header, and resets them (UserDO side) */
+export function attachStorageOpCounts(response : Response, counts : StorageOpCounts) : Response {
+    const profiledResponse = new Response(response.body, response);
+    profiledResponse.headers.set(STORAGE_OPS_HEADER, JSON.stringify(counts));
+    for (const key of Object.keys(counts) as (keyof StorageOpCounts)[]) {
+        counts[key] = 0;
+    }
+    return profiledResponse;
+}
+
+/*
+    Runs handle() with fresh counts, and reports them in the X-Storage-Ops header of its response (UserDO side).
+    The counts are per request, so concurrent requests to the same UserDO don't count each other's ops.
+    But a flush writes everything that's dirty, so if another request changed state and hasn't flushed yet, its writes are counted here.
+*/
+export async function countStorageOps(handle : () => Promise<Response>) : Promise<Response> {
+    const counts = makeStorageOpCounts();
+    const response = await currentStorageOpCounts.run(counts, handle);
+    return attachStorageOpCounts(response, counts);
+}
+
+const currentProfile = new AsyncLocalStorage<StorageOpsProfile>();
+
+/* Records a round trip to the UserDO against the webhook update being profiled (if any) */
+export function recordUserDOFetch(method : string, requestBytes : number, responseBytes : number, response : Response) {
+    const profile = currentProfile.getStore();
+    if (profile == null) {
+        return;
+    }
+    profile.doFetches[method] = (profile.doFetches[method]||0) + 1;
+    profile.doRequestBytes += requestBytes;
+    profile.doResponseBytes += responseBytes;
+    const storageOps = response.headers.get(STORAGE_OPS_HEADER);
+    if (storageOps != null) {
+        addStorageOpCounts(profile.storage, JSON.parse(storageOps) as StorageOpCounts);
+    }
+}
+
+/* Runs handle() with a fresh profile, and reports the profile in the X-Storage-Ops-Profile header of its response (worker side) */
+export async function profileStorageOps(handle : () => Promise<Response>) : Promise<Response> {
+    const profile : StorageOpsProfile = { doFetches: {}, doRequestBytes: 0, doResponseBytes: 0, storage: makeStorageOpCounts() };
+    const response = await currentProfile.run(profile, handle);
+    const profiledResponse = new Response(response.body, response);
+    profiledResponse.headers.set(STORAGE_OPS_PROFILE_HEADER, JSON.stringify(profile));
+    return profiledResponse;
+}
@@ -1,82 +1,15 @@
 import { logoHack } from "./menus";
+import { CANNED_QUESTIONS_AND_ANSWERS, QUESTION_CODE, QUESTION_KEYS, QUESTION_LOOKUP, QUESTION_NGRAM_INDEX, QUESTION_NGRAM_SIZE, QuestionAnswerSpec } from "./generated/questions_and_answers_data";
 
-export type QUESTION_CODE = 'CAN_I_PARTNER' | 'CAN_I_APPLY_FOR_GRANT'|'CAN_I_CONNECT_WITH_BD_TEAM'|'HOW_CAN_I_BE_RETWEETED'|'HOW_CAN_I_GET_PR_COMMS_SUPPORT'|'WHAT_ARE_THE_BRAND_GUIDELINES'|'I_HAVE_TECHNICAL_ISSUE'|'HOW_CAN_I_HELP_COMMUNITY_GROW';
+/*
+    The questions and answers live in questions_and_answers.toml.
+    generated/questions_and_answers_data.ts is generated from it (along with the lookup tables used by findByQuestion) by:
+        python3 scripts/deployment/generate_questions_and_answers.py
+*/
+export { CANNED_QUESTIONS_AND_ANSWERS, QUESTION_CODE, QuestionAnswerSpec };
 
-export type QuestionAnswerSpec = {
-    code: QUESTION_CODE,
-    question: string,
-    answer: string|string[]
-}
-
-export const CANNED_QUESTIONS_AND_ANSWERS : QuestionAnswerSpec[] = [
-    {
-        "code" : 'CAN_I_PARTNER',
-        "question": "Can I partner with Solana?",
-        "answer": [
-            `As a decentralized network, no one officially represents Solana.`,
-            `The Solana Foundation, which is a neutral entity in the ecosystem, does not do direct partnerships.`
-        ],
-    },
-    {
-        "code" : 'CAN_I_APPLY_FOR_GRANT',
-        "question": "Can I apply for a grant?",
-        "answer": [
-            `You can apply for grants <a href='https://www.solana.org/grants'>here</a>. Our grant process is typically used for funding open-source public goods that benefit everyone.`,
-            `Make sure to check out the growing list of other ecosystem members offering funding for <a href="https://solana.org/grants-funding#ecosystem_funding">different initiatives</a>`
-        ],
-    },
-    {
-        'code': 'CAN_I_CONNECT_WITH_BD_TEAM',
-        'question': 'Can you connect me to the Solana Foundation BD team?',
-        'answer': [
-            `The BD team is typically heads down working on initiatives of their own, so they are not generally available.  However, if there is a specific need you have you can reach out to a Solana Foundation representative.`,
-        ]
-    },
-    {
-        'code': 'HOW_CAN_I_BE_RETWEETED',
-        'question': 'How can we get social media exposure / tweets from the Solana Foundation?',
-        'answer': [
-            `We can't guarantee that your news will be retweeted, but to maximize your chances here are some social media guidelines that give you an idea of what we are looking for:`,
-            `  :bullet: <b>Community Focused</b>: News that focuses on the Solana community forward is more likely to be retweeted by our account.`,
-            `  :bullet: <b>Forward-Looking</b>: We are more likely to re-tweet content that highlights how Solana is breaking new ground and how the ecosystem and community is growing.`,
-            `  :bullet: <b>Visually Interesting</b>: Most content we retweet contains either a compelling image, video, or link. Plain text is not as compelling.`,
-        ]
-    },
-    {
-        'code': 'HOW_CAN_I_GET_PR_COMMS_SUPPORT',
-        'question': 'We have a major release coming up, can you help us with PR/comms?',
-        'answer': [
-            "We can't guarantee personalized PR support for any specific project or development, but to maximize your changes of success <a href='https://solana.com/branding'>here</a> is a PR 101 Kit from our Head of Comms."
-        ]
-    },
-    {
-        'code': 'WHAT_ARE_THE_BRAND_GUIDELINES',
-        'question': 'What are your brand guidelines? Can I use the Solana logo?',
-        'answer': [
-            `Check out our brand guidelines and assets <a href='https://solana.com/branding'>here</a>.`
-        ]
-    },
-    {
-        'code': 'I_HAVE_TECHNICAL_ISSUE',
-        'question': 'I have a technical issue. What resources are available?',
-        'answer': [
-            `:bullet: <a href="https://solana.stackexchange.com/">Solana Stack Exchange</a>`,            
-            `:bullet: <a href="https://solana.com/developers">Official Solana Development Resource Portal</a>`,
-            `:bullet: <a href="https://solana.com/docs/intro/dev">Getting Started With Solana Development</a>`,
-            `:bullet: <a href="https://solanacookbook.com/">Solana Cookbook</a>`,
-            `:bullet: <a href='https://discord.com/invite/kBbATFA7PW'>Solana Tech Discord Server</a>`,
-        ]
-    },
-    {
-        'code': 'HOW_CAN_I_HELP_COMMUNITY_GROW',
-        'question': 'How Can I Help The Solana Community Grow?',
-        'answer': [
-            `Interested in helping the Solana community grow?  You can check out a playbook and apply for a small microgrant for individual meetups and events <a href="https://www.solana.com/events">here</a>.`,
-            '',
-            `If you are looking to execute a larger initiative, you can apply for a <a href="https://www.solana.org/grants">grant</a> under the funding category 'Community'.`
-        ]
-    }
-]
+/* How alike (Dice coefficient over character n-grams) a message has to be to a question to count as asking it */
+const NEAR_MATCH_MIN_SIMILARITY = 0.8;
 
 export function listQuestions() : string[] {
     return CANNED_QUESTIONS_AND_ANSWERS.map(q => q.question);
@@ -112,12 +45,50 @@ export function formatQuestion(question : string) {
     return `${logoHack()}<b>Question</b>: ${question}`;
 }
 
+/* Must match normalize_question in scripts/deployment/generate_questions_and_answers.py */
+export function normalizeQuestion(question : string) : string {
+    return question.toLowerCase().replace(/[^\p{L}\p{N}]+/gu, " ").trim();
+}
+
+/* Must match question_ngrams in scripts/deployment/generate_questions_and_answers.py */
+export function questionNGrams(normalizedQuestion : string) : Set<string> {
+    const padded = ` ${normalizedQuestion} `;
+    const ngrams = new Set<string>();
+    for (let i = 0; i + QUESTION_NGRAM_SIZE <= padded.length; i++) {
+        ngrams.add(padded.substring(i, i + QUESTION_NGRAM_SIZE));
+    }
+    return ngrams;
+}
+
 export function findByQuestion(question : string) : QuestionAnswerSpec|null {
-    question = question.trim();
-    for (const q of CANNED_QUESTIONS_AND_ANSWERS) {
-        if (q.question.trim() === question) {
-            return q;
+    const normalizedQuestion = normalizeQuestion(question);
+    if (normalizedQuestion.length === 0) {
+        return null;
+    }
+    const index = QUESTION_LOOKUP.get(normalizedQuestion);
+    if (index != null) {
+        return CANNED_QUESTIONS_AND_ANSWERS[index];
+    }
+    return findNearMatch(normalizedQuestion);
+}
+
+function findNearMatch(normalizedQuestion : string) : QuestionAnswerSpec|null {
+    /* Only the phrasings sharing at least one n-gram with the message are scored */
+    const ngrams = questionNGrams(normalizedQuestion);
+    const sharedNGrams = new Map<number,number>();
+    for (const ngram of ngrams) {
+        for (const keyIndex of QUESTION_NGRAM_INDEX.get(ngram) || []) {
+            sharedNGrams.set(keyIndex, (sharedNGrams.get(keyIndex) || 0) + 1);
+        }
+    }
+    let bestKeyIndex : number|null = null;
+    let bestSimilarity = NEAR_MATCH_MIN_SIMILARITY;
+    for (const [keyIndex, shared] of sharedNGrams) {
+        const similarity = (2 * shared) / (ngrams.size + QUESTION_KEYS[keyIndex].ngrams);
+        if (similarity >= bestSimilarity) {
+            bestKeyIndex = keyIndex;
+            bestSimilarity = similarity;
         }
     }
-    return null;
+    return bestKeyIndex == null ? null : CANNED_QUESTIONS_AND_ANSWERS[QUESTION_KEYS[bestKeyIndex].question];
 }
\ No newline at end of file
@@ -1,4 +1,4 @@
-import { storeSessionObj } from "../durable_objects/user/userDO_interop";
+import { scheduleMessageDeletion, storeSessionObj } from "../durable_objects/user/userDO_interop";
 import { Env } from "../env";
 import { MenuCode } from "../menus";
 import { subInEmojis } from "../telegram";
@@ -22,7 +22,6 @@ export class ReplyQuestion {
     
     question : string
     replyQuestionCode : ReplyQuestionCode
-    context : FetchEvent
     parseMode: 'HTML'|'MarkdownV2'
     timeoutMS : number|undefined
     hasNextSteps : boolean
@@ -34,11 +33,9 @@ export class ReplyQuestion {
 
     constructor(question : string,
         replyQuestionCode: ReplyQuestionCode, 
-        context : FetchEvent,
         opts ?: ReplyQuestionOptions) {
         this.question = subInEmojis(question);
         this.replyQuestionCode = replyQuestionCode;
-        this.context = context;
         opts = opts || {};
         this.hasNextSteps = opts.callback != null;
         this.linkedMessageID = opts?.callback?.linkedMessageID;
@@ -48,7 +45,7 @@ export class ReplyQuestion {
         this.timeoutMS = opts?.timeoutMS;
     }
     async sendReplyQuestionToTG(telegramUserID : number, chatID : number, env : Env) : Promise<void> {
-        const tgSentMessageInfo = await sendQuestionToTG(chatID, this.question, this.context, env, this.parseMode, this.timeoutMS);
+        const tgSentMessageInfo = await sendQuestionToTG(chatID, this.question, env, this.parseMode);
         if (!tgSentMessageInfo.success) {
             return;
         }
@@ -58,7 +55,17 @@ export class ReplyQuestion {
         // How can I mitigate this risk? 
         // TODO: how to resolve possibility that user could respond before storage is completed?  
         // Some kind of incoming message blocking here?  But per-user, so we don't lock the whole app.    
-        await storeSessionObj<ReplyQuestionData>(telegramUserID, chatID, tgSentMessageInfo.messageID, replyQuestionCallbackData, "replyQuestion", env);
+        const storeSessionPromise = storeSessionObj<ReplyQuestionData>(telegramUserID, chatID, tgSentMessageInfo.messageID, replyQuestionCallbackData, "replyQuestion", env);
+        if (this.timeoutMS != null && this.timeoutMS > 0) {
+            // the UserDO's alarm deletes the question once it times out, so this invocation doesn't wait around for it
+            await Promise.all([
+                storeSessionPromise,
+                scheduleMessageDeletion(telegramUserID, chatID, tgSentMessageInfo.messageID, Date.now() + this.timeoutMS, env)
+            ]);
+        }
+        else {
+            await storeSessionPromise;
+        }
     }
     createReplyQuestionSessionObject(tgSentMessageInfo : SuccessfulTgMessageSentInfo) : ReplyQuestionData {
         if (this.replyQuestionHasNextSteps()) {
@@ -0,0 +1,74 @@
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+from tqdm import tqdm # pip install tqdm
+
+from log_analytics.daily_report import DailyReport, day_of, write_tables
+from log_analytics.logpush_records import find_logpush_files, iter_logpush_events
+
+# Daily reports over Workers Trace Event logpush archives (gzipped NDJSON, e.g. synced down from the R2 or S3 bucket logpush writes to):
+#   python3 scripts/analyze_logpush.py --input logpush/ --output_dir logpush_reports
+# Files are analyzed in parallel, one per process, and each process streams its file, so memory stays flat however big the archive is.
+# Writes daily_volume, daily_latency, daily_exceptions and slowest_updates tables, as CSV or (--format parquet, needs pyarrow) Parquet.
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--input", type = str, nargs = "+", required = True, help = "Logpush files, directories or globs")
+    parser.add_argument("--output_dir", type = str, required = False, default = "logpush_reports")
+    parser.add_argument("--format", type = str, required = False, default = "csv", choices = [ "csv", "parquet" ])
+    parser.add_argument("--workers", type = int, required = False, default = os.cpu_count() or 1)
+    parser.add_argument("--top_slowest", type = int, required = False, default = 20, help = "Slowest updates to keep per day")
+    parser.add_argument("--since", type = str, required = False, default = None, help = "First day to include (YYYY-MM-DD, UTC)")
+    parser.add_argument("--until", type = str, required = False, default = None, help = "Last day to include (YYYY-MM-DD, UTC)")
+    return parser.parse_args()
+
+def analyze_file(filepath : str, top_slowest : int, since : Optional[str], until : Optional[str]) -> DailyReport:
+    report = DailyReport(top_slowest = top_slowest)
+    for (event, error_messages) in iter_logpush_events(filepath):
+        day = day_of(event.timestamp_ms)
+        if (since is not None and day < since) or (until is not None and day > until):
+            continue
+        report.record(event, error_messages)
+    return report
+
+def analyze_files(filepaths : List[str], workers : int, top_slowest : int, since : Optional[str], until : Optional[str]) -> DailyReport:
+    report = DailyReport(top_slowest = top_slowest)
+    progress = tqdm(total = len(filepaths), unit = " files")
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = { executor.submit(analyze_file, filepath, top_slowest, since, until): filepath for filepath in filepaths }
+        for future in as_completed(futures):
+            try:
+                report.merge(future.result())
+            except Exception as e:
+                progress.write(f"Skipping {futures[future]}: {e}")
+            progress.update(1)
+            progress.set_postfix(events = report.events)
+    progress.close()
+    return report
+
+def print_report_summary(report : DailyReport, filepaths : List[str]):
+    tables = report.tables()
+    print("===LOGPUSH REPORT===")
+    print(f"{report.events} events")
+    for row in tables['daily_latency']:
+        if not row['label'].startswith("route "):
+            print(f"  {row['day']} {row['label']}: {row['wall_count']} updates, p50 {row['wall_p50_ms']}ms, p99 {row['wall_p99_ms']}ms, cpu p99 {row['cpu_p99_ms']}ms")
+    exceptions = sorted(tables['daily_exceptions'], key = lambda row: -row['count'])[:5]
+    if exceptions:
+        print("most frequent exceptions:")
+        for row in exceptions:
+            print(f"  {row['day']} {row['count']} x {row['signature']}")
+    print("wrote:")
+    for filepath in filepaths:
+        print(f"  {filepath}")
+
+if __name__ == "__main__":
+    args = parse_args()
+    filepaths = find_logpush_files(args.input)
+    if not filepaths:
+        raise Exception(f"No logpush files found in: {' '.join(args.input)}")
+    report = analyze_files(filepaths, args.workers, args.top_slowest, args.since, args.until)
+    written = write_tables(report.tables(), args.output_dir, args.format)
+    print_report_summary(report, written)
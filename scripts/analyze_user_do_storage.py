@@ -0,0 +1,52 @@
+import glob, json, os
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+from dev.local_dev_common import LOCAL_CLOUDFLARE_WORKER_PORT, is_port_in_use
+from state_export.snapshot import LOCAL_DO_STATE_GLOB, read_local_durable_object, read_snapshot
+from state_export.user_do_storage import analyze_user_do, apply_compaction_plan_to_sqlite, load_user_do_storage, make_compaction_plan, print_storage_report
+
+# Reports how much UserDO storage is taken up by session state, and how much of it the worker can never use again.
+# Reads a snapshot from 'export_state.py local_do', or the local wrangler dev state directly.
+# Writes a compaction plan (--plan), which can be applied to the local state in bulk (--apply).
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--snapshot", type = str, required = False, default = None, help = "An export_state.py local_do snapshot. Defaults to reading .wrangler/state")
+    parser.add_argument("--state_glob", type = str, required = False, default = LOCAL_DO_STATE_GLOB)
+    parser.add_argument("--keep_latest_sessions", type = int, required = False, default = None, help = "Also compact sessions older than the newest N per user")
+    parser.add_argument("--top", type = int, required = False, default = 20)
+    parser.add_argument("--plan", type = str, required = False, default = None, help = "Write the compaction plan here")
+    parser.add_argument("--apply", type = str, required = False, default = None, help = "Apply a compaction plan to the local state (stop wrangler dev first)")
+    return parser.parse_args()
+
+def sqlite_filepaths_by_object_id(state_glob : str):
+    return { os.path.splitext(os.path.basename(filepath))[0]: filepath for filepath in glob.glob(state_glob) }
+
+def read_local_state(state_glob : str):
+    filepaths = sorted(glob.glob(state_glob))
+    with ThreadPoolExecutor(max_workers = 8) as executor:
+        for records in executor.map(read_local_durable_object, filepaths):
+            yield from records
+
+def apply_plan(args):
+    if is_port_in_use(LOCAL_CLOUDFLARE_WORKER_PORT):
+        raise Exception(f"Something is listening on {LOCAL_CLOUDFLARE_WORKER_PORT}. Stop wrangler dev before compacting its storage.")
+    with open(args.apply, "r") as f:
+        plan = json.load(f)
+    deleted = apply_compaction_plan_to_sqlite(plan, sqlite_filepaths_by_object_id(args.state_glob))
+    print(f"Deleted {deleted} of {plan['keys_deleted']} keys in the plan")
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.apply is not None:
+        apply_plan(args)
+    else:
+        records = read_snapshot(args.snapshot) if args.snapshot is not None else read_local_state(args.state_glob)
+        analyses = [ analyze_user_do(storage, args.keep_latest_sessions) for storage in load_user_do_storage(records) ]
+        print_storage_report(analyses, top = args.top)
+        if args.plan is not None:
+            plan = make_compaction_plan(analyses, source = args.snapshot or args.state_glob, keep_latest_sessions = args.keep_latest_sessions)
+            with open(args.plan, "w") as f:
+                json.dump(plan, f, indent = 2)
+            print(f"\nWrote a plan to delete {plan['keys_deleted']} keys ({plan['bytes_freed']/1e6:.2f}MB) to {args.plan}")
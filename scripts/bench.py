@@ -0,0 +1,88 @@
+import asyncio, json, subprocess, time
+from argparse import ArgumentParser
+from typing import Any, Dict
+
+from dev.latency_stats import print_summary
+from dev.local_dev_common import *
+from dev.webhook_load import DEFAULT_MIX, generate_update_mix, replay_updates
+from dev.worker_sources import read_canned_questions, read_commands, read_menu_codes
+from wrangler_common import get_secret
+
+# Replays a fixed, seeded mix of webhook updates against a local worker and reports latency per messageType.
+# The worker should be running against the fake telegram server (start_dev_box.py --fake_telegram_server true).
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--count", type = int, required = False, default = 2000)
+    parser.add_argument("--warmup", type = int, required = False, default = 100)
+    parser.add_argument("--concurrency", type = int, required = False, default = 16)
+    parser.add_argument("--users", type = int, required = False, default = 200)
+    parser.add_argument("--seed", type = int, required = False, default = 1)
+    parser.add_argument("--worker_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    parser.add_argument("--bot_id", type = int, required = False, default = FAKE_TELEGRAM_BOT_ID)
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    parser.add_argument("--output", type = str, required = False, default = "bench_results.json")
+    parser.add_argument("--compare", type = str, required = False, default = None, help = "A previous --output file to diff against")
+    return parser.parse_args()
+
+def get_git_commit() -> str:
+    result = subprocess.run("git rev-parse --short HEAD", shell = True, capture_output = True, text = True)
+    return result.stdout.strip() or "unknown"
+
+def make_updates(args, seed : int, count : int):
+    return generate_update_mix(seed = seed,
+                               count = count,
+                               num_users = args.users,
+                               bot_id = args.bot_id,
+                               menu_codes = read_menu_codes(),
+                               canned_questions = read_canned_questions(),
+                               commands = read_commands())
+
+def run_bench(args) -> Dict[str,Any]:
+    secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env)
+    if args.warmup > 0:
+        print(f"Warming up with {args.warmup} updates")
+        asyncio.run(replay_updates(make_updates(args, args.seed + 1, args.warmup), args.worker_url, secret_token, args.bot_id, args.concurrency))
+    updates = make_updates(args, args.seed, args.count)
+    print(f"Replaying {len(updates)} updates with concurrency {args.concurrency}")
+    stats, elapsed_s = asyncio.run(replay_updates(updates, args.worker_url, secret_token, args.bot_id, args.concurrency))
+    return {
+        'meta': {
+            'git_commit': get_git_commit(),
+            'timestamp': int(time.time()),
+            'seed': args.seed,
+            'count': args.count,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+            'users': args.users,
+            'mix': DEFAULT_MIX,
+            'worker_url': args.worker_url,
+            'elapsed_s': round(elapsed_s, 3)
+        },
+        'results': stats.summarize(elapsed_s)
+    }
+
+def print_comparison(baseline : Dict[str,Any], current : Dict[str,Any]):
+    print(f"Compared to {baseline['meta']['git_commit']} (negative is better for latency):")
+    for label, row in current['results'].items():
+        base_row = baseline['results'].get(label)
+        if base_row is None:
+            continue
+        deltas = []
+        for column in ['p50_ms', 'p95_ms', 'p99_ms', 'requests_per_s', 'error_rate']:
+            if row.get(column) is None or not base_row.get(column):
+                continue
+            change = 100.0 * (row[column] - base_row[column]) / base_row[column]
+            deltas.append(f"{column} {change:+.1f}%")
+        print(f"  {label}: " + ", ".join(deltas))
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_bench(args)
+    print_summary(report['results'], title = "messageType")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent = 1, sort_keys = True)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(json.load(f), report)
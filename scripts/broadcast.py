@@ -0,0 +1,199 @@
+import asyncio, json, os, time
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Set
+from tqdm import tqdm # pip install tqdm
+
+from state_export.snapshot import read_snapshot
+from telegram_client import AsyncTelegramClient, TelegramAPIError, backoff_s
+from token_bucket import TokenBucket
+from wrangler_common import make_telegram_bot_url
+
+# Sends one message to a whole audience through the Bot API, staying under Telegram's limits.
+#   - the audience is a file of chat IDs (one per line), or the users in an 'export_state.py local_do' snapshot
+#   - sends go through a token bucket (--rate messages/s overall). A 429 pauses every sender for its retry_after.
+#   - progress goes to a journal next to --journal. Re-running with the same journal skips chats that were already
+#     sent to (or that failed for good), so a crashed run can be resumed without sending anything twice.
+# Chats that were in flight when a run died are 'uncertain': they're skipped on resume unless --resend_uncertain is given.
+# Try it against the fake telegram server first: start_fake_telegram_server.py --emulate true, then --bot_url http://127.0.0.1:8081/botX
+
+MAX_ATTEMPTS = 5
+# Telegram's limit is ~30/s overall, leave some headroom
+DEFAULT_RATE = 25.0
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    parser.add_argument("--bot_url", type = str, required = False, default = None, help = "Overrides the Bot API url for --env")
+    parser.add_argument("--users_file", type = str, required = False, default = None, help = "One chat ID per line")
+    parser.add_argument("--snapshot", type = str, required = False, default = None, help = "An export_state.py local_do snapshot")
+    parser.add_argument("--text", type = str, required = False, default = None)
+    parser.add_argument("--text_file", type = str, required = False, default = None)
+    parser.add_argument("--parse_mode", type = str, required = False, default = "HTML")
+    parser.add_argument("--journal", type = str, required = True)
+    parser.add_argument("--rate", type = float, required = False, default = DEFAULT_RATE, help = "messages/s overall")
+    parser.add_argument("--concurrency", type = int, required = False, default = 16)
+    parser.add_argument("--resend_uncertain", action = "store_true")
+    parser.add_argument("--dry_run", action = "store_true")
+    return parser.parse_args()
+
+def read_audience(args) -> List[int]:
+    chat_ids : List[int] = []
+    if args.users_file is not None:
+        with open(args.users_file, "r") as f:
+            for line in f:
+                line = line.split(",")[0].strip()
+                if line and not line.startswith("#"):
+                    chat_ids.append(int(line))
+    if args.snapshot is not None:
+        # the UserDO keeps the most recent chatID (and the user ID, which is the chat ID of a private chat)
+        users : Dict[str,Dict[str,Any]] = {}
+        for record in read_snapshot(args.snapshot):
+            if record['key'] in ('chatID', 'telegramUserID') and isinstance(record.get('value'), int):
+                users.setdefault(record['object_id'], {})[record['key']] = record['value']
+        chat_ids += [ user.get('chatID') or user['telegramUserID'] for user in users.values() ]
+    if args.users_file is None and args.snapshot is None:
+        raise Exception("Pass --users_file and/or --snapshot")
+    return list(dict.fromkeys(chat_ids)) # deduplicated, in order
+
+def read_text(args) -> str:
+    if args.text_file is not None:
+        with open(args.text_file, "r", encoding = "utf-8") as f:
+            return f.read()
+    if args.text is None:
+        raise Exception("Pass --text or --text_file")
+    return args.text
+
+class BroadcastJournal:
+    # Append-only JSON lines: {"chat_id", "status": "sending" | "sent" | "failed", ...}
+
+    def __init__(self, filepath : str):
+        self.filepath = filepath
+        self.done : Set[int] = set()
+        self.uncertain : Set[int] = set()
+        if os.path.exists(filepath):
+            self._load()
+        self.file = open(filepath, "a", encoding = "utf-8")
+
+    def _load(self):
+        sending : Set[int] = set()
+        with open(self.filepath, "r", encoding = "utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # a line cut short by a crash
+                if entry['status'] == 'sending':
+                    sending.add(entry['chat_id'])
+                else:
+                    self.done.add(entry['chat_id'])
+        self.uncertain = sending - self.done
+
+    def write(self, entry : Dict[str,Any]):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class Broadcast:
+
+    def __init__(self, client : AsyncTelegramClient, text : str, parse_mode : str, journal : BroadcastJournal, rate : float):
+        self.client = client
+        self.text = text
+        self.parse_mode = parse_mode
+        self.journal = journal
+        self.bucket = TokenBucket(rate, burst = max(1.0, rate / 5))
+        self.counts = { 'sent': 0, 'failed': 0, '429': 0, 'retried': 0 }
+        self.failures : Dict[str,int] = {}
+
+    async def send(self, chat_id : int, progress : tqdm):
+        attempt, journaled = 0, False
+        while True:
+            await self.bucket.acquire()
+            if not journaled:
+                # written right before the first request, so only chats that may have been sent to end up 'uncertain'
+                self.journal.write({ 'chat_id': chat_id, 'status': 'sending', 't': time.time() })
+                journaled = True
+            try:
+                result = await self.client.call('sendMessage', { 'chat_id': chat_id, 'text': self.text, 'parse_mode': self.parse_mode }, max_retries = 0)
+                self.journal.write({ 'chat_id': chat_id, 'status': 'sent', 'message_id': result.get('message_id') })
+                self.counts['sent'] += 1
+                break
+            except TelegramAPIError as e:
+                if e.status == 429:
+                    # over the limit: everyone waits, not just this sender. Every sender in flight gets the same 429, so the wait is only applied once
+                    self.counts['429'] += 1
+                    self.bucket.pause(float(e.retry_after or 1))
+                    continue
+                if e.status < 500:
+                    # blocked by the user, chat not found, etc: retrying won't help
+                    self._fail(chat_id, e.description or f"HTTP {e.status}")
+                    break
+                reason = e.description or f"HTTP {e.status}"
+            except Exception as e:
+                reason = type(e).__name__
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                # Telegram may or may not have the message, so the chat stays 'sending' (uncertain) in the journal
+                self.counts['failed'] += 1
+                self.failures[reason] = self.failures.get(reason, 0) + 1
+                break
+            self.counts['retried'] += 1
+            await asyncio.sleep(backoff_s(attempt))
+        progress.update(1)
+        progress.set_postfix(self.counts, refresh = False)
+
+    def _fail(self, chat_id : int, reason : str):
+        self.journal.write({ 'chat_id': chat_id, 'status': 'failed', 'reason': reason })
+        self.counts['failed'] += 1
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    async def run(self, chat_ids : List[int], concurrency : int):
+        queue : "asyncio.Queue[int]" = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(chat_id)
+        progress = tqdm(total = len(chat_ids), unit = " msgs")
+
+        async def sender():
+            while not queue.empty():
+                await self.send(queue.get_nowait(), progress)
+
+        try:
+            await asyncio.gather(*[ sender() for _ in range(concurrency) ])
+        finally:
+            progress.close()
+
+def print_broadcast_report(broadcast : Broadcast, elapsed_s : float):
+    print("")
+    print("===BROADCAST===")
+    print("")
+    counts = broadcast.counts
+    print(f"sent {counts['sent']}, failed {counts['failed']} in {elapsed_s:.1f}s ({counts['sent'] / max(elapsed_s, 1e-9):.1f} msgs/s)")
+    print(f"429s: {counts['429']}, retries: {counts['retried']}")
+    for (reason, count) in sorted(broadcast.failures.items(), key = lambda item: -item[1]):
+        print(f"  {count} x {reason}")
+
+async def do_broadcast(args, chat_ids : List[int], text : str, journal : BroadcastJournal):
+    bot_url = args.bot_url or make_telegram_bot_url(args.env)
+    async with AsyncTelegramClient(bot_url, max_connections = args.concurrency) as client:
+        broadcast = Broadcast(client, text, args.parse_mode, journal, args.rate)
+        start = time.monotonic()
+        try:
+            await broadcast.run(chat_ids, args.concurrency)
+        finally:
+            print_broadcast_report(broadcast, time.monotonic() - start)
+
+if __name__ == "__main__":
+    args = parse_args()
+    text = read_text(args)
+    audience = read_audience(args)
+    journal = BroadcastJournal(args.journal)
+    skip = journal.done if args.resend_uncertain else (journal.done | journal.uncertain)
+    chat_ids = [ chat_id for chat_id in audience if chat_id not in skip ]
+    print(f"Audience: {len(audience)} chats. Already done: {len(journal.done & set(audience))}. Uncertain: {len(journal.uncertain & set(audience))}{' (resending)' if args.resend_uncertain else ' (skipping)'}.")
+    print(f"Sending to {len(chat_ids)} chats at {args.rate}/s, ETA {len(chat_ids) / args.rate / 60:.1f} minutes")
+    try:
+        if not args.dry_run and chat_ids:
+            asyncio.run(do_broadcast(args, chat_ids, text, journal))
+    finally:
+        journal.close()
@@ -1,30 +1,11 @@
-COMMANDS = [
-    {
-        'command': 'start',
-        'description': 'Starts a conversation with this bot'
-    },
-    {
-        'command': 'frequently_asked_questions',
-        'description': 'Get answers for frequently asked questions.'
-    },      
-    {
-        'command': 'dev_support',
-        'description': 'A starting point for Solana technical resources.'
-    }, 
-    {
-        'command': 'community',
-        'description': 'Community building and resources.'
-    }, 
-    {
-        'command': 'useful_links',
-        'description': 'Links to useful resources about Solana.'
-    },    
-    {
-        'command': 'biz_rel',
-        'description': 'Business Relations with the Solana foundation.'
-    },
-    {
-        'command': 'marketing_pr_branding',
-        'description': 'Marketing, PR, and Solana branding guidelines.'
-    },                     
-]
+import json
+from typing import Dict, List
+
+# The bot's commands are defined in questions_and_answers.toml.
+# Run scripts/deployment/generate_questions_and_answers.py after changing them.
+
+BOT_COMMANDS_FILE = "./generated/bot_commands.json"
+
+def read_bot_commands() -> List[Dict[str,str]]:
+    with open(BOT_COMMANDS_FILE, "r", encoding = "utf-8") as f:
+        return json.load(f)
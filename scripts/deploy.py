@@ -1,13 +1,17 @@
-import requests
+import sys, time
 from argparse import ArgumentParser
+from typing import List
 
 from deployment.bot_configure_info import configure_bot_info
 from deployment.wrangler_push_secrets import push_secrets
 from deployment.bot_configure_commands import configure_bot_commands
-from deployment.bot_configure_webhook import configure_webhook
+from deployment.bot_configure_webhook import DEFAULT_WEBHOOK_MAX_CONNECTIONS, configure_webhook
 from deployment.wrangler_deploy_worker import wrangler_deploy
 from deployment.bot_migrate_to_telegram_servers import migrate_telegram_bot_telegram_servers
-from wrangler_common import get_secret, do_wrangler_login, make_telegram_api_method_url, print_wrangler_environment_variables, wrangler_whoami
+from deployment.generate_questions_and_answers import generate_questions_and_answers
+from deployment.upload_photos import upload_photos
+from deployment.deploy_plan import apply_plan, make_deploy_plan, print_plan, print_timing_breakdown, select_steps
+from wrangler_common import get_secret, do_wrangler_login, get_env_telegram_client, print_wrangler_environment_variables, wrangler_whoami
 
 def do_you_want_to(question : str) -> bool:
     response = input(question + " Y/N: ").lower().strip()
@@ -21,6 +25,11 @@ def do_you_want_to(question : str) -> bool:
 def parse_args():
     parser = ArgumentParser()
     parser.add_argument("--env", required = True, type = str)
+    # interactive: asks before each step.  plan: prints what apply would run.  apply: runs the plan without asking, with independent steps in parallel
+    parser.add_argument("--mode", required = False, type = str, default = "interactive", choices = ["interactive", "plan", "apply"])
+    parser.add_argument("--skip", required = False, type = str, action = "append", default = [], help = "A step to leave out of the plan. May be repeated.")
+    parser.add_argument("--max_workers", required = False, type = int, default = 8)
+    parser.add_argument("--webhook_max_connections", required = False, type = int, default = DEFAULT_WEBHOOK_MAX_CONNECTIONS, help = "See 'webhook_monitor.py tune'")
     return parser.parse_args()
 
 def get_bot_token(env : str):
@@ -28,14 +37,13 @@ def get_bot_token(env : str):
     return bot_token
 
 def maybe_delete_webhook(env : str):
-    url = make_telegram_api_method_url('deleteWebhook', env)
     response = input("Do you want to delete the webhook?").lower().strip()
     if response == 'y':
-        requests.post(url)
+        get_env_telegram_client(env).call('deleteWebhook')
     else:
         print("Ok! Continuing onwards.")
 
-def deploy(env : str):
+def deploy(env : str, webhook_max_connections : int = DEFAULT_WEBHOOK_MAX_CONNECTIONS):
 
     if do_you_want_to("Wrangler login?"):
         do_wrangler_login()
@@ -44,19 +52,26 @@ def deploy(env : str):
 
     ask_to_verify_settings(env)
 
+    # the worker and the bot commands are both built from questions_and_answers.toml
+    generate_questions_and_answers()
+
+    if do_you_want_to("Migrate bot to telegram servers?"):
+        migrate_telegram_bot_telegram_servers(env)
+
+    # file_ids are per bot, so this must run against telegram's servers (after migrating the bot, if it's on a local server)
+    if do_you_want_to("Upload new or changed photos (the worker bundles their file_ids)?"):
+        upload_photos(env)
+
     if do_you_want_to("Deploy wrangler worker?"):
         wrangler_deploy(env, dry = False)
 
     if do_you_want_to("Push secrets?"):
         push_secrets(env)
 
-    if do_you_want_to("Migrate bot to telegram servers?"):
-        migrate_telegram_bot_telegram_servers(env)
-
     # Environment variables should get pushed with the wrangler.toml
     
     if do_you_want_to("Configure webhook?"):
-        configure_webhook(env)
+        configure_webhook(env, webhook_max_connections)
 
     if do_you_want_to("Configure bot commands?"):
         configure_bot_commands(env)
@@ -65,6 +80,19 @@ def deploy(env : str):
         configure_bot_info(env)
 
 
+def plan_and_apply(env : str, mode : str, skip : List[str], max_workers : int, webhook_max_connections : int = DEFAULT_WEBHOOK_MAX_CONNECTIONS):
+    plan = select_steps(make_deploy_plan(env, webhook_max_connections), skip)
+    print_plan(plan, env)
+    if mode == "plan":
+        return
+    wrangler_whoami()
+    print_wrangler_environment_variables(env)
+    start = time.perf_counter()
+    results = apply_plan(plan, max_workers = max_workers)
+    print_timing_breakdown(results, time.perf_counter() - start)
+    if any(result.status != 'ok' for result in results):
+        sys.exit(1)
+
 def ask_to_verify_login():
     wrangler_whoami()
     response = input("Here's your wrangler login.  Does it look correct? Y/N: ").lower().strip()
@@ -80,4 +108,7 @@ def ask_to_verify_settings(env : str):
 if __name__ == "__main__":
     args = parse_args()
     env = args.env.strip()
-    deploy(env)
\ No newline at end of file
+    if args.mode == "interactive":
+        deploy(env, args.webhook_max_connections)
+    else:
+        plan_and_apply(env, args.mode, args.skip, args.max_workers, args.webhook_max_connections)
\ No newline at end of file
@@ -1,25 +1,21 @@
-import requests
-from wrangler_common import get_environment_variable, make_telegram_api_method_url
+from wrangler_common import get_environment_variable, get_env_telegram_client
 
 
 def configure_bot_info(env : str):
-    
-    
+    configure_bot_name(env)
+    configure_bot_description(env)
+    configure_bot_short_description(env)
+
+def configure_bot_name(env : str):
     bot_displayname = get_environment_variable("TELEGRAM_BOT_DISPLAY_NAME", env)
     bot_instance_displayname = get_environment_variable("TELEGRAM_BOT_INSTANCE_DISPLAY_NAME", env)
     bot_fullname = f"{bot_displayname} - {bot_instance_displayname}"
-    setmyname_url = make_telegram_api_method_url("setMyName", env)
-    response = requests.post(setmyname_url, json = { "name": bot_fullname })
-    if not response.ok:
-        raise Exception(f"Problem with {setmyname_url}")
+    get_env_telegram_client(env).call("setMyName", { "name": bot_fullname })
 
+def configure_bot_description(env : str):
     bot_tagline = get_environment_variable("TELEGRAM_BOT_TAGLINE", env)
-    setmydescription_url = make_telegram_api_method_url("setMyDescription", env)
-    response = requests.post(setmydescription_url, json = { "description": bot_tagline })
-    if not response.ok:
-        raise Exception(f"Problem with {setmydescription_url}")
+    get_env_telegram_client(env).call("setMyDescription", { "description": bot_tagline })
 
-    setmyshortdescription_url = make_telegram_api_method_url("setMyShortDescription", env)
-    response = requests.post(setmyshortdescription_url, json = { "short_description": bot_tagline })
-    if not response.ok:
-        raise Exception(f"Problem with {setmydescription_url}")
\ No newline at end of file
+def configure_bot_short_description(env : str):
+    bot_tagline = get_environment_variable("TELEGRAM_BOT_TAGLINE", env)
+    get_env_telegram_client(env).call("setMyShortDescription", { "short_description": bot_tagline })
\ No newline at end of file
@@ -1,30 +1,26 @@
 import json
-import requests
-from wrangler_common import determine_workers_url, get_secret, make_telegram_api_method_url
+from typing import Any, Dict
+from wrangler_common import determine_workers_url, get_env_telegram_client, get_secret
 
+# How many webhook requests Telegram keeps in flight at once (1-100).  See webhook_monitor.py tune for picking a value.
+DEFAULT_WEBHOOK_MAX_CONNECTIONS = 100
+WEBHOOK_ALLOWED_UPDATES = ['message', 'inline_query', 'chosen_inline_result', 'callback_query']
 
-def configure_webhook(env : str):
-    webhook_secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", env)
-    webhook_url = determine_workers_url(env)
-    data = {
+def make_set_webhook_params(webhook_url : str, webhook_secret_token : str, max_connections : int) -> Dict[str,Any]:
+    if not (1 <= max_connections <= 100):
+        raise Exception(f"max_connections must be between 1 and 100, was: {max_connections}")
+    return {
         'url': webhook_url,
         'secret_token': webhook_secret_token,
-        'max_connections': 100,
-        'allowed_updates': ['message', 'inline_query', 'chosen_inline_result', 'callback_query']
-    }
-    headers = {
-        "Content-Type": "application/json"
+        'max_connections': max_connections,
+        'allowed_updates': WEBHOOK_ALLOWED_UPDATES
     }
-    request_url = make_telegram_api_method_url('setWebhook', env)
-    response = requests.post(request_url, data=json.dumps(data), headers = headers)
-    print_response(response)
-    if (not response.ok):
-        raise Exception("Failed to set webhook")
 
-def print_response(response):
-    print("\n**Response**:", response)
-    print("\n**Headers**:", json.dumps(dict(response.headers), indent = 1))
-    if response.headers['Content-Type'].startswith("application/json"):
-        print("\n**Content**:", json.dumps(json.loads(response.content.decode('utf-8')), indent = 1))
-    else:
-        print("\n**Content**:", response.content)
+def configure_webhook(env : str, max_connections : int = DEFAULT_WEBHOOK_MAX_CONNECTIONS):
+    webhook_secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", env)
+    webhook_url = determine_workers_url(env)
+    data = make_set_webhook_params(webhook_url, webhook_secret_token, max_connections)
+    client = get_env_telegram_client(env)
+    print("\n**setWebhook**:", json.dumps(client.call('setWebhook', data), indent = 1))
+    webhook_info = client.call('getWebhookInfo')
+    print("\n**getWebhookInfo**:", json.dumps(webhook_info, indent = 1))
@@ -0,0 +1,192 @@
+import gzip, json, os, shutil, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from deployment.wrangler_deploy_worker import wrangler_deploy
+
+# Measures the worker bundle that 'wrangler deploy' would upload.
+# Cold starts (of the worker and of each UserDO) pay for the bundle's size and for everything its modules do at the top level,
+# so this reports the size, and attributes it to modules and npm packages using the bundle's source map.
+# Measurements are appended to a history file, so a change that grows the bundle or pulls in a new dependency can be flagged.
+
+DEFAULT_OUTDIR = ".bundle"
+DEFAULT_HISTORY_FILE = "bundle_history.jsonl"
+UNMAPPED = "<unmapped>"
+APP_PACKAGE = "<app>"
+
+BASE64_DIGITS = { c: i for (i, c) in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/") }
+
+def build_bundle(env : str, outdir : str = DEFAULT_OUTDIR) -> str:
+    # returns the path of the bundled worker script
+    shutil.rmtree(outdir, ignore_errors = True)
+    wrangler_deploy(env, dry = True, check = True, outdir = outdir, source_maps = True)
+    return find_bundle_script(outdir)
+
+def find_bundle_script(outdir : str) -> str:
+    scripts = [ os.path.join(outdir, name) for name in os.listdir(outdir) if name.endswith((".js", ".mjs")) ]
+    if not scripts:
+        raise Exception(f"No bundled script in {outdir}")
+    return max(scripts, key = os.path.getsize)
+
+def decode_vlq(segment : str) -> List[int]:
+    values : List[int] = []
+    value, shift = 0, 0
+    for c in segment:
+        digit = BASE64_DIGITS[c]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            values.append(-(value >> 1) if value & 1 else (value >> 1))
+            value, shift = 0, 0
+    return values
+
+def attribute_bytes_to_sources(script : str, source_map : Dict[str,Any]) -> Dict[str,int]:
+    # Every generated byte is credited to the source its source map segment points at.
+    # Bytes before a line's first segment, and segments without a source, are credited to UNMAPPED.
+    sources = source_map.get('sources', [])
+    byte_counts : Dict[str,int] = {}
+    source_index = 0
+    lines = script.split("\n")
+    byte_counts[UNMAPPED] = len(lines) - 1 # the newlines
+    for (line, line_mappings) in zip(lines, source_map.get('mappings', '').split(";") + [ '' ] * len(lines)):
+        segments : List[Tuple[int,Optional[int]]] = []
+        column = 0
+        for segment in filter(None, line_mappings.split(",")):
+            fields = decode_vlq(segment)
+            column += fields[0]
+            if len(fields) >= 4:
+                source_index += fields[1]
+                segments.append((column, source_index))
+            else:
+                segments.append((column, None))
+        boundaries = [ (0, None) ] + segments + [ (len(line), None) ]
+        for ((start, index), (end, _)) in zip(boundaries, boundaries[1:]):
+            if end <= start:
+                continue
+            source = sources[index] if (index is not None and index < len(sources)) else UNMAPPED
+            byte_counts[source] = byte_counts.get(source, 0) + len(line[start:end].encode("utf-8"))
+    return byte_counts
+
+def normalize_module_path(source : str) -> str:
+    # sources are relative to the bundle (ex: '../node_modules/x/index.js', '../../menus/menu_start.ts')
+    while source.startswith(("../", "./")):
+        source = source[source.index("/") + 1:]
+    return source
+
+def package_of(module : str) -> str:
+    # the npm package a module belongs to, or APP_PACKAGE for this repo's own code
+    if "node_modules/" not in module:
+        return UNMAPPED if module == UNMAPPED else APP_PACKAGE
+    tokens = module.rsplit("node_modules/", 1)[1].split("/")
+    return "/".join(tokens[:2]) if tokens[0].startswith("@") else tokens[0]
+
+def measure_bundle(script_filepath : str) -> Dict[str,Any]:
+    with open(script_filepath, "rb") as f:
+        script_bytes = f.read()
+    measurement : Dict[str,Any] = {
+        'script': os.path.basename(script_filepath),
+        'bytes': len(script_bytes),
+        # the upload limits and (roughly) the cold start cost go by the compressed size
+        'gzip_bytes': len(gzip.compress(script_bytes, compresslevel = 9)),
+        'modules': {},
+        'packages': {}
+    }
+    map_filepath = script_filepath + ".map"
+    if not os.path.exists(map_filepath):
+        print(f"No source map at {map_filepath}, so there's no per-module breakdown")
+        return measurement
+    with open(map_filepath, "r", encoding = "utf-8") as f:
+        source_map = json.load(f)
+    modules : Dict[str,int] = {}
+    for (source, byte_count) in attribute_bytes_to_sources(script_bytes.decode("utf-8"), source_map).items():
+        module = normalize_module_path(source)
+        modules[module] = modules.get(module, 0) + byte_count
+    packages : Dict[str,int] = {}
+    for (module, byte_count) in modules.items():
+        packages[package_of(module)] = packages.get(package_of(module), 0) + byte_count
+    measurement['modules'] = dict(sorted(modules.items(), key = lambda item: -item[1]))
+    measurement['packages'] = dict(sorted(packages.items(), key = lambda item: -item[1]))
+    return measurement
+
+def read_history(filepath : str) -> List[Dict[str,Any]]:
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, "r", encoding = "utf-8") as f:
+        return [ json.loads(line) for line in f if line.strip() ]
+
+def append_history(filepath : str, entry : Dict[str,Any]):
+    with open(filepath, "a", encoding = "utf-8") as f:
+        f.write(json.dumps(entry, sort_keys = True) + "\n")
+
+def latest_entry(history : List[Dict[str,Any]], env : str) -> Optional[Dict[str,Any]]:
+    entries = [ entry for entry in history if entry.get('env') == env and not entry.get('failed') ]
+    return entries[-1] if entries else None
+
+def _growth_pct(before : Optional[float], after : Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return 100.0 * (after - before) / before
+
+def check_for_regressions(baseline : Optional[Dict[str,Any]],
+                          current : Dict[str,Any],
+                          warn_growth_pct : float,
+                          fail_growth_pct : float,
+                          max_new_modules : int,
+                          fail_on_new_packages : bool,
+                          max_gzip_bytes : Optional[int] = None) -> Tuple[List[str],List[str]]:
+    # returns (warnings, failures).  Without a baseline, only the absolute limit is checked.
+    baseline = baseline or {}
+    warnings : List[str] = []
+    failures : List[str] = []
+    for key in [ 'bytes', 'gzip_bytes', 'cold_start_first_webhook_ms' ]:
+        growth = _growth_pct(baseline.get(key), current.get(key))
+        if growth is None:
+            continue
+        message = f"{key} grew {growth:+.1f}% ({baseline[key]} -> {current[key]})"
+        # cold start timings are noisy, so they only ever warn
+        if growth > fail_growth_pct and key != 'cold_start_first_webhook_ms':
+            failures.append(message)
+        elif growth > warn_growth_pct:
+            warnings.append(message)
+    if max_gzip_bytes is not None and current['gzip_bytes'] > max_gzip_bytes:
+        failures.append(f"gzip_bytes is {current['gzip_bytes']}, over the limit of {max_gzip_bytes}")
+    if baseline.get('modules') and current.get('modules'):
+        new_modules = sorted(set(current['modules']) - set(baseline['modules']) - { UNMAPPED })
+        if len(new_modules) > max_new_modules:
+            failures.append(f"{len(new_modules)} new modules in the bundle (limit {max_new_modules}): " + ", ".join(new_modules[:10]))
+        new_packages = sorted(set(current['packages']) - set(baseline['packages']) - { UNMAPPED })
+        for package in new_packages:
+            message = f"new dependency in the bundle: {package} ({current['packages'][package]} bytes)"
+            (failures if fail_on_new_packages else warnings).append(message)
+    return warnings, failures
+
+def make_history_entry(env : str, git_commit : str, measurement : Dict[str,Any], cold_start : Optional[Dict[str,Any]]) -> Dict[str,Any]:
+    entry = { 'env': env, 'git_commit': git_commit, 'timestamp': int(time.time()), **measurement }
+    entry['module_count'] = len([ module for module in measurement['modules'] if module != UNMAPPED ])
+    if cold_start is not None:
+        entry.update(cold_start)
+    return entry
+
+def print_bundle_report(entry : Dict[str,Any], baseline : Optional[Dict[str,Any]], top : int = 15):
+    print("")
+    print("===BUNDLE SIZE===")
+    print("")
+    print(f"{entry['script']}: {entry['bytes'] / 1024:.1f} KiB ({entry['gzip_bytes'] / 1024:.1f} KiB gzipped), {entry['module_count']} modules")
+    if baseline is not None:
+        print(f"previous ({baseline['git_commit']}): {baseline['bytes'] / 1024:.1f} KiB ({baseline['gzip_bytes'] / 1024:.1f} KiB gzipped), {baseline.get('module_count', 0)} modules")
+    if entry.get('cold_start_first_webhook_ms') is not None:
+        print(f"cold start: ready in {entry['cold_start_ready_ms']}ms, first webhook answered in {entry['cold_start_first_webhook_ms']}ms, then {entry['warm_webhook_ms']}ms warm")
+    if entry['packages']:
+        print("")
+        print(f"{'package':40} {'KiB':>8} {'%':>6} {'change':>9}")
+        for (package, byte_count) in entry['packages'].items():
+            change = ""
+            if baseline is not None and baseline.get('packages'):
+                change = f"{byte_count - baseline['packages'].get(package, 0):+d}" if package in baseline['packages'] else "new"
+            print(f"{package:40} {byte_count / 1024:8.1f} {100.0 * byte_count / entry['bytes']:6.1f} {change:>9}")
+    if entry['modules']:
+        print("")
+        print(f"largest {min(top, len(entry['modules']))} modules:")
+        for (module, byte_count) in list(entry['modules'].items())[:top]:
+            print(f"  {byte_count / 1024:8.1f} KiB  {module}")
+    print("")
@@ -0,0 +1,137 @@
+import time, traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from deployment.bot_configure_commands import configure_bot_commands
+from deployment.bot_configure_info import configure_bot_name, configure_bot_description, configure_bot_short_description
+from deployment.bot_configure_webhook import DEFAULT_WEBHOOK_MAX_CONNECTIONS, configure_webhook
+from deployment.generate_questions_and_answers import generate_questions_and_answers
+from deployment.upload_photos import upload_photos
+from deployment.bot_migrate_to_telegram_servers import migrate_telegram_bot_telegram_servers
+from deployment.wrangler_deploy_worker import wrangler_deploy
+from deployment.wrangler_push_secrets import push_secrets_bulk
+
+# The non-interactive deploy: every step is a node in a DAG, and a step starts as soon as everything it depends on has succeeded.
+# If a step fails, the steps that depend on it are skipped, and everything else still runs.
+
+@dataclass
+class DeployStep:
+    name : str
+    action : Callable[[], None]
+    depends_on : List[str] = field(default_factory = list)
+
+@dataclass
+class StepResult:
+    name : str
+    status : str # 'ok', 'failed', 'skipped'
+    started_at_s : float = 0.0
+    duration_s : float = 0.0
+    error : Optional[str] = None
+
+def make_deploy_plan(env : str, webhook_max_connections : int = DEFAULT_WEBHOOK_MAX_CONNECTIONS) -> List[DeployStep]:
+    return [
+        # the worker's questions and answers and the bot commands are both built from questions_and_answers.toml
+        DeployStep("generate_questions_and_answers", lambda: generate_questions_and_answers()),
+        # photo file_ids are per bot, so they're uploaded once the bot is on telegram's servers, and bundled into the worker
+        DeployStep("upload_photos", lambda: upload_photos(env), depends_on = ["migrate_bot"]),
+        DeployStep("wrangler_deploy", lambda: wrangler_deploy(env, dry = False, check = True), depends_on = ["generate_questions_and_answers", "upload_photos"]),
+        # secret puts create a new worker version, so don't race them against the deploy
+        DeployStep("push_secrets", lambda: push_secrets_bulk(env), depends_on = ["wrangler_deploy"]),
+        DeployStep("migrate_bot", lambda: migrate_telegram_bot_telegram_servers(env)),
+        DeployStep("set_my_commands", lambda: configure_bot_commands(env), depends_on = ["migrate_bot", "generate_questions_and_answers"]),
+        DeployStep("set_my_name", lambda: configure_bot_name(env), depends_on = ["migrate_bot"]),
+        DeployStep("set_my_description", lambda: configure_bot_description(env), depends_on = ["migrate_bot"]),
+        DeployStep("set_my_short_description", lambda: configure_bot_short_description(env), depends_on = ["migrate_bot"]),
+        # setting the webhook tests the worker url with the webhook secret token, so the worker and its secrets must be up
+        DeployStep("set_webhook", lambda: configure_webhook(env, webhook_max_connections), depends_on = ["wrangler_deploy", "push_secrets", "migrate_bot"])
+    ]
+
+def select_steps(plan : List[DeployStep], skip : List[str]) -> List[DeployStep]:
+    names = { step.name for step in plan }
+    unknown = [ name for name in skip if name not in names ]
+    if unknown:
+        raise Exception(f"Unknown deploy steps: {unknown}. Steps are: {sorted(names)}")
+    # a skipped step counts as already done, so its dependents still run
+    return [ DeployStep(step.name, step.action, [ dep for dep in step.depends_on if dep not in skip ]) for step in plan if step.name not in skip ]
+
+def plan_waves(plan : List[DeployStep]) -> List[List[str]]:
+    remaining = { step.name: set(step.depends_on) for step in plan }
+    done = set()
+    waves = []
+    while remaining:
+        wave = sorted([ name for (name, deps) in remaining.items() if deps <= done ])
+        if not wave:
+            raise Exception(f"Deploy plan has a cycle or a missing dependency: {remaining}")
+        waves.append(wave)
+        done.update(wave)
+        for name in wave:
+            del remaining[name]
+    return waves
+
+def print_plan(plan : List[DeployStep], env : str):
+    print("")
+    print(f"===DEPLOY PLAN for '{env}'===")
+    print("")
+    depends_on = { step.name: step.depends_on for step in plan }
+    for i, wave in enumerate(plan_waves(plan)):
+        print(f"Wave {i+1} (concurrent):")
+        for name in wave:
+            after = f" (after: {', '.join(depends_on[name])})" if depends_on[name] else ""
+            print(f"  - {name}{after}")
+    print("")
+
+def apply_plan(plan : List[DeployStep], max_workers : int = 8) -> List[StepResult]:
+    plan_waves(plan) # validates the DAG before anything runs
+    steps = { step.name: step for step in plan }
+    results : Dict[str,StepResult] = {}
+    running : Dict[Future,str] = {}
+    apply_start = time.perf_counter()
+
+    def run_step(step : DeployStep) -> StepResult:
+        started_at_s = time.perf_counter() - apply_start
+        print(f"[{started_at_s:7.1f}s] START {step.name}")
+        try:
+            step.action()
+            result = StepResult(step.name, 'ok', started_at_s)
+        except BaseException as e:
+            traceback.print_exc()
+            result = StepResult(step.name, 'failed', started_at_s, error = str(e) or type(e).__name__)
+        result.duration_s = (time.perf_counter() - apply_start) - started_at_s
+        print(f"[{started_at_s + result.duration_s:7.1f}s] {result.status.upper()} {step.name} ({result.duration_s:.1f}s)")
+        return result
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        while len(results) < len(steps):
+            for step in steps.values():
+                if step.name in results or step.name in running.values():
+                    continue
+                dep_statuses = [ results[dep].status for dep in step.depends_on if dep in results ]
+                if any(status != 'ok' for status in dep_statuses):
+                    results[step.name] = StepResult(step.name, 'skipped', error = "a dependency did not succeed")
+                elif len(dep_statuses) == len(step.depends_on):
+                    running[executor.submit(run_step, step)] = step.name
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when = FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future)] = future.result()
+
+    return [ results[step.name] for step in plan ]
+
+def print_timing_breakdown(results : List[StepResult], wall_clock_s : float, title : str = "DEPLOY TIMING"):
+    print("")
+    print(f"==={title}===")
+    print("")
+    max_name_length = max(map(len, [ result.name for result in results ]))
+    for result in sorted(results, key = lambda r: (r.status == 'skipped', r.started_at_s)):
+        if result.status == 'skipped':
+            print(f"{result.name.ljust(max_name_length)}  {'skipped':>8}")
+            continue
+        print(f"{result.name.ljust(max_name_length)}  {result.status:>8}  start {result.started_at_s:7.1f}s  took {result.duration_s:7.1f}s")
+    serial_s = sum(result.duration_s for result in results)
+    print("")
+    print(f"Wall clock: {wall_clock_s:.1f}s (the steps took {serial_s:.1f}s back to back)")
+    failed = [ result for result in results if result.status == 'failed' ]
+    for result in failed:
+        print(f"FAILED {result.name}: {result.error}")
@@ -0,0 +1,173 @@
+import json, os, re, sys
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Tuple
+import tomli
+
+# Generates everything derived from questions_and_answers.toml:
+#   - generated/questions_and_answers_data.ts: the questions and answers for the worker, plus a precomputed lookup
+#     (normalized question -> question) and an n-gram index, so findByQuestion doesn't scan every question per message
+#   - generated/bot_commands.json: the payload for setMyCommands
+# The outputs are checked in (so wrangler dev works from a fresh clone), and regenerated on every deploy.
+# Run with --check to fail if they're out of date.
+
+SOURCE_FILE = "./questions_and_answers.toml"
+TS_OUTPUT_FILE = "./generated/questions_and_answers_data.ts"
+BOT_COMMANDS_OUTPUT_FILE = "./generated/bot_commands.json"
+NGRAM_SIZE = 3
+
+COMMAND_PATTERN = re.compile(r"^[a-z0-9_]{1,32}$")
+QUESTION_CODE_PATTERN = re.compile(r"^[A-Z][A-Z0-9_]*$")
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--check", action = "store_true", help = "Don't write anything, exit with 1 if the outputs are stale")
+    return parser.parse_args()
+
+def normalize_question(text : str) -> str:
+    # must match normalizeQuestion in questions_and_answers.ts: case-folded, anything but letters and digits is a single space
+    return re.sub(r"[\W_]+", " ", text.lower()).strip()
+
+def question_ngrams(normalized : str) -> List[str]:
+    # must match questionNGrams in questions_and_answers.ts
+    padded = f" {normalized} "
+    return sorted(set(padded[i:i+NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)))
+
+def read_source(filepath : str = SOURCE_FILE) -> Dict[str,Any]:
+    with open(filepath, "rb") as f:
+        source = tomli.load(f)
+    validate_source(source)
+    return source
+
+def validate_source(source : Dict[str,Any]):
+    errors = []
+    for command in source.get('commands', []):
+        if not COMMAND_PATTERN.match(command.get('command', '')):
+            errors.append(f"Command '{command.get('command')}' must be 1-32 lowercase letters, digits or underscores")
+        if not (1 <= len(command.get('description', '')) <= 256):
+            errors.append(f"Command '{command.get('command')}' needs a description of 1-256 characters")
+    codes = set()
+    keys : Dict[str,str] = {}
+    for question in source.get('questions', []):
+        code = question.get('code', '')
+        if not QUESTION_CODE_PATTERN.match(code):
+            errors.append(f"Question code '{code}' must be UPPER_SNAKE_CASE")
+        if code in codes:
+            errors.append(f"Duplicate question code '{code}'")
+        codes.add(code)
+        if not question.get('question') or not isinstance(question.get('answer'), list):
+            errors.append(f"Question '{code}' needs a question and an answer (a list of lines)")
+            continue
+        for text in [ question['question'] ] + question.get('aliases', []):
+            key = normalize_question(text)
+            if not key:
+                errors.append(f"Question '{code}' has a phrasing with no letters or digits: '{text}'")
+            elif key in keys and keys[key] != code:
+                errors.append(f"'{text}' ({code}) reads the same as a phrasing of {keys[key]} once normalized")
+            keys[key] = code
+    if errors:
+        raise Exception(f"{SOURCE_FILE} is invalid:\n  " + "\n  ".join(errors))
+
+def make_lookup(questions : List[Dict[str,Any]]) -> Tuple[Dict[str,int],List[Dict[str,int]],Dict[str,List[int]]]:
+    # lookup: normalized phrasing -> question index
+    # keys: one per phrasing (questions and their aliases), with the question index and how many n-grams it has
+    # ngram_index: n-gram -> indices into keys
+    lookup : Dict[str,int] = {}
+    keys : List[Dict[str,int]] = []
+    ngram_index : Dict[str,List[int]] = {}
+    for (question_index, question) in enumerate(questions):
+        for text in [ question['question'] ] + question.get('aliases', []):
+            normalized = normalize_question(text)
+            if normalized in lookup:
+                continue
+            lookup[normalized] = question_index
+            ngrams = question_ngrams(normalized)
+            for ngram in ngrams:
+                ngram_index.setdefault(ngram, []).append(len(keys))
+            keys.append({ 'question': question_index, 'ngrams': len(ngrams) })
+    return lookup, keys, dict(sorted(ngram_index.items()))
+
+def render_ts(source : Dict[str,Any]) -> str:
+    questions = source.get('questions', [])
+    lookup, keys, ngram_index = make_lookup(questions)
+    codes = [ question['code'] for question in questions ]
+    lines = [
+        f"// Generated from {SOURCE_FILE[2:]} by scripts/deployment/generate_questions_and_answers.py. Do not edit.",
+        "",
+        "export type QUESTION_CODE = " + ("|".join(f"'{code}'" for code in codes) or "never") + ";",
+        "",
+        "export type QuestionAnswerSpec = {",
+        "    code: QUESTION_CODE,",
+        "    question: string,",
+        "    answer: string|string[]",
+        "}",
+        "",
+        "export const CANNED_QUESTIONS_AND_ANSWERS : QuestionAnswerSpec[] = ["
+    ]
+    for question in questions:
+        lines.append("    {")
+        lines.append(f"        code: {_ts_string(question['code'])},")
+        lines.append(f"        question: {_ts_string(question['question'])},")
+        lines.append("        answer: [")
+        lines += [ f"            {_ts_string(line)}," for line in question['answer'] ]
+        lines.append("        ]")
+        lines.append("    },")
+    lines += [
+        "];",
+        "",
+        f"export const QUESTION_NGRAM_SIZE = {NGRAM_SIZE};",
+        "",
+        "// normalized question (or alias) -> index into CANNED_QUESTIONS_AND_ANSWERS",
+        "export const QUESTION_LOOKUP = new Map<string,number>([",
+    ]
+    lines += [ f"    [{_ts_string(key)}, {index}]," for (key, index) in lookup.items() ]
+    lines += [
+        "]);",
+        "",
+        "// every normalized question and alias: which question it is, and how many distinct n-grams it has",
+        "export const QUESTION_KEYS : { question : number, ngrams : number }[] = [",
+    ]
+    lines += [ f"    {{ question: {key['question']}, ngrams: {key['ngrams']} }}," for key in keys ]
+    lines += [
+        "];",
+        "",
+        "// n-gram -> indices into QUESTION_KEYS of the phrasings containing it",
+        "export const QUESTION_NGRAM_INDEX = new Map<string,number[]>([",
+    ]
+    lines += [ f"    [{_ts_string(ngram)}, {json.dumps(indices)}]," for (ngram, indices) in ngram_index.items() ]
+    lines += [ "]);", "" ]
+    return "\n".join(lines)
+
+def render_bot_commands(source : Dict[str,Any]) -> str:
+    commands = [ { 'command': command['command'], 'description': command['description'] } for command in source.get('commands', []) ]
+    return json.dumps(commands, indent = 4) + "\n"
+
+def _ts_string(value : str) -> str:
+    # a JSON string is a valid TS string literal
+    return json.dumps(value, ensure_ascii = False)
+
+def generate_questions_and_answers(check : bool = False) -> bool:
+    # returns whether the outputs were already up to date
+    source = read_source()
+    outputs = { TS_OUTPUT_FILE: render_ts(source), BOT_COMMANDS_OUTPUT_FILE: render_bot_commands(source) }
+    up_to_date = True
+    for (filepath, content) in outputs.items():
+        existing = None
+        if os.path.exists(filepath):
+            with open(filepath, "r", encoding = "utf-8", newline = "") as f:
+                existing = f.read()
+        if existing == content:
+            continue
+        up_to_date = False
+        if check:
+            print(f"{filepath} is out of date with {SOURCE_FILE}")
+            continue
+        os.makedirs(os.path.dirname(filepath), exist_ok = True)
+        with open(filepath, "w", encoding = "utf-8", newline = "") as f:
+            f.write(content)
+        print(f"Wrote {filepath}")
+    return up_to_date
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not generate_questions_and_answers(check = args.check) and args.check:
+        sys.exit(1)
@@ -0,0 +1,111 @@
+import glob, hashlib, json, os, re, time
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional
+import requests
+
+from telegram_client import TelegramAPIError, TelegramClient, get_telegram_client
+from wrangler_common import get_config, make_telegram_bot_url
+
+# Uploads each photo the worker sends (the photoURL() of every BasePhoto) to Telegram once per environment, and records
+# the file_id Telegram gives back.  The worker then sends the file_id instead of the URL, so Telegram doesn't have to
+# download and process the image on every send - it falls back to the URL if Telegram rejects a file_id.
+#   - generated/photo_assets.json: per environment, per photo URL, the file_id and the sha256 of the image it was uploaded from
+#   - generated/photo_file_ids.ts: the same file_ids, for the worker
+# A photo is only uploaded again when the image behind its URL changes, or Telegram no longer knows its file_id.
+# file_ids belong to a bot, so run this against Telegram's servers (not the local telegram-bot-api server).
+
+PHOTO_SOURCES_GLOB = "./photos/*.ts"
+PHOTO_ASSETS_FILE = "./generated/photo_assets.json"
+PHOTO_FILE_IDS_TS_FILE = "./generated/photo_file_ids.ts"
+UPLOAD_TIMEOUT_S = 60.0
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--env", type = str, required = True)
+    parser.add_argument("--chat_id", type = int, required = False, default = None, help = "Where to upload to (the message is deleted afterwards). Defaults to SUPER_ADMIN_USER_ID")
+    parser.add_argument("--bot_url", type = str, required = False, default = None, help = "Overrides the Bot API url for --env")
+    parser.add_argument("--force", action = "store_true", help = "Upload every photo, changed or not")
+    parser.add_argument("--skip_verify", action = "store_true", help = "Don't check that Telegram still knows the recorded file_ids")
+    return parser.parse_args()
+
+def read_photo_urls() -> List[str]:
+    urls : List[str] = []
+    for filepath in sorted(glob.glob(PHOTO_SOURCES_GLOB)):
+        with open(filepath, "r", encoding = "utf-8") as f:
+            source = f.read()
+        urls += re.findall(r"photoURL\(\)\s*:\s*string\s*\{\s*return\s*[\"'`]([^\"'`]+)[\"'`]", source)
+    return list(dict.fromkeys(urls))
+
+def read_photo_assets() -> Dict[str,Dict[str,Dict[str,Any]]]:
+    if not os.path.exists(PHOTO_ASSETS_FILE):
+        return {}
+    with open(PHOTO_ASSETS_FILE, "r", encoding = "utf-8") as f:
+        return json.load(f)
+
+def write_photo_assets(assets : Dict[str,Dict[str,Dict[str,Any]]]):
+    os.makedirs(os.path.dirname(PHOTO_ASSETS_FILE), exist_ok = True)
+    with open(PHOTO_ASSETS_FILE, "w", encoding = "utf-8", newline = "") as f:
+        f.write(json.dumps(assets, indent = 4, sort_keys = True) + "\n")
+    file_ids = { env: { url: asset['file_id'] for (url, asset) in sorted(env_assets.items()) } for (env, env_assets) in sorted(assets.items()) }
+    with open(PHOTO_FILE_IDS_TS_FILE, "w", encoding = "utf-8", newline = "") as f:
+        f.write(f"// Generated from {PHOTO_ASSETS_FILE[2:]} by scripts/deployment/upload_photos.py. Do not edit.\n")
+        f.write("\n")
+        f.write("// environment -> photo URL -> the file_id of that photo, as uploaded to the environment's bot\n")
+        f.write(f"export const PHOTO_FILE_IDS : Record<string,Record<string,string>> = {json.dumps(file_ids, indent = 4)};\n")
+
+def download_photo(url : str) -> bytes:
+    response = requests.get(url, timeout = UPLOAD_TIMEOUT_S)
+    response.raise_for_status()
+    return response.content
+
+def is_file_id_valid(client : TelegramClient, file_id : str) -> bool:
+    try:
+        client.call('getFile', { 'file_id': file_id }, max_retries = 2)
+        return True
+    except TelegramAPIError as e:
+        if e.status == 400:
+            return False
+        raise
+
+def upload_photo(client : TelegramClient, chat_id : int, url : str, content : bytes) -> str:
+    filename = os.path.basename(url.split("?")[0]) or "photo"
+    message = client.call('sendPhoto', { 'chat_id': chat_id, 'disable_notification': 'true' }, timeout_s = UPLOAD_TIMEOUT_S, files = { 'photo': (filename, content) })
+    try:
+        client.call('deleteMessage', { 'chat_id': chat_id, 'message_id': message['message_id'] })
+    except TelegramAPIError as e:
+        print(f"Couldn't delete the upload message: {e.description}")
+    # Telegram returns the photo in several sizes. The largest is the original.
+    return message['photo'][-1]['file_id']
+
+def upload_photos(env : str, chat_id : Optional[int] = None, bot_url : Optional[str] = None, force : bool = False, verify : bool = True) -> bool:
+    # returns whether any file_id changed (in which case the worker needs to be deployed to pick them up)
+    chat_id = chat_id if chat_id is not None else get_config(env).int_var('SUPER_ADMIN_USER_ID')
+    client = get_telegram_client(bot_url or make_telegram_bot_url(env))
+    assets = read_photo_assets()
+    env_assets = assets.setdefault(env, {})
+    urls = read_photo_urls()
+    changed = False
+    for url in urls:
+        content = download_photo(url)
+        sha256 = hashlib.sha256(content).hexdigest()
+        asset = env_assets.get(url)
+        if asset is not None and asset['sha256'] == sha256 and not force:
+            if not verify or is_file_id_valid(client, asset['file_id']):
+                print(f"{url}: unchanged")
+                continue
+            print(f"{url}: Telegram no longer knows {asset['file_id']}")
+        print(f"{url}: uploading {len(content)} bytes")
+        env_assets[url] = { 'file_id': upload_photo(client, chat_id, url, content), 'sha256': sha256, 'uploaded_at': int(time.time()) }
+        changed = True
+    for url in [ url for url in env_assets if url not in urls ]:
+        print(f"{url}: no longer used, forgetting its file_id")
+        del env_assets[url]
+        changed = True
+    if changed or not os.path.exists(PHOTO_FILE_IDS_TS_FILE):
+        write_photo_assets(assets)
+        print(f"Wrote {PHOTO_ASSETS_FILE} and {PHOTO_FILE_IDS_TS_FILE}")
+    return changed
+
+if __name__ == "__main__":
+    args = parse_args()
+    upload_photos(args.env, chat_id = args.chat_id, bot_url = args.bot_url, force = args.force, verify = not args.skip_verify)
@@ -0,0 +1,183 @@
+import time
+import requests
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from deployment.bot_configure_webhook import make_set_webhook_params
+from telegram_client import TelegramClient
+
+# Watches the queue Telegram keeps in front of the webhook, through getWebhookInfo:
+#   - pending_update_count: updates Telegram has yet to deliver (or has delivered, and is waiting on a response for)
+#   - last_error_date / last_error_message: the most recent failed delivery
+# BacklogTracker keeps the samples from the last window_s seconds and estimates the net drain rate (the slope of the
+# pending count, fitted by least squares) and from it, how long until the backlog is gone.
+# The tuning helpers below step max_connections against the fake telegram server, with a fixed burst of updates per step,
+# and time how long each burst takes to drain.
+
+@dataclass
+class WebhookSample:
+    t : float
+    pending_update_count : int
+    max_connections : Optional[int] = None
+    last_error_date : Optional[int] = None
+    last_error_message : Optional[str] = None
+
+def sample_webhook_info(client : TelegramClient, clock : Callable[[],float] = time.monotonic) -> WebhookSample:
+    info = client.call('getWebhookInfo')
+    return WebhookSample(t = clock(),
+                         pending_update_count = int(info.get('pending_update_count', 0)),
+                         max_connections = info.get('max_connections'),
+                         last_error_date = info.get('last_error_date'),
+                         last_error_message = info.get('last_error_message'))
+
+class BacklogTracker:
+
+    def __init__(self, window_s : float = 60.0):
+        self.window_s = window_s
+        self.samples : Deque[WebhookSample] = deque()
+        self.last_error_date : Optional[int] = None
+        # errors that happened while we were watching (getWebhookInfo only has the latest, so errors between polls are missed)
+        self.errors : List[Tuple[int,str]] = []
+        self.peak_pending = 0
+        self.sample_count = 0
+
+    def add(self, sample : WebhookSample) -> Optional[Tuple[int,str]]:
+        # returns the error, if the webhook has failed since the last sample
+        new_error = None
+        if self.sample_count > 0 and sample.last_error_date is not None and sample.last_error_date != self.last_error_date:
+            new_error = (sample.last_error_date, sample.last_error_message or "")
+            self.errors.append(new_error)
+        if sample.last_error_date is not None:
+            self.last_error_date = sample.last_error_date
+        self.samples.append(sample)
+        while self.samples and self.samples[0].t < sample.t - self.window_s:
+            self.samples.popleft()
+        self.peak_pending = max(self.peak_pending, sample.pending_update_count)
+        self.sample_count += 1
+        return new_error
+
+    def pending(self) -> int:
+        return self.samples[-1].pending_update_count if self.samples else 0
+
+    def net_drain_per_s(self) -> Optional[float]:
+        # updates/s the backlog is shrinking by (negative if it's growing), over the window
+        if len(self.samples) < 2:
+            return None
+        ts = [ sample.t for sample in self.samples ]
+        ys = [ sample.pending_update_count for sample in self.samples ]
+        mean_t, mean_y = sum(ts) / len(ts), sum(ys) / len(ys)
+        variance = sum((t - mean_t) ** 2 for t in ts)
+        if variance == 0:
+            return None
+        slope = sum((t - mean_t) * (y - mean_y) for (t, y) in zip(ts, ys)) / variance
+        return -slope
+
+    def eta_s(self) -> Optional[float]:
+        drain = self.net_drain_per_s()
+        if self.pending() == 0:
+            return 0.0
+        if drain is None or drain <= 0:
+            return None
+        return self.pending() / drain
+
+def format_backlog_line(tracker : BacklogTracker, new_error : Optional[Tuple[int,str]]) -> str:
+    drain = tracker.net_drain_per_s()
+    eta = tracker.eta_s()
+    sample = tracker.samples[-1]
+    line = time.strftime("%H:%M:%S") + f"  pending {sample.pending_update_count:>6}  peak {tracker.peak_pending:>6}"
+    line += "  drain " + ("-" if drain is None else f"{drain:+.1f}/s").rjust(10)
+    line += "  eta " + ("-" if eta is None else f"{eta:.0f}s").rjust(7)
+    line += f"  max_connections {sample.max_connections}"
+    if new_error is not None:
+        line += f"  ERROR at {time.strftime('%H:%M:%S', time.localtime(new_error[0]))}: {new_error[1]}"
+    return line
+
+# ---- max_connections tuning ----
+
+@dataclass
+class TuningStep:
+    max_connections : int
+    updates : int
+    drain_s : float
+    drain_rate_per_s : float
+    delivered : int
+    failed : int
+    webhook_errors : int
+    peak_pending : int
+    timed_out : bool
+
+    def error_rate(self) -> float:
+        attempts = self.delivered + self.failed
+        return self.failed / attempts if attempts else 0.0
+
+def wait_until_drained(client : TelegramClient, tracker : BacklogTracker, poll_s : float, timeout_s : float) -> bool:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        tracker.add(sample_webhook_info(client))
+        if tracker.pending() == 0:
+            return True
+        time.sleep(poll_s)
+    return False
+
+def get_fake_server_stats(fake_server_url : str) -> Dict[str,Any]:
+    response = requests.get(f"{fake_server_url}/fake/stats", timeout = 10)
+    response.raise_for_status()
+    return response.json()
+
+def run_tuning_step(client : TelegramClient,
+                    fake_server_url : str,
+                    webhook_url : str,
+                    webhook_secret_token : str,
+                    max_connections : int,
+                    updates : List[Dict[str,Any]],
+                    poll_s : float,
+                    timeout_s : float) -> TuningStep:
+    client.call('setWebhook', make_set_webhook_params(webhook_url, webhook_secret_token, max_connections))
+    if not wait_until_drained(client, BacklogTracker(), poll_s, timeout_s):
+        raise Exception(f"The backlog from the previous step didn't drain within {timeout_s}s")
+    before = get_fake_server_stats(fake_server_url)
+    tracker = BacklogTracker()
+    tracker.add(sample_webhook_info(client))
+    start = time.monotonic()
+    # the fake server numbers the updates, so every step's updates are new to the worker
+    response = requests.post(f"{fake_server_url}/fake/updates", json = [ { key: value for (key, value) in update.items() if key != 'update_id' } for update in updates ], timeout = 60)
+    response.raise_for_status()
+    drained = wait_until_drained(client, tracker, poll_s, timeout_s)
+    drain_s = time.monotonic() - start
+    after = get_fake_server_stats(fake_server_url)
+    return TuningStep(max_connections = max_connections,
+                      updates = len(updates),
+                      drain_s = round(drain_s, 2),
+                      drain_rate_per_s = round(len(updates) / drain_s, 1) if drained else 0.0,
+                      delivered = after['webhook_delivered'] - before['webhook_delivered'],
+                      failed = after['webhook_failed'] - before['webhook_failed'],
+                      webhook_errors = len(tracker.errors),
+                      peak_pending = tracker.peak_pending,
+                      timed_out = not drained)
+
+def recommend_max_connections(steps : List[TuningStep], error_rate_tolerance : float = 0.01, drain_rate_tolerance : float = 0.05) -> Optional[TuningStep]:
+    # the best drain rate among the steps whose error rate is no worse than the lowest seen (plus error_rate_tolerance);
+    # among drain rates within drain_rate_tolerance of the best, the fewest connections (less contention in the worker and its DOs)
+    finished = [ step for step in steps if not step.timed_out ]
+    if not finished:
+        return None
+    lowest_error_rate = min(step.error_rate() for step in finished)
+    acceptable = [ step for step in finished if step.error_rate() <= lowest_error_rate + error_rate_tolerance ]
+    best_rate = max(step.drain_rate_per_s for step in acceptable)
+    good_enough = [ step for step in acceptable if step.drain_rate_per_s >= best_rate * (1.0 - drain_rate_tolerance) ]
+    return min(good_enough, key = lambda step: step.max_connections)
+
+def print_tuning_report(steps : List[TuningStep], recommended : Optional[TuningStep]):
+    print("===MAX_CONNECTIONS TUNING===")
+    columns = [ 'max_connections', 'updates', 'drain_s', 'drain_rate_per_s', 'peak_pending', 'delivered', 'failed', 'error_rate', 'webhook_errors' ]
+    print("".join(column.rjust(18) for column in columns))
+    for step in steps:
+        row = { **step.__dict__, 'error_rate': round(step.error_rate(), 4) }
+        if step.timed_out:
+            row['drain_s'] = f">{step.drain_s}"
+        print("".join(str(row[column]).rjust(18) for column in columns))
+    if recommended is None:
+        print("No step drained its burst in time - try a smaller --burst or a longer --timeout_s")
+    else:
+        print(f"Recommended max_connections: {recommended.max_connections} ({recommended.drain_rate_per_s} updates/s, error rate {recommended.error_rate():.2%})")
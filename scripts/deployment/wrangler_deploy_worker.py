@@ -1,6 +1,7 @@
 import subprocess
 from argparse import ArgumentParser, Namespace
 import shlex
+from typing import Optional
 
 def strict_parse_bool(string : str) -> bool:
     if string == "True":
@@ -10,11 +11,16 @@ def strict_parse_bool(string : str) -> bool:
     else:
         raise Exception("Not a bool: " + string)
 
-def wrangler_deploy(env : str, dry : bool):
+def wrangler_deploy(env : str, dry : bool, check : bool = False, outdir : Optional[str] = None, source_maps : bool = False):
+    # outdir (with dry) keeps the bundle wrangler would have uploaded, for measuring it (see bundle_size.py)
     command = f'npx wrangler deploy --env "{env}"'
     if dry:
         command += " --dry-run "
-    subprocess.run(command, capture_output=False, text=True, shell=True)
+    if outdir is not None:
+        command += f' --outdir "{outdir}"'
+    if source_maps:
+        command += " --upload-source-maps"
+    subprocess.run(command, capture_output=False, text=True, shell=True, check=check)
 
 def parse_args():
     parser = ArgumentParser()
@@ -1,37 +1,121 @@
-import subprocess, shlex, json
+import subprocess, shlex, json, hashlib, os, tempfile
 from argparse import ArgumentParser
+from typing import Dict
 from wrangler_common import get_secrets
 
+BULK_SECRETS_COMMAND = "npx wrangler secret:bulk {filepath} --env {env}"
+SECRETS_MANIFEST_FILEPATH = ".secrets_manifest.{env}.json"
+
 def parse_args():
     parser = ArgumentParser()
     parser.add_argument("--env", required = True, type = str)
+    parser.add_argument("--bulk", action = "store_true", help = "Upload only the secrets that changed since the last push, in one wrangler call")
+    parser.add_argument("--force", action = "store_true", help = "With --bulk, upload every secret regardless of the manifest")
+    parser.add_argument("--dry", action = "store_true", help = "With --bulk, only report what would be uploaded")
     return parser.parse_args()
 
-def push_secrets(env : str):
-    toml_vars = get_secrets(env)
-    secrets = { key : value for (key,value) in toml_vars.items() if key.startswith("SECRET__") }
+def push_secrets(env : str, interactive : bool = True):
+    secrets = _get_secrets_to_push(env)
     
-    print("Here are the secrets for inspection:")
-    print("")
-    print(json.dumps(secrets, indent = 1))
-    print("")
+    if interactive:
+        print("Here are the secrets for inspection:")
+        print("")
+        print(json.dumps(secrets, indent = 1))
+        print("")
+    
+    # keep the manifest up to date with what's actually been pushed, so the next push_secrets_bulk knows what changed
+    manifest = _read_secrets_manifest(env)
+    try:
+        for (key,value) in secrets.items():
+            if interactive:
+                print(f"(in: '{env}') '{key}': '{value}'")
+                response = input("Y/N: ").lower()
+                if response != 'y':
+                    raise Exception(f"User stopped setting of secret in {env}")
+            else:
+                # non-interactive runs end up in CI logs, so never print the value
+                print(f"(in: '{env}') '{key}'")
+            command = f"npx wrangler secret put {key} --env {env}"
+            output, errors, returncode = _pipe_to_command(command, value)
+
+            if output.strip():
+                print("Output: " + output)
+
+            if errors.strip():
+                print("Errors: " + errors)
+
+            if returncode == 0:
+                manifest[key] = _hash_secret(key, value)
+            elif not interactive:
+                raise Exception(f"Failed to put secret '{key}' in {env}")
+    finally:
+        _write_secrets_manifest(env, manifest)
+
+def push_secrets_bulk(env : str, force : bool = False, dry : bool = False):
+    # The manifest holds a hash of each secret as of its last successful push, so unchanged secrets can be skipped.
+    # It is only as good as the assumption that nobody else pushed secrets in the meantime: use force if in doubt.
+    secrets = _get_secrets_to_push(env)
+    manifest = _read_secrets_manifest(env)
+    hashes = { key: _hash_secret(key, value) for (key,value) in secrets.items() }
+    changed = sorted([ key for key in secrets if force or manifest.get(key) != hashes[key] ])
+    skipped = sorted([ key for key in secrets if key not in changed ])
+    removed = sorted([ key for key in manifest if key not in secrets ])
+
+    for key in skipped:
+        print(f"(in: '{env}') '{key}': unchanged, skipped")
+    for key in changed:
+        print(f"(in: '{env}') '{key}': {'would upload' if dry else 'uploading'}")
+    for key in removed:
+        # secret:bulk only creates/updates, so this has to be done by hand
+        print(f"(in: '{env}') '{key}': no longer in .dev.vars.{env}. Remove it from the worker with: npx wrangler secret delete {key} --env {env}")
 
+    if changed and not dry:
+        _upload_secrets_in_bulk(env, { key: secrets[key] for key in changed })
+        for key in changed:
+            manifest[key] = hashes[key]
+    for key in removed:
+        manifest.pop(key)
+    if not dry:
+        _write_secrets_manifest(env, manifest)
+
+    print(f"Secrets for '{env}': {len(changed)} {'to upload' if dry else 'uploaded'}, {len(skipped)} skipped (unchanged)")
+
+def _upload_secrets_in_bulk(env : str, secrets : Dict[str,str]):
+    # wrangler reads the secrets from a JSON file - keep it private and short-lived
+    fd, filepath = tempfile.mkstemp(suffix = ".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(secrets, f)
+        result = subprocess.run(BULK_SECRETS_COMMAND.format(filepath = shlex.quote(filepath), env = env), shell = True, capture_output = True, text = True)
+    finally:
+        os.remove(filepath)
+    if result.stdout.strip():
+        print("Output: " + result.stdout)
+    if result.stderr.strip():
+        print("Errors: " + result.stderr)
+    if result.returncode != 0:
+        raise Exception(f"Failed to bulk upload secrets in {env}")
+
+def _get_secrets_to_push(env : str) -> Dict[str,str]:
+    toml_vars = get_secrets(env)
+    secrets = { key : value for (key,value) in toml_vars.items() if key.startswith("SECRET__") }
     if (any([ key for key in secrets if not key.startswith("SECRET")])):
-        raise Exception("CONFIG PROBLEM AND/OR DEV ERROR: At least one secret did not start with word SECRET")    
-    
-    for (key,value) in secrets.items():
-        print(f"(in: '{env}') '{key}': '{value}'")
-        response = input("Y/N: ").lower()
-        if response != 'y':
-            raise Exception(f"User stopped setting of secret in {env}")
-        command = f"npx wrangler secret put {key} --env {env}"
-        output, errors = _pipe_to_command(command, value)
-        
-        if output.strip():
-            print("Output: " + output)
-        
-        if errors.strip():
-            print("Errors: " + errors)
+        raise Exception("CONFIG PROBLEM AND/OR DEV ERROR: At least one secret did not start with word SECRET")
+    return secrets
+
+def _hash_secret(key : str, value : str) -> str:
+    return hashlib.sha256(f"{key}\0{value}".encode("utf-8")).hexdigest()
+
+def _read_secrets_manifest(env : str) -> Dict[str,str]:
+    filepath = SECRETS_MANIFEST_FILEPATH.format(env = env)
+    if not os.path.exists(filepath):
+        return {}
+    with open(filepath, "r") as f:
+        return json.load(f)
+
+def _write_secrets_manifest(env : str, manifest : Dict[str,str]):
+    with open(SECRETS_MANIFEST_FILEPATH.format(env = env), "w") as f:
+        json.dump(manifest, f, indent = 1, sort_keys = True)
 
 def _pipe_to_command(command, input_string):
     # Start the subprocess with stdin and stdout as PIPE
@@ -39,9 +123,12 @@ def _pipe_to_command(command, input_string):
     process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8', text=True, shell=True)
     # Send the input_string to the subprocess and get the output
     output, errors = process.communicate(input=input_string)
-    return output, errors
+    return output, errors, process.returncode
 
 if __name__ == "__main__":
     args = parse_args()
     env = args.env.strip()
-    push_secrets(env)
\ No newline at end of file
+    if args.bulk:
+        push_secrets_bulk(env, force = args.force, dry = args.dry)
+    else:
+        push_secrets(env)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json, statistics, time
+import requests
+from typing import Any, Dict, List
+
+from dev.fake_telegram_server import FakeTelegramServer, FakeTelegramServerThread
+from dev.local_dev_common import *
+from dev.supervisor import ChildSpec, Supervisor
+from dev.telegram_updates import make_message, make_message_update, make_private_chat, make_user
+from dev.webhook_load import FAKE_FAILURE_STATUS_TEXT
+from wrangler_common import get_secret
+
+# Times a cold 'wrangler dev' start: from spawning wrangler until its port answers, and until the first webhook update
+# is handled successfully (which has to load the bundle and spin up a new UserDO).  A second update from the same user
+# gives the warm time to compare against.
+# The worker talks to the in-process fake telegram server, so nothing reaches Telegram.
+
+COLD_START_FIRST_USER_ID = 8_500_000_000
+
+def make_start_update(update_id : int, user_id : int) -> Dict[str,Any]:
+    user = make_user(user_id, first_name = "ColdStart")
+    return make_message_update(update_id, make_message(update_id, user, make_private_chat(user), text = "/start"))
+
+def post_update_until_ok(update : Dict[str,Any], secret_token : str, timeout_s : float, interval_s : float = 0.1):
+    # until the worker has loaded, wrangler dev can answer with a 503 (or drop the connection)
+    headers = { 'X-Telegram-Bot-Api-Secret-Token': secret_token, 'Content-Type': 'application/json' }
+    start = time.perf_counter()
+    while True:
+        try:
+            response = requests.post(LOCAL_CLOUDFLARE_WORKER_URL, data = json.dumps(update), headers = headers, timeout = timeout_s)
+            if response.status_code == 200 and not FAKE_FAILURE_STATUS_TEXT.match(response.reason or ''):
+                return
+        except requests.RequestException:
+            pass
+        if time.perf_counter() - start > timeout_s:
+            raise Exception(f"The worker didn't handle an update successfully within {timeout_s}s")
+        time.sleep(interval_s)
+
+def time_one_cold_start(secret_token : str, user_id : int, timeout_s : float) -> Dict[str,float]:
+    supervisor = Supervisor()
+    supervisor.start()
+    try:
+        argv = [ 'npx', 'wrangler', 'dev', '--env', 'dev', '--port', str(LOCAL_CLOUDFLARE_WORKER_PORT), '--ip', '127.0.0.1' ]
+        argv += [ '--var', f'TELEGRAM_BOT_SERVER_URL:{LOCAL_FAKE_TELEGRAM_SERVER_ADDRESS}', f'TELEGRAM_BOT_ID:{FAKE_TELEGRAM_BOT_ID}' ]
+        start = time.perf_counter()
+        worker_proc = supervisor.start_child(ChildSpec("wrangler", argv, restart = False))
+        wait_until_http_ready("cloudflare worker", LOCAL_CLOUDFLARE_WORKER_URL, worker_proc, timeout_s = timeout_s)
+        ready_s = time.perf_counter() - start
+        post_update_until_ok(make_start_update(1, user_id), secret_token, timeout_s)
+        first_webhook_s = time.perf_counter() - start
+        warm_start = time.perf_counter()
+        post_update_until_ok(make_start_update(2, user_id), secret_token, timeout_s)
+        warm_webhook_s = time.perf_counter() - warm_start
+    finally:
+        supervisor.stop()
+    poll_until_port_is_unoccupied(LOCAL_CLOUDFLARE_WORKER_PORT)
+    return { 'ready_s': ready_s, 'first_webhook_s': first_webhook_s, 'warm_webhook_s': warm_webhook_s }
+
+def time_cold_starts(runs : int, timeout_s : float = 180.0) -> Dict[str,Any]:
+    # returns the medians over 'runs' cold starts, in ms
+    for port in [ LOCAL_CLOUDFLARE_WORKER_PORT, FAKE_TELEGRAM_SERVER_PORT ]:
+        if is_port_in_use(port):
+            raise Exception(f"Port {port} is in use - stop the dev box before timing cold starts")
+    secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", "dev")
+    fake_telegram_server_thread = FakeTelegramServerThread(lambda: FakeTelegramServer(secret_token = secret_token))
+    fake_telegram_server_thread.start()
+    timings : List[Dict[str,float]] = []
+    try:
+        for run in range(runs):
+            # a user the local DO state hasn't seen, so every run creates its UserDO from scratch
+            user_id = COLD_START_FIRST_USER_ID + (int(time.time()) % 1_000_000) * 100 + run
+            timings.append(time_one_cold_start(secret_token, user_id, timeout_s))
+            print(f"Cold start {run + 1}/{runs}: " + ", ".join(f"{key} {value:.2f}" for (key, value) in timings[-1].items()))
+    finally:
+        fake_telegram_server_thread.stop()
+
+    def median_ms(key : str) -> int:
+        return round(1000.0 * statistics.median(timing[key] for timing in timings))
+
+    return {
+        'cold_start_runs': runs,
+        'cold_start_ready_ms': median_ms('ready_s'),
+        'cold_start_first_webhook_ms': median_ms('first_webhook_s'),
+        'warm_webhook_ms': median_ms('warm_webhook_s')
+    }
@@ -0,0 +1,259 @@
+import asyncio, base64, bisect, json, os
+from typing import Any, Awaitable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+
+import aiohttp # pip install aiohttp
+
+from deployment.bundle_size import decode_vlq, normalize_module_path
+
+# CPU profiles of the local worker, through the DevTools protocol on wrangler dev's inspector port.
+# capture_cpu_profile starts the V8 sampling profiler, awaits a load run, and returns the profile (the same format as a
+# Chrome DevTools .cpuprofile, so a saved one can also be opened there).  Call frames are mapped back to the TypeScript
+# sources through the bundle's source map, so functions are reported by the file they were written in.
+# summarize_cpu_profile then credits each sample's interval to the function it was in (self time) and to every function on
+# its stack (total time).
+
+DEFAULT_SAMPLING_INTERVAL_US = 200
+# nodes V8 adds that aren't JS functions
+ROOT_NODE = "(root)"
+IDLE_NODE = "(idle)"
+NON_JS_NODES = { ROOT_NODE, "(program)", "(garbage collector)", IDLE_NODE }
+
+class DevToolsSession:
+
+    def __init__(self, websocket : aiohttp.ClientWebSocketResponse):
+        self.websocket = websocket
+        self.next_id = 0
+        self.pending : Dict[int,asyncio.Future] = {}
+        self.events : List[Dict[str,Any]] = []
+        self.reader = asyncio.get_running_loop().create_task(self._read())
+
+    async def send(self, method : str, params : Optional[Dict[str,Any]] = None, timeout_s : float = 60.0) -> Dict[str,Any]:
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        await self.websocket.send_str(json.dumps({ 'id': self.next_id, 'method': method, 'params': params or {} }))
+        return await asyncio.wait_for(future, timeout_s)
+
+    async def _read(self):
+        async for message in self.websocket:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            payload = json.loads(message.data)
+            if 'id' not in payload:
+                self.events.append(payload)
+                continue
+            future = self.pending.pop(payload['id'], None)
+            if future is None or future.done():
+                continue
+            if 'error' in payload:
+                future.set_exception(Exception(f"DevTools error: {payload['error'].get('message')}"))
+            else:
+                future.set_result(payload.get('result', {}))
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(Exception("The inspector closed the connection"))
+
+    async def close(self):
+        await self.websocket.close()
+        self.reader.cancel()
+
+async def find_inspector_target(session : aiohttp.ClientSession, inspector_port : int) -> str:
+    try:
+        async with session.get(f"http://127.0.0.1:{inspector_port}/json") as response:
+            targets = await response.json(content_type = None)
+    except aiohttp.ClientError:
+        raise Exception(f"Nothing is answering on inspector port {inspector_port}. Is wrangler dev running?")
+    urls = [ target['webSocketDebuggerUrl'] for target in targets if target.get('webSocketDebuggerUrl') ]
+    if not urls:
+        raise Exception(f"The inspector on port {inspector_port} has no debuggable targets (is a DevTools window already attached?)")
+    return urls[0]
+
+async def capture_cpu_profile(inspector_port : int, load : Awaitable[Any], sampling_interval_us : int = DEFAULT_SAMPLING_INTERVAL_US) -> Tuple[Dict[str,Any],Any]:
+    # returns the profile (with call frames mapped to source files) and what 'load' returned
+    async with aiohttp.ClientSession() as session:
+        websocket = await session.ws_connect(await find_inspector_target(session, inspector_port), max_msg_size = 0)
+        devtools = DevToolsSession(websocket)
+        try:
+            # scriptParsed events say where each script's source map is
+            await devtools.send("Debugger.enable")
+            await devtools.send("Profiler.enable")
+            await devtools.send("Profiler.setSamplingInterval", { 'interval': sampling_interval_us })
+            await devtools.send("Profiler.start")
+            try:
+                result = await load
+            finally:
+                profile = (await devtools.send("Profiler.stop"))['profile']
+            scripts = { event['params']['scriptId']: event['params'] for event in devtools.events if event.get('method') == "Debugger.scriptParsed" }
+            await devtools.send("Debugger.disable")
+            await devtools.send("Profiler.disable")
+        finally:
+            await devtools.close()
+    map_profile_to_sources(profile, scripts)
+    return profile, result
+
+class SourceMap:
+
+    def __init__(self, source_map : Dict[str,Any]):
+        self.sources = source_map.get('sources', [])
+        # per generated line: sorted columns, and (source index, line, column) at each
+        self.lines : List[Tuple[List[int],List[Tuple[int,int,int]]]] = []
+        source_index, source_line, source_column = 0, 0, 0
+        for line_mappings in source_map.get('mappings', '').split(";"):
+            columns : List[int] = []
+            positions : List[Tuple[int,int,int]] = []
+            column = 0
+            for segment in filter(None, line_mappings.split(",")):
+                fields = decode_vlq(segment)
+                column += fields[0]
+                if len(fields) >= 4:
+                    source_index += fields[1]
+                    source_line += fields[2]
+                    source_column += fields[3]
+                    columns.append(column)
+                    positions.append((source_index, source_line, source_column))
+            self.lines.append((columns, positions))
+
+    def lookup(self, line : int, column : int) -> Optional[Tuple[str,int,int]]:
+        # zero-based line and column in the bundle -> (source, zero-based line, column), from the closest segment at or before it
+        if line < 0 or line >= len(self.lines):
+            return None
+        (columns, positions) = self.lines[line]
+        i = bisect.bisect_right(columns, column) - 1
+        if i < 0:
+            return None
+        (source_index, source_line, source_column) = positions[i]
+        if source_index >= len(self.sources):
+            return None
+        return normalize_module_path(self.sources[source_index]), source_line, source_column
+
+def _local_path(url : str) -> Optional[str]:
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return unquote(parsed.path)
+    if parsed.scheme == "" and url:
+        return url
+    return None
+
+def load_source_map(script : Dict[str,Any]) -> Optional[SourceMap]:
+    source_map_url = script.get('sourceMapURL') or ""
+    try:
+        if source_map_url.startswith("data:"):
+            return SourceMap(json.loads(base64.b64decode(source_map_url.split(",", 1)[1])))
+        script_path = _local_path(script.get('url') or "")
+        candidates = []
+        if source_map_url:
+            map_path = _local_path(source_map_url)
+            if map_path is not None:
+                candidates.append(map_path if os.path.isabs(map_path) or script_path is None else os.path.join(os.path.dirname(script_path), map_path))
+        if script_path is not None:
+            candidates.append(script_path + ".map")
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                with open(candidate, "r", encoding = "utf-8") as f:
+                    return SourceMap(json.load(f))
+    except (ValueError, OSError):
+        pass
+    return None
+
+def map_profile_to_sources(profile : Dict[str,Any], scripts : Dict[str,Dict[str,Any]]):
+    # rewrites bundle positions in the profile's call frames to the original files (one-based lines in the report)
+    source_maps : Dict[str,Optional[SourceMap]] = {}
+    for node in profile.get('nodes', []):
+        call_frame = node['callFrame']
+        script_id = call_frame.get('scriptId')
+        if script_id not in scripts:
+            continue
+        if script_id not in source_maps:
+            source_maps[script_id] = load_source_map(scripts[script_id])
+        source_map = source_maps[script_id]
+        position = source_map.lookup(call_frame.get('lineNumber', -1), call_frame.get('columnNumber', -1)) if source_map is not None else None
+        if position is not None:
+            call_frame['url'], call_frame['lineNumber'], call_frame['columnNumber'] = position
+
+def function_key(call_frame : Dict[str,Any]) -> Tuple[str,str]:
+    # ('smart_logger.digest', 'logging/smart_logger.ts:42')
+    name = call_frame.get('functionName') or "(anonymous)"
+    url = call_frame.get('url') or ""
+    if not url or name in NON_JS_NODES:
+        return name, url or "(native)"
+    filepath = normalize_module_path(url.split("://", 1)[-1])
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return f"{stem}.{name}", f"{filepath}:{call_frame.get('lineNumber', -1) + 1}"
+
+def sample_durations_us(profile : Dict[str,Any]) -> List[float]:
+    # timeDeltas[i] is the time from sample i-1 to sample i, so sample i is credited with the time until the next one
+    deltas = profile.get('timeDeltas', [])
+    if not deltas:
+        return []
+    durations = [ float(max(delta, 0)) for delta in deltas[1:] ]
+    last_sample_time = profile.get('startTime', 0) + sum(deltas)
+    durations.append(float(max(profile.get('endTime', last_sample_time) - last_sample_time, 0)))
+    return durations
+
+def summarize_cpu_profile(profile : Dict[str,Any]) -> Dict[str,Any]:
+    nodes = { node['id']: node for node in profile.get('nodes', []) }
+    parents : Dict[int,int] = {}
+    for node in nodes.values():
+        for child in node.get('children', []):
+            parents[child] = node['id']
+    stacks : Dict[int,Set[Tuple[str,str]]] = {}
+
+    def stack_of(node_id : int) -> Set[Tuple[str,str]]:
+        # every function on the stack, once (so recursion isn't counted twice towards total time)
+        if node_id not in stacks:
+            parent = parents.get(node_id)
+            key = function_key(nodes[node_id]['callFrame'])
+            stacks[node_id] = (stack_of(parent) if parent is not None else set()) | ({ key } if key[0] != ROOT_NODE else set())
+        return stacks[node_id]
+
+    functions : Dict[Tuple[str,str],Dict[str,float]] = {}
+    files : Dict[str,Dict[str,float]] = {}
+    idle_us, busy_us = 0.0, 0.0
+    for (node_id, duration_us) in zip(profile.get('samples', []), sample_durations_us(profile)):
+        if node_id not in nodes:
+            continue
+        leaf = function_key(nodes[node_id]['callFrame'])
+        if leaf[0] == IDLE_NODE:
+            idle_us += duration_us
+            continue
+        busy_us += duration_us
+        functions.setdefault(leaf, { 'self_us': 0.0, 'total_us': 0.0 })['self_us'] += duration_us
+        stack = stack_of(node_id)
+        for key in stack:
+            functions.setdefault(key, { 'self_us': 0.0, 'total_us': 0.0 })['total_us'] += duration_us
+        leaf_file = leaf[1].rsplit(":", 1)[0]
+        files.setdefault(leaf_file, { 'self_us': 0.0, 'total_us': 0.0 })['self_us'] += duration_us
+        for filepath in { location.rsplit(":", 1)[0] for (_, location) in stack }:
+            files.setdefault(filepath, { 'self_us': 0.0, 'total_us': 0.0 })['total_us'] += duration_us
+
+    def rows(times : Dict[Any,Dict[str,float]], name_of) -> List[Dict[str,Any]]:
+        table = [ {
+            **name_of(key),
+            'self_ms': round(value['self_us'] / 1000.0, 2),
+            'self_pct': round(100.0 * value['self_us'] / busy_us, 1) if busy_us else 0.0,
+            'total_ms': round(value['total_us'] / 1000.0, 2),
+            'total_pct': round(100.0 * value['total_us'] / busy_us, 1) if busy_us else 0.0
+        } for (key, value) in times.items() ]
+        return sorted(table, key = lambda row: (-row['self_ms'], -row['total_ms']))
+
+    return {
+        'busy_ms': round(busy_us / 1000.0, 2),
+        'idle_ms': round(idle_us / 1000.0, 2),
+        'samples': len(profile.get('samples', [])),
+        'functions': rows(functions, lambda key: { 'function': key[0], 'location': key[1] }),
+        'files': rows(files, lambda key: { 'file': key })
+    }
+
+def print_cpu_profile_summary(summary : Dict[str,Any], top : int = 25):
+    print("===CPU PROFILE===")
+    print(f"{summary['samples']} samples, {summary['busy_ms']}ms busy, {summary['idle_ms']}ms idle (percentages are of busy time)")
+    for (title, name_column, rows) in [ ("functions", 'function', summary['functions']), ("files", 'file', summary['files']) ]:
+        print("")
+        print(f"top {min(top, len(rows))} {title} by self time:")
+        name_width = max([ len(row[name_column]) for row in rows[:top] ] + [ len(name_column) ]) + 2
+        header = name_column.ljust(name_width) + "".join(column.rjust(12) for column in [ 'self_ms', 'self_%', 'total_ms', 'total_%' ])
+        print(header + ("  location" if name_column == 'function' else ""))
+        for row in rows[:top]:
+            line = row[name_column].ljust(name_width) + "".join(str(row[column]).rjust(12) for column in [ 'self_ms', 'self_pct', 'total_ms', 'total_pct' ])
+            print(line + (f"  {row['location']}" if name_column == 'function' else ""))
@@ -1,25 +1,175 @@
 from argparse import ArgumentParser
-import time
-import requests
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote_plus
+import asyncio, json, time
+import aiohttp # pip install aiohttp
+
+# Drives the worker's scheduled() handler through wrangler dev's /__scheduled endpoint (requires --test-scheduled).
+# Fire times are computed from the cron expressions on an absolute clock, so slow invocations don't make the schedule drift.
+# With --time_scale, simulated time runs faster than real time (ex: 60 = one simulated minute per second).
+#
+# This file is run directly as a script, so it deliberately has no imports from the rest of scripts/
+
+FIELD_RANGES = [
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day_of_month', 1, 31),
+    ('month', 1, 12),
+    ('day_of_week', 0, 7) # 0 and 7 are both sunday
+]
+
+class CronExpression:
+
+    def __init__(self, expression : str):
+        self.expression = expression.strip()
+        fields = self.expression.split()
+        if len(fields) != 5:
+            raise Exception(f"Expected 5 fields in cron expression: '{expression}'")
+        parsed = [ _parse_field(field, name, lo, hi) for (field, (name, lo, hi)) in zip(fields, FIELD_RANGES) ]
+        self.minutes, self.hours, self.days_of_month, self.months, self.days_of_week = parsed
+        # standard cron: if both day fields are restricted, a day matches if either matches
+        self.day_of_month_restricted = fields[2] != '*'
+        self.day_of_week_restricted = fields[4] != '*'
+
+    def day_matches(self, t : datetime) -> bool:
+        dom = t.day in self.days_of_month
+        dow = ((t.weekday() + 1) % 7) in self.days_of_week # python: monday=0, cron: sunday=0
+        if self.day_of_month_restricted and self.day_of_week_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_fire_time(self, after : datetime) -> datetime:
+        t = after.replace(second = 0, microsecond = 0) + timedelta(minutes = 1)
+        limit = t + timedelta(days = 366*5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day = 1, hour = 0, minute = 0) + timedelta(days = 32)).replace(day = 1)
+            elif not self.day_matches(t):
+                t = t.replace(hour = 0, minute = 0) + timedelta(days = 1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute = 0) + timedelta(hours = 1)
+            elif t.minute not in self.minutes:
+                t = t + timedelta(minutes = 1)
+            else:
+                return t
+        raise Exception(f"Cron expression never fires: '{self.expression}'")
+
+def _parse_field(field : str, name : str, lo : int, hi : int) -> Set[int]:
+    values : Set[int] = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step <= 0:
+                raise Exception(f"Bad step in {name} field: '{field}'")
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = hi if step > 1 else start
+        if start < lo or end > hi or start > end:
+            raise Exception(f"Out of range {name} field: '{field}'")
+        values.update(range(start, end + 1, step))
+    if name == 'day_of_week':
+        values = { value % 7 for value in values }
+    return values
+
+class SimulatedClock:
+    # maps real elapsed time onto simulated time, time_scale times faster
+    def __init__(self, time_scale : float, start : Optional[datetime] = None):
+        self.time_scale = time_scale
+        self.sim_start = start or datetime.now()
+        self.real_start = time.monotonic()
+
+    def now(self) -> datetime:
+        return self.sim_start + timedelta(seconds = (time.monotonic() - self.real_start) * self.time_scale)
+
+    async def sleep_until(self, sim_time : datetime):
+        real_delay_s = (sim_time - self.now()).total_seconds() / self.time_scale
+        if real_delay_s > 0:
+            await asyncio.sleep(real_delay_s)
+
+class InvocationTimings:
+    def __init__(self):
+        self.durations_s : Dict[str,List[float]] = {}
+        self.failures : Dict[str,int] = {}
+        self.overlaps : Dict[str,int] = {}
+
+    def record(self, cron : str, duration_s : float, ok : bool):
+        self.durations_s.setdefault(cron, []).append(duration_s)
+        if not ok:
+            self.failures[cron] = self.failures.get(cron, 0) + 1
+
+    def print_summary(self):
+        print("")
+        for cron, durations in self.durations_s.items():
+            ordered = sorted(durations)
+            p50 = ordered[len(ordered)//2]
+            p95 = ordered[min(len(ordered)-1, int(0.95*len(ordered)))]
+            print(f"'{cron}': {len(ordered)} invocations, {self.failures.get(cron, 0)} failed, {self.overlaps.get(cron, 0)} overlapped | p50 {1000*p50:.1f}ms, p95 {1000*p95:.1f}ms, max {1000*ordered[-1]:.1f}ms")
 
 def parse_args():
     parser = ArgumentParser()
     parser.add_argument("--port", type = int, required = True)
+    parser.add_argument("--cron", type = str, action = "append", default = None, help = "Cron expression to fire. May be repeated. Defaults to '* * * * *'")
+    parser.add_argument("--time_scale", type = float, required = False, default = 1.0, help = "Simulated seconds per real second")
+    parser.add_argument("--max_invocations", type = int, required = False, default = None)
+    parser.add_argument("--timings_file", type = str, required = False, default = None, help = "Append one JSON line per invocation")
     args = parser.parse_args()
     return args
 
-def do_it(args):
-    every_minute_url = f'http://localhost:{args.port}/__scheduled?cron=*+*+*+*+*'
-    while True:
+async def invoke(session : aiohttp.ClientSession, url : str, cron : str, fire_time : datetime, timings : InvocationTimings, timings_file : Optional[str]):
+    start = time.perf_counter()
+    status = None
+    try:
+        async with session.post(url) as response:
+            await response.read()
+            status = response.status
+    except Exception as e:
+        print(f"_scheduled invocation '{cron}' failed: {e}")
+    duration_s = time.perf_counter() - start
+    ok = status is not None and status < 400
+    timings.record(cron, duration_s, ok)
+    print(f"_scheduled invocation '{cron}' @ {fire_time.isoformat(timespec = 'minutes')} -> {status} in {1000*duration_s:.1f}ms")
+    if timings_file:
+        with open(timings_file, "a") as f:
+            f.write(json.dumps({ 'cron': cron, 'scheduled_for': fire_time.isoformat(), 'status': status, 'duration_ms': round(1000*duration_s, 3) }) + "\n")
+
+async def run_schedule(session : aiohttp.ClientSession, port : int, cron : CronExpression, clock : SimulatedClock, timings : InvocationTimings, max_invocations : Optional[int], timings_file : Optional[str]):
+    url = f'http://localhost:{port}/__scheduled?cron={quote_plus(cron.expression)}'
+    in_flight : Set[asyncio.Task] = set()
+    fire_time = cron.next_fire_time(clock.now())
+    invocations = 0
+    while max_invocations is None or invocations < max_invocations:
+        await clock.sleep_until(fire_time)
+        if in_flight:
+            timings.overlaps[cron.expression] = timings.overlaps.get(cron.expression, 0) + 1
+        task = asyncio.ensure_future(invoke(session, url, cron.expression, fire_time, timings, timings_file))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        invocations += 1
+        # next fire time comes from the schedule, not from when this invocation finishes
+        fire_time = cron.next_fire_time(fire_time)
+    await asyncio.gather(*in_flight)
+
+async def do_it(args):
+    crons = [ CronExpression(expression) for expression in (args.cron or ['* * * * *']) ]
+    clock = SimulatedClock(args.time_scale)
+    timings = InvocationTimings()
+    async with aiohttp.ClientSession() as session:
         try:
-            print("_scheduled invocation")
-            requests.post(every_minute_url)
-        except Exception as e:
-            print("_scheduled invocation failed: " + str(e))
+            await asyncio.gather(*[ run_schedule(session, args.port, cron, clock, timings, args.max_invocations, args.timings_file) for cron in crons ])
         finally:
-            time.sleep(60)
-
+            timings.print_summary()
 
 if __name__ == "__main__":
     args = parse_args()
-    do_it(args)
\ No newline at end of file
+    try:
+        asyncio.run(do_it(args))
+    except KeyboardInterrupt:
+        pass
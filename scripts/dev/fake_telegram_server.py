@@ -0,0 +1,502 @@
+import asyncio, json, threading, time, uuid, hashlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector # pip install aiohttp
+
+from dev.local_dev_common import FAKE_TELEGRAM_BOT_ID, FAKE_TELEGRAM_BOT_USERNAME, FAKE_TELEGRAM_SERVER_PORT, LOCAL_CLOUDFLARE_WORKER_URL
+from dev.telegram_emulation import EmulationSettings, TelegramEmulation
+from dev.telegram_updates import make_callback_query, make_callback_query_update, make_message, make_message_update, make_private_chat, make_user
+
+# An in-memory stand-in for the Telegram Bot API (and the telegram-bot-api local server).
+# The worker talks to it through TELEGRAM_BOT_SERVER_URL, and it pushes updates to the worker's webhook.
+# Nothing is persisted - restarting the server starts every chat from scratch.
+# With an emulation (see telegram_emulation.py), it also applies Telegram's rate limits, latency and errors.
+
+DEFAULT_MAX_CONNECTIONS = 40 # same default as Telegram
+WEBHOOK_TIMEOUT_SECONDS = 60
+# update types a webhook only gets if it asks for them in allowed_updates
+DEFAULT_EXCLUDED_UPDATE_TYPES = { 'chat_member', 'message_reaction', 'message_reaction_count' }
+
+class TelegramAPIError(Exception):
+    def __init__(self, error_code : int, description : str, parameters : Optional[Dict[str,Any]] = None):
+        super().__init__(description)
+        self.error_code = error_code
+        self.description = description
+        self.parameters = parameters
+
+class FakeChat:
+    def __init__(self, chat_id : int):
+        self.chat_id = chat_id
+        self.messages : Dict[int,Dict[str,Any]] = {}
+        self.last_message_id = 0
+
+    def next_message_id(self) -> int:
+        self.last_message_id += 1
+        return self.last_message_id
+
+    def add_message(self, message : Dict[str,Any]):
+        self.messages[message['message_id']] = message
+        self.last_message_id = max(self.last_message_id, message['message_id'])
+
+    def get_message(self, message_id : int, purpose : str) -> Dict[str,Any]:
+        message = self.messages.get(message_id)
+        if message is None:
+            raise TelegramAPIError(400, f"Bad Request: message to {purpose} not found")
+        return message
+
+    def to_json(self) -> Dict[str,Any]:
+        return { 'chat_id': self.chat_id, 'last_message_id': self.last_message_id, 'messages': list(self.messages.values()) }
+
+class FakeTelegramServer:
+
+    def __init__(self,
+                 bot_id : int = FAKE_TELEGRAM_BOT_ID,
+                 bot_username : str = FAKE_TELEGRAM_BOT_USERNAME,
+                 webhook_url : Optional[str] = LOCAL_CLOUDFLARE_WORKER_URL,
+                 secret_token : Optional[str] = None,
+                 max_connections : int = DEFAULT_MAX_CONNECTIONS,
+                 emulation : Optional[TelegramEmulation] = None):
+        self.bot_user = make_user(bot_id, first_name = "Fake Bot", username = bot_username, is_bot = True)
+        self.chats : Dict[int,FakeChat] = {}
+        self.commands : List[Dict[str,Any]] = []
+        # file_id -> the File object getFile returns for it
+        self.files : Dict[str,Dict[str,Any]] = {}
+        self.answered_callback_queries : Dict[str,Dict[str,Any]] = {}
+        self.webhook_url = webhook_url
+        self.secret_token = secret_token
+        self.max_connections = max_connections
+        self.emulation = emulation
+        self.allowed_updates : Optional[List[str]] = None
+        self.last_update_id = 0
+        self.update_queue : "asyncio.Queue[Dict[str,Any]]" = asyncio.Queue()
+        self.method_counts : Dict[str,int] = {}
+        self.webhook_stats = { 'delivered': 0, 'failed': 0, 'filtered': 0, 'total_latency_s': 0.0 }
+        # like Telegram, getWebhookInfo reports updates being delivered as pending too, and the most recent delivery error
+        self.in_flight_updates = 0
+        self.last_error_date : Optional[int] = None
+        self.last_error_message : Optional[str] = None
+        self.methods : Dict[str,Callable[[Dict[str,Any]],Any]] = {
+            'getMe':               self.get_me,
+            'logOut':              self.log_out,
+            'sendMessage':         self.send_message,
+            'editMessageText':     self.edit_message_text,
+            'deleteMessage':       self.delete_message,
+            'answerCallbackQuery': self.answer_callback_query,
+            'setWebhook':          self.set_webhook,
+            'deleteWebhook':       self.delete_webhook,
+            'getWebhookInfo':      self.get_webhook_info,
+            'setMyCommands':       self.set_my_commands,
+            'sendPhoto':           self.send_photo,
+            'getFile':             self.get_file,
+        }
+        self._runner : Optional[web.AppRunner] = None
+        self._session : Optional[ClientSession] = None
+        self._delivery_tasks : List[asyncio.Task] = []
+        # delivery tasks waiting for an update (safe to cancel), and how many busy ones should exit once their update is delivered
+        self._idle_delivery_tasks : Set[asyncio.Task] = set()
+        self._retiring_delivery_tasks = 0
+
+    # ---- lifecycle ----
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size = 20*1024*1024)
+        app.router.add_route('*', '/bot{token}/{method}', self.handle_bot_api_request)
+        app.router.add_get('/fake/chats/{chat_id}', self.handle_get_chat)
+        app.router.add_post('/fake/chats/{chat_id}/messages', self.handle_post_user_message)
+        app.router.add_post('/fake/chats/{chat_id}/callback_queries', self.handle_post_callback_query)
+        app.router.add_post('/fake/updates', self.handle_post_updates)
+        app.router.add_get('/fake/stats', self.handle_get_stats)
+        app.router.add_get('/fake/emulation', self.handle_get_emulation)
+        app.router.add_post('/fake/emulation', self.handle_post_emulation)
+        return app
+
+    async def start(self, host : str = '127.0.0.1', port : int = FAKE_TELEGRAM_SERVER_PORT):
+        self._session = ClientSession(connector = TCPConnector(limit = 0), timeout = ClientTimeout(total = WEBHOOK_TIMEOUT_SECONDS))
+        self._runner = web.AppRunner(self.make_app(), access_log = None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self._resize_delivery_pool()
+
+    async def stop(self):
+        for task in self._delivery_tasks:
+            task.cancel()
+        await asyncio.gather(*self._delivery_tasks, return_exceptions = True)
+        self._delivery_tasks = []
+        self._idle_delivery_tasks.clear()
+        self._retiring_delivery_tasks = 0
+        if self._session is not None:
+            await self._session.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # ---- webhook delivery ----
+
+    def push_update(self, update : Dict[str,Any]) -> int:
+        if 'update_id' not in update:
+            update = { 'update_id': self.next_update_id(), **update }
+        self.last_update_id = max(self.last_update_id, update['update_id'])
+        # like Telegram, updates of a type the webhook doesn't want are never queued (they still use up an update_id)
+        if self._is_allowed_update(update):
+            self.update_queue.put_nowait(update)
+        else:
+            self.webhook_stats['filtered'] += 1
+        return update['update_id']
+
+    def _is_allowed_update(self, update : Dict[str,Any]) -> bool:
+        update_type = next((key for key in update if key != 'update_id'), None)
+        if not self.allowed_updates:
+            # Telegram's default (and what an empty list means)
+            return update_type not in DEFAULT_EXCLUDED_UPDATE_TYPES
+        return update_type in self.allowed_updates
+
+    def next_update_id(self) -> int:
+        self.last_update_id += 1
+        return self.last_update_id
+
+    def _resize_delivery_pool(self):
+        # one task per allowed concurrent webhook connection, like Telegram's max_connections
+        self._delivery_tasks = [ t for t in self._delivery_tasks if not t.done() ]
+        active = len(self._delivery_tasks) - self._retiring_delivery_tasks
+        if active < self.max_connections:
+            # growing again: keep tasks that were about to retire before starting new ones
+            kept = min(self._retiring_delivery_tasks, self.max_connections - active)
+            self._retiring_delivery_tasks -= kept
+            active += kept
+        while active < self.max_connections:
+            self._delivery_tasks.append(asyncio.ensure_future(self._deliver_updates()))
+            active += 1
+        # shrinking: idle tasks stop now, busy ones finish delivering their update first (cancelling them would lose it)
+        for task in list(self._idle_delivery_tasks)[:max(0, active - self.max_connections)]:
+            task.cancel()
+            self._idle_delivery_tasks.discard(task)
+            self._delivery_tasks.remove(task)
+            active -= 1
+        self._retiring_delivery_tasks += max(0, active - self.max_connections)
+
+    async def _deliver_updates(self):
+        task = asyncio.current_task()
+        while True:
+            if self._retiring_delivery_tasks > 0:
+                self._retiring_delivery_tasks -= 1
+                return
+            self._idle_delivery_tasks.add(task)
+            try:
+                update = await self.update_queue.get()
+            finally:
+                self._idle_delivery_tasks.discard(task)
+            try:
+                await self._deliver_update(update)
+            finally:
+                self.update_queue.task_done()
+
+    async def _deliver_update(self, update : Dict[str,Any]):
+        if self.webhook_url is None or self._session is None:
+            return
+        headers = { 'Content-Type': 'application/json' }
+        if self.secret_token:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = self.secret_token
+        start = time.perf_counter()
+        self.in_flight_updates += 1
+        try:
+            async with self._session.post(self.webhook_url, data = json.dumps(update), headers = headers) as response:
+                await response.read()
+                ok = response.status == 200
+                error_message = None if ok else f"Wrong response from the webhook: {response.status} {response.reason}"
+        except Exception as e:
+            print(f"Webhook delivery of update {update['update_id']} failed: {e}")
+            ok = False
+            error_message = f"Connection failed: {e}"
+        finally:
+            self.in_flight_updates -= 1
+        if error_message is not None:
+            self.last_error_date = int(time.time())
+            self.last_error_message = error_message
+        self.webhook_stats['delivered' if ok else 'failed'] += 1
+        self.webhook_stats['total_latency_s'] += time.perf_counter() - start
+
+    # ---- chat state ----
+
+    def get_chat(self, chat_id : Union[int,str]) -> FakeChat:
+        chat_id = int(chat_id)
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = FakeChat(chat_id)
+            self.chats[chat_id] = chat
+        return chat
+
+    def add_user_message(self, chat_id : int, sender : Dict[str,Any], text : str, reply_to_message_id : Optional[int] = None) -> Dict[str,Any]:
+        chat = self.get_chat(chat_id)
+        reply_to_message = chat.messages.get(reply_to_message_id) if reply_to_message_id is not None else None
+        message = make_message(chat.next_message_id(), sender, make_private_chat(sender), text = text, reply_to_message = reply_to_message)
+        chat.add_message(message)
+        return message
+
+    def add_callback_query(self, chat_id : int, sender : Dict[str,Any], message_id : int, data : str) -> Dict[str,Any]:
+        message = self.get_chat(chat_id).get_message(message_id, "click")
+        return make_callback_query(uuid.uuid4().hex, sender, message, data)
+
+    def _new_bot_message(self, params : Dict[str,Any]) -> Dict[str,Any]:
+        chat = self.get_chat(_required(params, 'chat_id'))
+        chat_json = { 'id': chat.chat_id, 'type': 'private' }
+        message = make_message(chat.next_message_id(), self.bot_user, chat_json)
+        if 'reply_markup' in params:
+            message['reply_markup'] = _maybe_json(params['reply_markup'])
+        chat.add_message(message)
+        return message
+
+    # ---- Bot API methods ----
+
+    def get_me(self, params : Dict[str,Any]):
+        return { **self.bot_user, 'can_join_groups': False, 'can_read_all_group_messages': False, 'supports_inline_queries': False }
+
+    def log_out(self, params : Dict[str,Any]):
+        return True
+
+    def send_message(self, params : Dict[str,Any]):
+        message = self._new_bot_message(params)
+        message['text'] = _required(params, 'text')
+        return message
+
+    def edit_message_text(self, params : Dict[str,Any]):
+        chat = self.get_chat(_required(params, 'chat_id'))
+        message = chat.get_message(int(_required(params, 'message_id')), "edit")
+        text = _required(params, 'text')
+        reply_markup = _maybe_json(params.get('reply_markup'))
+        if message.get('text') == text and message.get('reply_markup') == reply_markup:
+            raise TelegramAPIError(400, "Bad Request: message is not modified: specified new message content and reply markup are exactly the same as a current content and reply markup of the message")
+        message['text'] = text
+        message['edit_date'] = int(time.time())
+        if reply_markup is None:
+            message.pop('reply_markup', None)
+        else:
+            message['reply_markup'] = reply_markup
+        return message
+
+    def delete_message(self, params : Dict[str,Any]):
+        chat = self.get_chat(_required(params, 'chat_id'))
+        message_id = int(_required(params, 'message_id'))
+        chat.get_message(message_id, "delete")
+        del chat.messages[message_id]
+        return True
+
+    def answer_callback_query(self, params : Dict[str,Any]):
+        callback_query_id = str(_required(params, 'callback_query_id'))
+        self.answered_callback_queries[callback_query_id] = params
+        return True
+
+    def set_webhook(self, params : Dict[str,Any]):
+        self.webhook_url = params.get('url') or None
+        self.secret_token = params.get('secret_token') or self.secret_token
+        self.allowed_updates = _maybe_json(params.get('allowed_updates'))
+        self.max_connections = int(params.get('max_connections', DEFAULT_MAX_CONNECTIONS))
+        if _truthy(params.get('drop_pending_updates')):
+            self._drop_pending_updates()
+        self._resize_delivery_pool()
+        return True
+
+    def delete_webhook(self, params : Dict[str,Any]):
+        self.webhook_url = None
+        if _truthy(params.get('drop_pending_updates')):
+            self._drop_pending_updates()
+        return True
+
+    def get_webhook_info(self, params : Dict[str,Any]):
+        info : Dict[str,Any] = {
+            'url': self.webhook_url or '',
+            'has_custom_certificate': False,
+            'pending_update_count': self.update_queue.qsize() + self.in_flight_updates,
+            'max_connections': self.max_connections
+        }
+        if self.allowed_updates is not None:
+            info['allowed_updates'] = self.allowed_updates
+        if self.last_error_date is not None:
+            info['last_error_date'] = self.last_error_date
+            info['last_error_message'] = self.last_error_message
+        return info
+
+    def set_my_commands(self, params : Dict[str,Any]):
+        self.commands = _maybe_json(_required(params, 'commands'))
+        return True
+
+    def send_photo(self, params : Dict[str,Any]):
+        photo = _required(params, 'photo')
+        if isinstance(photo, (bytes,bytearray)):
+            file_unique_id = hashlib.sha256(photo).hexdigest()[:16]
+            file_size = len(photo)
+        else:
+            file_unique_id = hashlib.sha256(str(photo).encode('utf-8')).hexdigest()[:16]
+            file_size = 0
+        message = self._new_bot_message(params)
+        message['photo'] = [{ 'file_id': f"fake-photo-{file_unique_id}", 'file_unique_id': file_unique_id, 'width': 640, 'height': 360, 'file_size': file_size }]
+        self.files[f"fake-photo-{file_unique_id}"] = { 'file_id': f"fake-photo-{file_unique_id}", 'file_unique_id': file_unique_id, 'file_size': file_size, 'file_path': f"photos/{file_unique_id}.jpg" }
+        if 'caption' in params:
+            message['caption'] = params['caption']
+        return message
+
+    def get_file(self, params : Dict[str,Any]):
+        file = self.files.get(str(_required(params, 'file_id')))
+        if file is None:
+            raise TelegramAPIError(400, "Bad Request: invalid file_id")
+        return file
+
+    def _drop_pending_updates(self):
+        while not self.update_queue.empty():
+            self.update_queue.get_nowait()
+            self.update_queue.task_done()
+
+    # ---- HTTP handlers ----
+
+    async def handle_bot_api_request(self, request : web.Request) -> web.Response:
+        method_name = request.match_info['method']
+        self.method_counts[method_name] = self.method_counts.get(method_name, 0) + 1
+        method = self.methods.get(method_name)
+        if method is None:
+            return _error_response(TelegramAPIError(404, "Not Found: method not found"))
+        try:
+            params = await _read_params(request)
+            if self.emulation is not None and self.emulation.applies_to(method_name):
+                await self._emulate(method_name, params)
+            result = method(params)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except TelegramAPIError as e:
+            return _error_response(e)
+        return web.json_response({ 'ok': True, 'result': result })
+
+    async def _emulate(self, method_name : str, params : Dict[str,Any]):
+        emulation : TelegramEmulation = self.emulation # type: ignore
+        await asyncio.sleep(emulation.sample_latency_s())
+        failure = emulation.check(method_name, params)
+        if failure is not None:
+            raise TelegramAPIError(*failure)
+
+    async def handle_get_emulation(self, request : web.Request) -> web.Response:
+        if self.emulation is None:
+            return web.json_response({ 'ok': False, 'description': 'No emulation configured' }, status = 404)
+        return web.json_response({ 'ok': True, 'result': self.emulation.report() })
+
+    async def handle_post_emulation(self, request : web.Request) -> web.Response:
+        # Replaces the emulation (and its counters). An empty body turns emulation off.
+        body = await request.json() if request.can_read_body else {}
+        try:
+            self.emulation = TelegramEmulation(EmulationSettings(**body)) if body else None
+        except Exception as e:
+            return web.json_response({ 'ok': False, 'description': str(e) }, status = 400)
+        return web.json_response({ 'ok': True, 'result': self.emulation.report() if self.emulation is not None else None })
+
+    async def handle_get_chat(self, request : web.Request) -> web.Response:
+        chat = self.get_chat(request.match_info['chat_id'])
+        return web.json_response(chat.to_json())
+
+    async def handle_post_user_message(self, request : web.Request) -> web.Response:
+        # Records a message as sent by a user.  Optionally delivers it to the webhook as well.
+        body = await request.json()
+        chat_id = int(request.match_info['chat_id'])
+        sender = body.get('from') or make_user(chat_id)
+        message = self.add_user_message(chat_id, sender, body['text'], body.get('reply_to_message_id'))
+        update = make_message_update(self.next_update_id(), message)
+        if body.get('deliver', True):
+            self.push_update(update)
+        return web.json_response({ 'ok': True, 'result': update })
+
+    async def handle_post_callback_query(self, request : web.Request) -> web.Response:
+        body = await request.json()
+        chat_id = int(request.match_info['chat_id'])
+        sender = body.get('from') or make_user(chat_id)
+        try:
+            callback_query = self.add_callback_query(chat_id, sender, int(body['message_id']), body['data'])
+        except TelegramAPIError as e:
+            return _error_response(e)
+        update = make_callback_query_update(self.next_update_id(), callback_query)
+        if body.get('deliver', True):
+            self.push_update(update)
+        return web.json_response({ 'ok': True, 'result': update })
+
+    async def handle_post_updates(self, request : web.Request) -> web.Response:
+        body = await request.json()
+        updates = body if isinstance(body, list) else [body]
+        update_ids = [ self.push_update(update) for update in updates ]
+        return web.json_response({ 'ok': True, 'result': update_ids })
+
+    async def handle_get_stats(self, request : web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> Dict[str,Any]:
+        attempts = self.webhook_stats['delivered'] + self.webhook_stats['failed']
+        return {
+            'chats': len(self.chats),
+            'method_counts': self.method_counts,
+            'pending_update_count': self.update_queue.qsize(),
+            'webhook_delivered': self.webhook_stats['delivered'],
+            'webhook_failed': self.webhook_stats['failed'],
+            'webhook_filtered': self.webhook_stats['filtered'],
+            'webhook_mean_latency_ms': (1000*self.webhook_stats['total_latency_s']/attempts) if attempts else None,
+            'emulation': self.emulation.report() if self.emulation is not None else None
+        }
+
+class FakeTelegramServerThread:
+    # Hosts a FakeTelegramServer on a background event loop, so synchronous scripts (like start_dev_box) can run it in-process.
+    def __init__(self, server_factory : Callable[[], FakeTelegramServer], port : int = FAKE_TELEGRAM_SERVER_PORT):
+        self.server_factory = server_factory
+        self.port = port
+        self.server : Optional[FakeTelegramServer] = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target = self.loop.run_forever, daemon = True, name = "fake-telegram-server")
+
+    def start(self) -> FakeTelegramServer:
+        self.thread.start()
+        self.server = self._run(self._create_and_start())
+        return self.server
+
+    def stop(self):
+        if self.server is not None:
+            self._run(self.server.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout = 5.0)
+
+    async def _create_and_start(self) -> FakeTelegramServer:
+        # the server must be constructed on its own loop (it owns an asyncio.Queue)
+        server = self.server_factory()
+        await server.start(port = self.port)
+        return server
+
+    def _run(self, coroutine : Awaitable[Any]) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result() # type: ignore
+
+async def _read_params(request : web.Request) -> Dict[str,Any]:
+    # The Bot API accepts parameters as a query string, urlencoded/multipart form data, or JSON
+    params : Dict[str,Any] = dict(request.query)
+    if not request.can_read_body:
+        return params
+    if request.content_type == 'application/json':
+        params.update(await request.json())
+    elif request.content_type == 'multipart/form-data':
+        async for part in (await request.multipart()): # type: ignore
+            if part.filename is not None:
+                params[part.name] = await part.read()
+            else:
+                params[part.name] = await part.text()
+    else:
+        params.update(await request.post())
+    return params
+
+def _required(params : Dict[str,Any], name : str) -> Any:
+    if params.get(name) in (None, ''):
+        raise TelegramAPIError(400, f"Bad Request: {name} is empty")
+    return params[name]
+
+def _maybe_json(value : Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def _truthy(value : Any) -> bool:
+    return str(value).lower() in ('true', '1')
+
+def _error_response(e : TelegramAPIError) -> web.Response:
+    body : Dict[str,Any] = { 'ok': False, 'error_code': e.error_code, 'description': e.description }
+    if e.parameters is not None:
+        body['parameters'] = e.parameters
+    return web.json_response(body, status = e.error_code)
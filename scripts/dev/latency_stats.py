@@ -0,0 +1,77 @@
+import math
+from typing import Any, Dict, List, Optional
+
+# Latency samples grouped by a label (ex: the worker's messageType), with percentile summaries.
+# Samples are kept in full - fine for the volumes a local load test produces.
+
+def percentile(sorted_values : List[float], p : float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = (p / 100.0) * (len(sorted_values) - 1)
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+class LatencyStats:
+
+    def __init__(self):
+        self.samples : Dict[str,List[float]] = {}
+        self.errors : Dict[str,int] = {}
+
+    def record(self, label : str, seconds : float, ok : bool = True):
+        self.samples.setdefault(label, []).append(seconds)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        else:
+            self.errors.setdefault(label, 0)
+
+    def merge(self, other : 'LatencyStats'):
+        for label, samples in other.samples.items():
+            self.samples.setdefault(label, []).extend(samples)
+        for label, errors in other.errors.items():
+            self.errors[label] = self.errors.get(label, 0) + errors
+
+    def summarize(self, duration_s : float) -> Dict[str,Dict[str,Any]]:
+        summary : Dict[str,Dict[str,Any]] = {}
+        labels = sorted(self.samples)
+        for label in labels:
+            summary[label] = _summarize_samples(self.samples[label], self.errors.get(label, 0), duration_s)
+        all_samples = [ s for label in labels for s in self.samples[label] ]
+        summary['ALL'] = _summarize_samples(all_samples, sum(self.errors.values()), duration_s)
+        return summary
+
+def _summarize_samples(samples : List[float], errors : int, duration_s : float) -> Dict[str,Any]:
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'errors': errors,
+        'error_rate': (errors / count) if count else 0.0,
+        'requests_per_s': (count / duration_s) if duration_s > 0 else None,
+        'mean_ms': _ms(sum(ordered) / count) if count else None,
+        'p50_ms': _ms(percentile(ordered, 50)),
+        'p95_ms': _ms(percentile(ordered, 95)),
+        'p99_ms': _ms(percentile(ordered, 99)),
+        'max_ms': _ms(ordered[-1]) if count else None
+    }
+
+def _ms(seconds : Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(1000.0 * seconds, 3)
+
+def print_summary(summary : Dict[str,Dict[str,Any]], title : str = "Latency"):
+    columns = ['count', 'errors', 'error_rate', 'requests_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+    label_width = max([ len(label) for label in summary ] + [len(title)]) + 2
+    print("")
+    print(title.ljust(label_width) + "".join(column.rjust(16) for column in columns))
+    for label, row in summary.items():
+        print(label.ljust(label_width) + "".join(_format_cell(row.get(column)).rjust(16) for column in columns))
+    print("")
+
+def _format_cell(value : Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
@@ -1,6 +1,6 @@
-import psutil # pip install psutil
-import os, sys, socket, time, subprocess, platform
-from typing import List, Union
+import os, sys, socket, time
+import requests
+from typing import Union
 from argparse import ArgumentTypeError
 import debugpy
 import tomli
@@ -14,6 +14,8 @@ LOCAL_TELEGRAM_BOT_API_SERVER_PORT = 80
 
 MITM_PROXY_SERVER_PORT = 8080
 FAKE_TELEGRAM_SERVER_PORT = 8081
+# wrangler dev's DevTools inspector (its default port), used by profile_cpu.py
+LOCAL_CLOUDFLARE_WORKER_INSPECTOR_PORT = 9229
 
 # URLs
 LOCAL_CLOUDFLARE_WORKER_URL = f"http://127.0.0.1:{LOCAL_CLOUDFLARE_WORKER_PORT}"
@@ -21,13 +23,21 @@ LOCAL_TELEGRAM_BOT_API_SERVER_ADDRESS = f"http://127.0.0.1:{LOCAL_TELEGRAM_BOT_A
 LOCAL_MITM_PROXY_SERVER_ADDRESS = f"http://127.0.0.1:{MITM_PROXY_SERVER_PORT}"
 LOCAL_FAKE_TELEGRAM_SERVER_ADDRESS = f"http://127.0.0.1:{FAKE_TELEGRAM_SERVER_PORT}"
 
+# Identity of the bot served by the fake telegram server.
+# The worker needs TELEGRAM_BOT_ID to match in order to recognize replies to the bot.
+FAKE_TELEGRAM_BOT_ID = 7000000001
+FAKE_TELEGRAM_BOT_USERNAME = "fake_solana_foundation_bot"
+
 # Commands
 # --ip is to keep wrangler happy for windows for versions 3.18ish
 START_CLOUDFLARE_LOCAL_WORKER_COMMAND = f'npx wrangler dev --env=dev --port={LOCAL_CLOUDFLARE_WORKER_PORT} --test-scheduled --ip 127.0.0.1'
 START_TELEGRAM_LOCAL_SERVER_COMMAND   = f'telegram-bot-api --api-id={{api_id}} --api-hash={{api_hash}} --dir={{working_dir}} --local --log=log.log --http-port={LOCAL_TELEGRAM_BOT_API_SERVER_PORT}' # --verbosity=4
 TELEGRAM_LOCAL_SERVER_WORKING_DIR = f"telegram_bot_api_working_dir" + os.sep
 START_CRON_POLLER_COMMAND = f'python3 scripts/dev/cron_poller.py --port={LOCAL_CLOUDFLARE_WORKER_PORT}'
-START_TOKEN_LIST_REBUILD_CRON_POLLER_COMMAND = f'python3 scripts/dev/token_list_rebuild_cron_poller.py --port={LOCAL_CLOUDFLARE_WORKER_PORT} --token_list_rebuild_frequency={{token_list_rebuild_frequency}}'
+START_COMPRESSED_TIME_CRON_POLLER_COMMAND = f'python3 scripts/dev/cron_poller.py --port={LOCAL_CLOUDFLARE_WORKER_PORT} --time_scale={{time_scale}}'
+
+def get_local_telegram_bot_api_url(bot_token):
+    return f'{LOCAL_TELEGRAM_BOT_API_SERVER_ADDRESS}/bot{bot_token}'
 
 def parse_bool(x : Union[str,bool]):
     x = str(x).lower().strip()
@@ -65,13 +75,11 @@ def is_port_in_use(port):
         return s.connect_ex(('localhost', port)) == 0
 
 def poll_until_port_is_unoccupied(port, interval = 0.5):
-    while True:
-        if not is_port_in_use(port):
-            print(f"Port {port} is now NOT in use.")
-            break
-        else:
-            print(f"Port {port} is still IN USE. Checking again in {interval} seconds.")
-            time.sleep(interval)
+    if is_port_in_use(port):
+        print(f"Port {port} is IN USE. Waiting for it to be free.")
+    while is_port_in_use(port):
+        time.sleep(interval)
+    print(f"Port {port} is now NOT in use.")
 
 def poll_until_port_is_occupied(port, interval=0.5):
     while True:
@@ -82,46 +90,27 @@ def poll_until_port_is_occupied(port, interval=0.5):
             print(f"Port {port} is not in use. Checking again in {interval} seconds.")
             time.sleep(interval)
 
-def kill_procs(child_procs : List[subprocess.Popen]):
-    
-    print("Attempting cleanup.")
-
-    # Kill child processes
-    for child_proc in child_procs:
+def wait_until_http_ready(name : str, url : str, proc = None, timeout_s : float = 120.0, initial_interval_s : float = 0.05, max_interval_s : float = 2.0) -> float:
+    # Any HTTP response at all (even a 404) means the server is up - a refused connection means it isn't yet.
+    # proc is anything with a Popen-like poll()/returncode (ex: a supervisor ManagedChild).
+    # Checks back off exponentially, so a fast server is noticed within ms and a slow one isn't hammered.
+    start = time.perf_counter()
+    interval_s = initial_interval_s
+    print(f"Waiting for {name} at {url}")
+    while True:
         try:
-            print(f"Killing child process: {child_proc.pid}")
-            deep_proc_kill(child_proc)
-            print("---Child process killed.")
-        except Exception as e:
-            print("Error killing child process: " + str(e))
-
-
-def deep_proc_kill(proc):
-
-    process = psutil.Process(proc.pid)
-    for child in process.children(recursive=True):  # Iterate over child processes
-        child.terminate()
-    process.terminate()
-
-    for child in process.children(recursive=True):
-        child.wait()
-    process.wait()
-
-def execute_shell_command(command : str, **kwargs):
-    command = maybe_source_profile(command)
-    args =  dict(shell = True, cwd = os.getcwd(), bufsize=0)
-    if platform.system().strip() in ['Darwin','Linux']:
-        args["executable"] = "/bin/bash"
-    args = { **args, **kwargs }
-    return subprocess.Popen(command, **args)
-
-def maybe_source_profile(command : str) -> str:
-    if platform.system().strip() in ['Darwin','Linux']:
-        cmd = "source ~/.bashrc && " + command
-    else:
-        cmd = command
-    print(cmd)
-    return cmd
+            requests.get(url, timeout = max(1.0, max_interval_s))
+            elapsed_s = time.perf_counter() - start
+            print(f"{name} is ready ({elapsed_s:.2f}s)")
+            return elapsed_s
+        except requests.RequestException:
+            pass
+        if proc is not None and proc.poll() is not None:
+            raise Exception(f"{name} exited with code {proc.returncode} before it was ready")
+        if time.perf_counter() - start > timeout_s:
+            raise Exception(f"{name} wasn't ready after {timeout_s}s")
+        time.sleep(interval_s)
+        interval_s = min(max_interval_s, interval_s * 2)
 
 FAKE_TELEGRAM_DEBUG_PORT = 5678
 FILE_WATCHER_DEBUG_PORT = 5679
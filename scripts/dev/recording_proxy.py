@@ -0,0 +1,74 @@
+import time
+from typing import Dict, Optional
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector # pip install aiohttp
+
+from dev.local_dev_common import MITM_PROXY_SERVER_PORT
+from dev.traffic_recording import TELEGRAM_API, WEBHOOK, RecordingWriter, make_record
+
+# A reverse proxy that sits on both sides of the worker, and records everything passing through:
+#   /bot<token>/<method>  -> telegram_upstream  (point the worker's TELEGRAM_BOT_SERVER_URL at the proxy)
+#   anything else         -> webhook_upstream   (point the bot's webhook at the proxy)
+# Response bodies are streamed through to the client as they arrive.
+
+HOP_BY_HOP_HEADERS = { 'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers', 'transfer-encoding', 'upgrade', 'host', 'content-length', 'content-encoding' }
+
+class RecordingProxy:
+
+    def __init__(self, telegram_upstream : str, webhook_upstream : str, writer : RecordingWriter):
+        self.telegram_upstream = telegram_upstream.rstrip("/")
+        self.webhook_upstream = webhook_upstream.rstrip("/")
+        self.writer = writer
+        self._session : Optional[ClientSession] = None
+        self._runner : Optional[web.AppRunner] = None
+
+    async def start(self, host : str = '127.0.0.1', port : int = MITM_PROXY_SERVER_PORT):
+        self._session = ClientSession(connector = TCPConnector(limit = 0), timeout = ClientTimeout(total = 120), auto_decompress = True)
+        app = web.Application(client_max_size = 50*1024*1024)
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        self._runner = web.AppRunner(app, access_log = None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+        if self._session is not None:
+            await self._session.close()
+        self.writer.close()
+
+    def route(self, path : str):
+        if path.startswith("/bot"):
+            return TELEGRAM_API, self.telegram_upstream
+        return WEBHOOK, self.webhook_upstream
+
+    async def handle(self, request : web.Request) -> web.StreamResponse:
+        direction, upstream = self.route(request.path)
+        request_headers = _forwardable_headers(request.headers)
+        request_body = await request.read()
+        started_at = time.time()
+        start = time.perf_counter()
+        response_body = bytearray()
+        response : Optional[web.StreamResponse] = None
+        try:
+            async with self._session.request(request.method, upstream + request.path_qs, headers = request_headers, data = request_body, allow_redirects = False) as upstream_response: # type: ignore
+                response = web.StreamResponse(status = upstream_response.status, reason = upstream_response.reason, headers = _forwardable_headers(upstream_response.headers))
+                await response.prepare(request)
+                async for chunk in upstream_response.content.iter_any():
+                    response_body.extend(chunk)
+                    await response.write(chunk)
+                await response.write_eof()
+        except Exception as e:
+            # once prepared, the client already has the upstream's status and headers
+            prepared = response is not None and response.prepared
+            self.writer.write(make_record(direction, request.method, request.path_qs, request_headers, request_body, upstream_response.status if prepared else None, bytes(response_body), started_at, time.perf_counter() - start, error = repr(e)))
+            if not prepared:
+                raise web.HTTPBadGateway(text = str(e))
+            # too late for a 502: cut the connection, so the client sees a truncated response rather than a complete one
+            if request.transport is not None:
+                request.transport.close()
+            return response
+        self.writer.write(make_record(direction, request.method, request.path_qs, request_headers, request_body, upstream_response.status, bytes(response_body), started_at, time.perf_counter() - start))
+        return response
+
+def _forwardable_headers(headers) -> Dict[str,str]:
+    return { k: v for (k,v) in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS }
@@ -0,0 +1,114 @@
+import asyncio, json, random, time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from aiohttp import ClientSession # pip install aiohttp
+
+from dev.latency_stats import LatencyStats
+from dev.telegram_updates import classify_update, make_user
+from dev.webhook_load import is_worker_response_ok
+
+@dataclass
+class SimulationSettings:
+    worker_url : str
+    fake_telegram_url : str
+    secret_token : str
+    bot_id : int
+    steps_per_user : int
+    min_think_time_s : float
+    max_think_time_s : float
+    seed : int
+    menu_codes : List[str] = field(default_factory = list)
+    canned_questions : List[str] = field(default_factory = list)
+    commands : List[str] = field(default_factory = list)
+
+# Relative weights of what a simulated user does next
+ACTION_WEIGHTS = {
+    'click_menu_button': 40,
+    'click_menu_code': 15,
+    'ask_canned_question': 20,
+    'ask_free_text_question': 5,
+    'reply_to_bot': 10,
+    'command': 10
+}
+
+class SimulatedUser:
+
+    def __init__(self, user_id : int, settings : SimulationSettings, stats : LatencyStats):
+        self.user_id = user_id
+        self.user = make_user(user_id, first_name = "Simulated", last_name = str(user_id))
+        self.settings = settings
+        self.stats = stats
+        self.random = random.Random(settings.seed * 1_000_003 + user_id)
+        self.latest_bot_message : Optional[Dict[str,Any]] = None
+
+    async def run(self, session : ClientSession):
+        await self.send_text(session, "/start")
+        for _ in range(self.settings.steps_per_user):
+            await asyncio.sleep(self.random.uniform(self.settings.min_think_time_s, self.settings.max_think_time_s))
+            await self.take_step(session)
+
+    async def take_step(self, session : ClientSession):
+        action = self.random.choices(list(ACTION_WEIGHTS), weights = list(ACTION_WEIGHTS.values()))[0]
+        if action == 'click_menu_button' and self.latest_menu_buttons():
+            button = self.random.choice(self.latest_menu_buttons())
+            await self.click(session, self.latest_bot_message['message_id'], button['callback_data']) # type: ignore
+        elif action == 'click_menu_code' and self.latest_bot_message is not None and self.settings.menu_codes:
+            menu_code = self.random.choice(self.settings.menu_codes)
+            await self.click(session, self.latest_bot_message['message_id'], f"{menu_code}:")
+        elif action == 'ask_canned_question' and self.settings.canned_questions:
+            await self.send_text(session, self.random.choice(self.settings.canned_questions))
+        elif action == 'ask_free_text_question':
+            await self.send_text(session, f"Simulated question #{self.random.randint(0, 1_000_000)}?")
+        elif action == 'reply_to_bot' and self.latest_bot_message is not None:
+            await self.send_text(session, "Simulated reply", reply_to_message_id = self.latest_bot_message['message_id'])
+        elif action == 'command' and self.settings.commands:
+            await self.send_text(session, self.random.choice(self.settings.commands))
+        else:
+            await self.send_text(session, "/start")
+
+    def latest_menu_buttons(self) -> List[Dict[str,Any]]:
+        if self.latest_bot_message is None:
+            return []
+        keyboard = (self.latest_bot_message.get('reply_markup') or {}).get('inline_keyboard') or []
+        return [ button for row in keyboard for button in row if 'callback_data' in button ]
+
+    async def send_text(self, session : ClientSession, text : str, reply_to_message_id : Optional[int] = None):
+        body = { 'from': self.user, 'text': text, 'reply_to_message_id': reply_to_message_id, 'deliver': False }
+        update = await self.fake_telegram_post(session, f"/fake/chats/{self.user_id}/messages", body)
+        if update is not None:
+            await self.post_update(session, update)
+
+    async def click(self, session : ClientSession, message_id : int, callback_data : str):
+        body = { 'from': self.user, 'message_id': message_id, 'data': callback_data, 'deliver': False }
+        update = await self.fake_telegram_post(session, f"/fake/chats/{self.user_id}/callback_queries", body)
+        if update is None:
+            # the menu is gone (ex: the user clicked 'Close'), so start over.
+            self.latest_bot_message = None
+            return
+        await self.post_update(session, update)
+
+    async def fake_telegram_post(self, session : ClientSession, path : str, body : Dict[str,Any]) -> Optional[Dict[str,Any]]:
+        async with session.post(self.settings.fake_telegram_url + path, json = body) as response:
+            response_body = await response.json()
+        if not response_body.get('ok'):
+            return None
+        return response_body['result']
+
+    async def post_update(self, session : ClientSession, update : Dict[str,Any]):
+        message_type = classify_update(update, self.settings.bot_id) or 'unknown'
+        headers = { 'X-Telegram-Bot-Api-Secret-Token': self.settings.secret_token, 'Content-Type': 'application/json' }
+        start = time.perf_counter()
+        try:
+            async with session.post(self.settings.worker_url, data = json.dumps(update), headers = headers) as response:
+                await response.read()
+                ok = is_worker_response_ok(response)
+        except Exception:
+            ok = False
+        self.stats.record(message_type, time.perf_counter() - start, ok)
+        await self.refresh_latest_bot_message(session)
+
+    async def refresh_latest_bot_message(self, session : ClientSession):
+        async with session.get(f"{self.settings.fake_telegram_url}/fake/chats/{self.user_id}") as response:
+            chat = await response.json()
+        bot_messages = [ m for m in chat['messages'] if m['from']['id'] == self.settings.bot_id ]
+        self.latest_bot_message = bot_messages[-1] if bot_messages else None
@@ -0,0 +1,33 @@
+import asyncio
+from typing import List
+from aiohttp import ClientSession, ClientTimeout, TCPConnector # pip install aiohttp
+
+from dev.latency_stats import LatencyStats
+from dev.local_dev_common import SPIN_UP_USERS_DEBUG_PORT, maybe_attach_debugger
+from dev.simulated_user import SimulatedUser, SimulationSettings
+
+REQUEST_TIMEOUT_SECONDS = 60
+
+def spin_up_users(process_index : int, user_ids : List[int], settings : SimulationSettings, ramp_up_s : float, max_connections : int) -> LatencyStats:
+    # Entry point for one simulator process: runs every user in user_ids as an asyncio task
+    if process_index == 0:
+        maybe_attach_debugger("spin_up_users", SPIN_UP_USERS_DEBUG_PORT)
+    return asyncio.run(run_users(user_ids, settings, ramp_up_s, max_connections))
+
+async def run_users(user_ids : List[int], settings : SimulationSettings, ramp_up_s : float, max_connections : int) -> LatencyStats:
+    stats = LatencyStats()
+    connector = TCPConnector(limit = max_connections)
+    async with ClientSession(connector = connector, timeout = ClientTimeout(total = REQUEST_TIMEOUT_SECONDS)) as session:
+        tasks = []
+        for i, user_id in enumerate(user_ids):
+            delay_s = (ramp_up_s * i / len(user_ids)) if user_ids else 0.0
+            tasks.append(asyncio.ensure_future(_run_user_after(delay_s, SimulatedUser(user_id, settings, stats), session)))
+        results = await asyncio.gather(*tasks, return_exceptions = True)
+    failures = [ r for r in results if isinstance(r, Exception) ]
+    if failures:
+        print(f"{len(failures)} simulated users crashed. First failure: {failures[0]!r}")
+    return stats
+
+async def _run_user_after(delay_s : float, user : SimulatedUser, session : ClientSession):
+    await asyncio.sleep(delay_s)
+    await user.run(session)
@@ -0,0 +1,94 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from aiohttp import ClientResponse # pip install aiohttp
+
+# Aggregates the X-Storage-Ops-Profile header a worker running with STORAGE_PROFILING=true puts on each webhook response
+# (see profiling/storage_ops_profile.ts) into a cost per interaction, grouped by messageType and MenuCode.
+
+STORAGE_OPS_PROFILE_HEADER = "X-Storage-Ops-Profile"
+
+# Workers Paid list prices, USD per million. Storage ops are billed in 4KB units.
+PRICE_PER_MILLION_DO_REQUESTS = 0.15
+PRICE_PER_MILLION_STORAGE_READ_UNITS = 0.20
+PRICE_PER_MILLION_STORAGE_WRITE_UNITS = 1.00
+PRICE_PER_MILLION_STORAGE_DELETES = 1.00
+STORAGE_UNIT_BYTES = 4096
+
+COLUMNS = [ 'do_fetches', 'do_request_bytes', 'do_response_bytes', 'reads', 'listed_keys', 'writes', 'written_keys', 'written_bytes', 'deleted_keys' ]
+
+def interaction_label(update : Dict[str,Any], message_type : str) -> Tuple[str,str]:
+    # (messageType, MenuCode or command)
+    if 'callback_query' in update:
+        return (message_type, (update['callback_query'].get('data') or '').split(":")[0])
+    if message_type == 'command':
+        return (message_type, ((update.get('message') or {}).get('text') or '').split(" ")[0])
+    return (message_type, '')
+
+def profile_to_row(profile : Dict[str,Any]) -> Dict[str,int]:
+    storage = profile['storage']
+    return {
+        'do_fetches': sum(profile['doFetches'].values()),
+        'do_request_bytes': profile['doRequestBytes'],
+        'do_response_bytes': profile['doResponseBytes'],
+        'reads': storage['gets'] + storage['lists'],
+        'listed_keys': storage['listedKeys'],
+        'writes': storage['puts'],
+        'written_keys': storage['putKeys'],
+        'written_bytes': storage['putBytes'],
+        'deleted_keys': storage['deleteKeys']
+    }
+
+def cost_per_million_usd(row : Dict[str,float]) -> float:
+    # each key in a multi-key put is billed as its own write (rounded up to 4KB units)
+    write_units = max(row['written_keys'], row['written_bytes'] / STORAGE_UNIT_BYTES)
+    return (row['do_fetches'] * PRICE_PER_MILLION_DO_REQUESTS
+            + row['reads'] * PRICE_PER_MILLION_STORAGE_READ_UNITS
+            + write_units * PRICE_PER_MILLION_STORAGE_WRITE_UNITS
+            + row['deleted_keys'] * PRICE_PER_MILLION_STORAGE_DELETES)
+
+class StorageOpsProfiler:
+
+    def __init__(self):
+        self.rows : Dict[Tuple[str,str],List[Dict[str,int]]] = {}
+        self.do_fetches_by_method : Dict[str,int] = {}
+        self.missing_header = 0
+
+    def observe(self, update : Dict[str,Any], message_type : str, response : ClientResponse):
+        # a webhook_load.ResponseObserver
+        header = response.headers.get(STORAGE_OPS_PROFILE_HEADER)
+        if header is None:
+            self.missing_header += 1
+            return
+        profile = json.loads(header)
+        self.rows.setdefault(interaction_label(update, message_type), []).append(profile_to_row(profile))
+        for (method, count) in profile['doFetches'].items():
+            self.do_fetches_by_method[method] = self.do_fetches_by_method.get(method, 0) + count
+
+    def summarize(self) -> Dict[str,Dict[str,Any]]:
+        summary : Dict[str,Dict[str,Any]] = {}
+        for (message_type, menu_code) in sorted(self.rows):
+            rows = self.rows[(message_type, menu_code)]
+            label = f"{message_type} {menu_code}".strip()
+            summary[label] = _summarize_rows(rows)
+        all_rows = [ row for rows in self.rows.values() for row in rows ]
+        if all_rows:
+            summary['ALL'] = _summarize_rows(all_rows)
+        return summary
+
+def _summarize_rows(rows : List[Dict[str,int]]) -> Dict[str,Any]:
+    mean = { column: sum(row[column] for row in rows) / len(rows) for column in COLUMNS }
+    return { 'count': len(rows), **{ column: round(value, 2) for (column, value) in mean.items() }, 'usd_per_million': round(cost_per_million_usd(mean), 3) }
+
+def print_storage_ops_summary(summary : Dict[str,Dict[str,Any]], do_fetches_by_method : Optional[Dict[str,int]] = None):
+    columns = [ 'count' ] + COLUMNS + [ 'usd_per_million' ]
+    label_width = max([ len(label) for label in summary ] + [ len("interaction") ]) + 2
+    print("")
+    print("===STORAGE OPS PER UPDATE (mean)===")
+    print("")
+    print("interaction".ljust(label_width) + "".join(column.rjust(18) for column in columns))
+    for label, row in summary.items():
+        print(label.ljust(label_width) + "".join(str(row[column]).rjust(18) for column in columns))
+    if do_fetches_by_method:
+        print("")
+        print("UserDO fetches by method: " + ", ".join(f"{method} {count}" for (method, count) in sorted(do_fetches_by_method.items(), key = lambda item: -item[1])))
+    print("")
@@ -0,0 +1,246 @@
+import asyncio, csv, os, shutil, sys, threading, time
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+import psutil # pip install psutil
+
+# Runs the dev box's child processes (wrangler dev, telegram-bot-api, the cron poller...) without a shell in between.
+#   - every line a child prints is prefixed with its name, so the outputs can share one terminal (and optionally a log file)
+#   - a child that crashes is restarted, with exponential backoff, up to max_restarts times
+#   - CPU and RSS of each child's whole process tree are sampled into a time series (optionally streamed to a CSV)
+# The supervisor runs its own event loop on a background thread, so it can be driven from plain synchronous scripts.
+
+RESTART_BACKOFF_BASE_S = 0.5
+MAX_RESTART_BACKOFF_S = 30.0
+# a child that stayed up this long is considered healthy again, and its backoff resets
+HEALTHY_UPTIME_S = 30.0
+STOP_GRACE_PERIOD_S = 5.0
+MAX_LINE_BYTES = 1024*1024
+LOG_COLORS = [ "\033[36m", "\033[33m", "\033[35m", "\033[32m", "\033[34m", "\033[31m" ]
+RESET_COLOR = "\033[0m"
+
+@dataclass
+class ChildSpec:
+    name : str
+    argv : List[str]
+    env : Optional[Dict[str,str]] = None
+    cwd : Optional[str] = None
+    restart : bool = True
+    max_restarts : int = 5
+
+@dataclass
+class ResourceSample:
+    t : float
+    name : str
+    pid : int
+    cpu_percent : float
+    rss_bytes : int
+    num_processes : int
+
+class ManagedChild:
+    # poll() and returncode behave like subprocess.Popen's, except a child that will be restarted still counts as running
+    def __init__(self, spec : ChildSpec):
+        self.spec = spec
+        self.process : Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+        self.returncode : Optional[int] = None
+        self.gave_up = False
+        self._psutil_processes : Dict[int,psutil.Process] = {}
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process is not None else None
+
+    def poll(self) -> Optional[int]:
+        return self.returncode if self.gave_up else None
+
+class Supervisor:
+
+    def __init__(self, log_filepath : Optional[str] = None, metrics_filepath : Optional[str] = None, sample_interval_s : float = 1.0):
+        self.log_filepath = log_filepath
+        self.metrics_filepath = metrics_filepath
+        self.sample_interval_s = sample_interval_s
+        self.children : Dict[str,ManagedChild] = {}
+        self.samples : List[ResourceSample] = []
+        self._colorize = sys.stdout.isatty()
+        self._stopping = False
+        self._start_time = time.monotonic()
+        self._log_file = None
+        self._metrics_file = None
+        self._metrics_writer = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target = self._loop.run_forever, name = "supervisor", daemon = True)
+
+    def start(self):
+        if self.log_filepath:
+            self._log_file = open(self.log_filepath, "a", buffering = 1)
+        if self.metrics_filepath:
+            self._metrics_file = open(self.metrics_filepath, "w", newline = "", buffering = 1)
+            self._metrics_writer = csv.writer(self._metrics_file)
+            self._metrics_writer.writerow([ "t", "name", "pid", "cpu_percent", "rss_bytes", "num_processes" ])
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._sample_forever(), self._loop)
+
+    def start_child(self, spec : ChildSpec) -> ManagedChild:
+        if spec.name in self.children:
+            raise Exception(f"There is already a child called '{spec.name}'")
+        child = ManagedChild(replace(spec, argv = [ _resolve_executable(spec.argv[0]) ] + spec.argv[1:]))
+        color = LOG_COLORS[len(self.children) % len(LOG_COLORS)]
+        self.children[spec.name] = child
+        spawned = threading.Event()
+        asyncio.run_coroutine_threadsafe(self._run_child(child, color, spawned), self._loop)
+        spawned.wait()
+        return child
+
+    def stop(self):
+        self._stopping = True
+        asyncio.run_coroutine_threadsafe(self._stop_all(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        for f in [ self._log_file, self._metrics_file ]:
+            if f is not None:
+                f.close()
+
+    async def _run_child(self, child : ManagedChild, color : str, spawned : threading.Event):
+        spec = child.spec
+        while True:
+            env = { **os.environ, **(spec.env or {}) }
+            try:
+                child.process = await asyncio.create_subprocess_exec(*spec.argv, stdout = asyncio.subprocess.PIPE, stderr = asyncio.subprocess.STDOUT, stdin = asyncio.subprocess.DEVNULL, env = env, cwd = spec.cwd, limit = MAX_LINE_BYTES)
+            except OSError as e:
+                self._log(spec.name, color, f"could not start: {e}")
+                child.returncode, child.gave_up = -1, True
+                spawned.set()
+                return
+            child.returncode = None
+            self._log(spec.name, color, f"started (pid {child.process.pid}): {' '.join(spec.argv)}")
+            spawned.set()
+            started_at = time.monotonic()
+            await self._pump_output(child, color)
+            child.returncode = await child.process.wait()
+            if self._stopping:
+                return
+            uptime_s = time.monotonic() - started_at
+            if uptime_s > HEALTHY_UPTIME_S:
+                child.restarts = 0
+            if not spec.restart or child.restarts >= spec.max_restarts:
+                self._log(spec.name, color, f"exited with code {child.returncode}, not restarting")
+                child.gave_up = True
+                return
+            backoff_s = min(MAX_RESTART_BACKOFF_S, RESTART_BACKOFF_BASE_S * (2 ** child.restarts))
+            child.restarts += 1
+            self._log(spec.name, color, f"exited with code {child.returncode} after {uptime_s:.1f}s, restart {child.restarts}/{spec.max_restarts} in {backoff_s:.1f}s")
+            await asyncio.sleep(backoff_s)
+            if self._stopping:
+                return
+
+    async def _pump_output(self, child : ManagedChild, color : str):
+        stream = child.process.stdout # type: ignore
+        while True:
+            try:
+                line = await stream.readline() # type: ignore
+            except ValueError:
+                # a 'line' longer than MAX_LINE_BYTES (ex: a spinner that never prints a newline)
+                line = await stream.read(MAX_LINE_BYTES) # type: ignore
+            if not line:
+                return
+            self._log(child.spec.name, color, line.decode("utf-8", errors = "replace").rstrip())
+
+    def _log(self, name : str, color : str, line : str):
+        prefix = f"[{name}]"
+        if self._colorize:
+            print(f"{color}{prefix}{RESET_COLOR} {line}", flush = True)
+        else:
+            print(f"{prefix} {line}", flush = True)
+        if self._log_file is not None:
+            self._log_file.write(f"{time.strftime('%H:%M:%S')} {prefix} {line}\n")
+
+    async def _sample_forever(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(self.sample_interval_s)
+
+    def _sample(self):
+        t = round(time.monotonic() - self._start_time, 3)
+        # start_child adds children from the main thread while this runs on the loop's, so iterate over a snapshot
+        for child in list(self.children.values()):
+            if child.process is None or child.process.returncode is not None:
+                continue
+            try:
+                tree = [ psutil.Process(child.process.pid) ]
+                tree += tree[0].children(recursive = True)
+            except psutil.Error:
+                continue
+            cpu_percent, rss_bytes, alive = 0.0, 0, {}
+            for process in tree:
+                # psutil needs to have seen a process once before cpu_percent means anything, so keep the same objects around
+                process = child._psutil_processes.get(process.pid, process)
+                try:
+                    cpu_percent += process.cpu_percent(interval = None)
+                    rss_bytes += process.memory_info().rss
+                    alive[process.pid] = process
+                except psutil.Error:
+                    pass
+            child._psutil_processes = alive
+            sample = ResourceSample(t, child.spec.name, child.process.pid, round(cpu_percent, 1), rss_bytes, len(alive))
+            self.samples.append(sample)
+            if self._metrics_writer is not None:
+                self._metrics_writer.writerow([ sample.t, sample.name, sample.pid, sample.cpu_percent, sample.rss_bytes, sample.num_processes ])
+
+    async def _stop_all(self):
+        await asyncio.gather(*[ _terminate_tree(child) for child in list(self.children.values()) ])
+        tasks = [ task for task in asyncio.all_tasks() if task is not asyncio.current_task() ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+
+    def print_resource_summary(self):
+        print("")
+        print("===RESOURCE USAGE===")
+        print("")
+        for name in list(self.children):
+            samples = [ sample for sample in self.samples if sample.name == name ]
+            if not samples:
+                continue
+            peak_cpu = max(sample.cpu_percent for sample in samples)
+            mean_cpu = sum(sample.cpu_percent for sample in samples) / len(samples)
+            peak_rss_mb = max(sample.rss_bytes for sample in samples) / 1e6
+            rss_growth_mb = (samples[-1].rss_bytes - samples[0].rss_bytes) / 1e6
+            print(f"{name}: cpu mean {mean_cpu:.1f}% peak {peak_cpu:.1f}% | rss peak {peak_rss_mb:.1f}MB, grew {rss_growth_mb:+.1f}MB over {samples[-1].t - samples[0].t:.0f}s | restarts {self.children[name].restarts}")
+
+async def _terminate_tree(child : ManagedChild):
+    if child.process is None or child.process.returncode is not None:
+        return
+    try:
+        descendants = psutil.Process(child.process.pid).children(recursive = True)
+    except psutil.Error:
+        descendants = []
+    for process in descendants:
+        try:
+            process.terminate()
+        except psutil.Error:
+            pass
+    try:
+        child.process.terminate()
+    except ProcessLookupError:
+        pass
+    # the root is reaped by asyncio (not psutil), otherwise asyncio never learns its exit code
+    try:
+        await asyncio.wait_for(child.process.wait(), timeout = STOP_GRACE_PERIOD_S)
+    except asyncio.TimeoutError:
+        child.process.kill()
+        await child.process.wait()
+    _, survivors = await asyncio.get_running_loop().run_in_executor(None, lambda: psutil.wait_procs(descendants, timeout = 1.0))
+    for process in survivors:
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+
+def _resolve_executable(executable : str) -> str:
+    if executable in ("python", "python3"):
+        return sys.executable
+    resolved = shutil.which(executable)
+    if resolved is None:
+        raise Exception(f"Couldn't find '{executable}' on the PATH")
+    return resolved
@@ -0,0 +1,153 @@
+import hashlib, json, math, random, time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from dev.latency_stats import percentile
+from token_bucket import TokenBucket
+
+# Makes the fake telegram server behave more like the real Bot API under load:
+#   - rate limits: about 1 message/s per chat and 30 messages/s overall. Going over gets a 429 with 'retry_after'.
+#   - latency: every emulated call is delayed by a sample from a configurable distribution
+#   - errors: a configurable fraction of emulated calls fail with a 5xx
+# It also keeps score, so a broadcast run against it can report throughput, 429s and messages that never got through.
+# See: https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
+
+# methods that send a new message to a chat, and so count against the rate limits
+RATE_LIMITED_METHODS = { 'sendMessage', 'sendPhoto', 'sendDocument', 'sendAnimation', 'copyMessage', 'forwardMessage' }
+# methods that get latency and errors (setup methods like setWebhook are left alone, so the dev box still starts)
+EMULATED_METHODS = RATE_LIMITED_METHODS | { 'editMessageText', 'deleteMessage', 'answerCallbackQuery' }
+# delivered/s isn't reported over less than this - with only a send or two accepted, it'd be meaningless
+MIN_THROUGHPUT_ELAPSED_S = 1.0
+
+@dataclass
+class LatencyDistribution:
+    # 'none', 'fixed:<ms>', 'uniform:<min ms>:<max ms>' or 'lognormal:<median ms>:<sigma>'
+    spec : str = 'none'
+
+    def __post_init__(self):
+        tokens = self.spec.split(":")
+        self.kind = tokens[0]
+        self.params = [ float(token) for token in tokens[1:] ]
+        expected_params = { 'none': 0, 'fixed': 1, 'uniform': 2, 'lognormal': 2 }
+        if self.kind not in expected_params or len(self.params) != expected_params[self.kind]:
+            raise Exception(f"Invalid latency distribution '{self.spec}' (expected none, fixed:ms, uniform:min_ms:max_ms or lognormal:median_ms:sigma)")
+
+    def sample_s(self, rng : random.Random) -> float:
+        if self.kind == 'fixed':
+            return self.params[0] / 1000.0
+        if self.kind == 'uniform':
+            return rng.uniform(self.params[0], self.params[1]) / 1000.0
+        if self.kind == 'lognormal':
+            return rng.lognormvariate(math.log(self.params[0]), self.params[1]) / 1000.0
+        return 0.0
+
+@dataclass
+class EmulationSettings:
+    per_chat_rate : float = 1.0
+    per_chat_burst : float = 1.0
+    global_rate : float = 30.0
+    global_burst : float = 30.0
+    latency : str = 'lognormal:80:0.5'
+    error_rate : float = 0.0
+    seed : Optional[int] = None
+
+class TelegramEmulation:
+
+    def __init__(self, settings : EmulationSettings):
+        self.settings = settings
+        self.latency = LatencyDistribution(settings.latency)
+        self.rng = random.Random(settings.seed)
+        self.reset()
+
+    def reset(self):
+        self.global_bucket = TokenBucket(self.settings.global_rate, self.settings.global_burst)
+        self.chat_buckets : Dict[str,TokenBucket] = {}
+        self.counts : Dict[str,Dict[str,int]] = {}
+        self.latencies_s : List[float] = []
+        # fingerprint of each attempted send -> times it was accepted
+        self.sends_accepted : Dict[str,int] = {}
+        self.first_send_at : Optional[float] = None
+        self.last_accepted_send_at : Optional[float] = None
+
+    def _count(self, method : str, outcome : str):
+        method_counts = self.counts.setdefault(method, {})
+        method_counts[outcome] = method_counts.get(outcome, 0) + 1
+
+    def applies_to(self, method : str) -> bool:
+        return method in EMULATED_METHODS
+
+    def sample_latency_s(self) -> float:
+        latency_s = self.latency.sample_s(self.rng)
+        self.latencies_s.append(latency_s)
+        return latency_s
+
+    def check(self, method : str, params : Dict[str,Any]) -> Optional[Tuple[int,str,Optional[Dict[str,Any]]]]:
+        # None if the call goes through, otherwise the (error_code, description, parameters) to fail it with
+        if method in RATE_LIMITED_METHODS:
+            fingerprint = _send_fingerprint(params)
+            self.sends_accepted.setdefault(fingerprint, 0)
+            if self.first_send_at is None:
+                self.first_send_at = time.monotonic()
+            chat_bucket = self.chat_buckets.get(str(params.get('chat_id')))
+            if chat_bucket is None:
+                chat_bucket = TokenBucket(self.settings.per_chat_rate, self.settings.per_chat_burst)
+                self.chat_buckets[str(params.get('chat_id'))] = chat_bucket
+            wait_s = max(chat_bucket.wait_time(), self.global_bucket.wait_time())
+            if wait_s > 0:
+                self._count(method, '429')
+                return (429, f"Too Many Requests: retry after {math.ceil(wait_s)}", { 'retry_after': math.ceil(wait_s) })
+        if self.settings.error_rate > 0 and self.rng.random() < self.settings.error_rate:
+            self._count(method, 'error')
+            return (500, "Internal Server Error", None)
+        if method in RATE_LIMITED_METHODS:
+            chat_bucket.consume()
+            self.global_bucket.consume()
+            self.sends_accepted[fingerprint] += 1
+            self.last_accepted_send_at = time.monotonic()
+        self._count(method, 'ok')
+        return None
+
+    def report(self) -> Dict[str,Any]:
+        accepted = sum(1 for count in self.sends_accepted.values() if count > 0)
+        elapsed_s = (self.last_accepted_send_at - self.first_send_at) if (self.first_send_at is not None and self.last_accepted_send_at is not None) else None
+        latencies_s = sorted(self.latencies_s)
+        return {
+            'settings': { **self.settings.__dict__ },
+            'method_outcomes': self.counts,
+            'sends_attempted': len(self.sends_accepted),
+            'sends_delivered': accepted,
+            # sends that were attempted but never accepted (as of now - a client may still be retrying)
+            'sends_dropped': len(self.sends_accepted) - accepted,
+            # the same message accepted more than once (ex: a client retrying after a timeout)
+            'sends_duplicated': sum(count - 1 for count in self.sends_accepted.values() if count > 1),
+            'responses_429': sum(counts.get('429', 0) for counts in self.counts.values()),
+            'responses_error': sum(counts.get('error', 0) for counts in self.counts.values()),
+            'elapsed_s': round(elapsed_s, 3) if elapsed_s is not None else None,
+            'delivered_per_s': round(accepted / elapsed_s, 2) if (elapsed_s is not None and elapsed_s >= MIN_THROUGHPUT_ELAPSED_S) else None,
+            'injected_latency_p50_ms': _ms(percentile(latencies_s, 50)),
+            'injected_latency_p99_ms': _ms(percentile(latencies_s, 99))
+        }
+
+def _send_fingerprint(params : Dict[str,Any]) -> str:
+    # what makes two sends "the same message", for spotting drops and duplicates across retries
+    content = params.get('text') or params.get('caption') or params.get('message_id') or params.get('photo')
+    if isinstance(content, (bytes,bytearray)):
+        content = hashlib.sha256(content).hexdigest()
+    return f"{params.get('chat_id')}:{hashlib.sha256(json.dumps(content, default = str).encode('utf-8')).hexdigest()[:16]}"
+
+def _ms(seconds : Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(1000.0 * seconds, 1)
+
+def print_emulation_report(report : Dict[str,Any]):
+    print("")
+    print("===TELEGRAM EMULATION===")
+    print("")
+    settings = report['settings']
+    print(f"limits: {settings['per_chat_rate']}/s per chat, {settings['global_rate']}/s overall | latency: {settings['latency']} | error rate: {settings['error_rate']}")
+    print(f"sends: {report['sends_attempted']} attempted, {report['sends_delivered']} delivered, {report['sends_dropped']} dropped, {report['sends_duplicated']} duplicated")
+    print(f"responses: {report['responses_429']} x 429, {report['responses_error']} x 5xx")
+    if report['delivered_per_s'] is not None:
+        print(f"throughput: {report['delivered_per_s']} delivered/s over {report['elapsed_s']}s")
+    for (method, outcomes) in sorted(report['method_outcomes'].items()):
+        print(f"  {method}: " + ", ".join(f"{outcome} {count}" for (outcome, count) in sorted(outcomes.items())))
+    print("")
@@ -0,0 +1,82 @@
+import time
+from typing import Any, Dict, List, Optional
+
+# Builders for the subset of Telegram 'Update' objects that the worker understands.
+# See: https://core.telegram.org/bots/api#update
+# The worker's TelegramWebhookInfo decides the messageType from the shape of these objects:
+#   callback_query                     -> 'callback'
+#   message.reply_to_message from bot  -> 'replyToBot'
+#   message with a bot_command entity  -> 'command'
+#   any other message                  -> 'message'
+
+def make_user(user_id : int, first_name : str = "Simulated", last_name : Optional[str] = None, username : Optional[str] = None, is_bot : bool = False) -> Dict[str,Any]:
+    user : Dict[str,Any] = { 'id': user_id, 'is_bot': is_bot, 'first_name': first_name }
+    if last_name is not None:
+        user['last_name'] = last_name
+    if username is not None:
+        user['username'] = username
+    return user
+
+def make_private_chat(user : Dict[str,Any]) -> Dict[str,Any]:
+    chat : Dict[str,Any] = { 'id': user['id'], 'type': 'private', 'first_name': user['first_name'] }
+    if 'last_name' in user:
+        chat['last_name'] = user['last_name']
+    return chat
+
+def make_command_entities(text : str) -> List[Dict[str,Any]]:
+    if not text.startswith("/"):
+        return []
+    command_length = len(text.split()[0])
+    return [{ 'type': 'bot_command', 'offset': 0, 'length': command_length }]
+
+def make_message(message_id : int,
+                 sender : Dict[str,Any],
+                 chat : Dict[str,Any],
+                 text : Optional[str] = None,
+                 reply_to_message : Optional[Dict[str,Any]] = None,
+                 date : Optional[int] = None) -> Dict[str,Any]:
+    message : Dict[str,Any] = {
+        'message_id': message_id,
+        'from': sender,
+        'chat': chat,
+        'date': date if date is not None else int(time.time())
+    }
+    if text is not None:
+        message['text'] = text
+        entities = make_command_entities(text)
+        if entities:
+            message['entities'] = entities
+    if reply_to_message is not None:
+        message['reply_to_message'] = reply_to_message
+    return message
+
+def make_callback_query(callback_query_id : str, sender : Dict[str,Any], message : Dict[str,Any], data : str) -> Dict[str,Any]:
+    return {
+        'id': callback_query_id,
+        'from': sender,
+        'message': message,
+        'chat_instance': str(message['chat']['id']),
+        'data': data
+    }
+
+def make_message_update(update_id : int, message : Dict[str,Any]) -> Dict[str,Any]:
+    return { 'update_id': update_id, 'message': message }
+
+def make_callback_query_update(update_id : int, callback_query : Dict[str,Any]) -> Dict[str,Any]:
+    return { 'update_id': update_id, 'callback_query': callback_query }
+
+def classify_update(update : Dict[str,Any], bot_id : Optional[int] = None) -> Optional[str]:
+    # mirrors TelegramWebhookInfo.extractMessageType
+    if 'callback_query' in update:
+        return 'callback'
+    message = update.get('message')
+    if message is None:
+        return None
+    reply_to_from = (message.get('reply_to_message') or {}).get('from') or {}
+    # without a bot_id (ex: recorded production traffic), any reply to a bot counts
+    is_reply_to_bot = (reply_to_from.get('id') == bot_id) if bot_id is not None else reply_to_from.get('is_bot', False)
+    if is_reply_to_bot:
+        return 'replyToBot'
+    if any(entity.get('type') == 'bot_command' for entity in (message.get('entities') or [])):
+        return 'command'
+    return 'message'
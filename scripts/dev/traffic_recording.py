@@ -0,0 +1,95 @@
+import base64, gzip, json, re, time, zlib
+from typing import Any, Dict, Iterator, Optional
+
+# Recordings are gzipped, newline-delimited JSON - one record per proxied request/response.
+# Each run of the proxy appends a new gzip member, so a recording can be extended but never rewritten,
+# and a crash only loses the records written since the last flush.
+
+# direction of a record
+TELEGRAM_API = "telegram_api" # worker -> Telegram Bot API
+WEBHOOK = "webhook"           # Telegram -> worker
+
+MAX_RECORDED_BODY_BYTES = 1024*1024
+FLUSH_INTERVAL_SECONDS = 1.0
+
+BOT_TOKEN_PATTERN = re.compile(r"/bot[^/]+/")
+REDACTED_HEADERS = { 'x-telegram-bot-api-secret-token', 'authorization', 'cookie' }
+
+def redact_path(path : str) -> str:
+    return BOT_TOKEN_PATTERN.sub("/bot<token>/", path, count = 1)
+
+def redact_headers(headers : Dict[str,str]) -> Dict[str,str]:
+    return { k: ('<redacted>' if k.lower() in REDACTED_HEADERS else v) for (k,v) in headers.items() }
+
+def encode_body(body : bytes) -> Dict[str,Any]:
+    truncated = len(body) > MAX_RECORDED_BODY_BYTES
+    body = body[:MAX_RECORDED_BODY_BYTES]
+    try:
+        encoded : Dict[str,Any] = { 'text': body.decode('utf-8') }
+    except UnicodeDecodeError:
+        encoded = { 'base64': base64.b64encode(body).decode('ascii') }
+    if truncated:
+        encoded['truncated'] = True
+    return encoded
+
+def decode_body(encoded : Dict[str,Any]) -> bytes:
+    if 'text' in encoded:
+        return encoded['text'].encode('utf-8')
+    return base64.b64decode(encoded.get('base64', ''))
+
+def make_record(direction : str,
+                method : str,
+                path : str,
+                request_headers : Dict[str,str],
+                request_body : bytes,
+                status : Optional[int],
+                response_body : bytes,
+                started_at : float,
+                duration_s : float,
+                error : Optional[str] = None) -> Dict[str,Any]:
+    record : Dict[str,Any] = {
+        't': started_at,
+        'direction': direction,
+        'method': method,
+        'path': redact_path(path),
+        'request_headers': redact_headers(request_headers),
+        'request_body': encode_body(request_body),
+        'status': status,
+        'response_body': encode_body(response_body),
+        'duration_ms': round(1000.0 * duration_s, 3)
+    }
+    if error is not None:
+        record['error'] = error
+    return record
+
+class RecordingWriter:
+
+    def __init__(self, filepath : str):
+        self.filepath = filepath
+        self.file = gzip.open(filepath, "ab")
+        self.last_flush = time.monotonic()
+        self.records_written = 0
+
+    def write(self, record : Dict[str,Any]):
+        self.file.write((json.dumps(record, separators = (',',':')) + "\n").encode('utf-8'))
+        self.records_written += 1
+        if time.monotonic() - self.last_flush > FLUSH_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self):
+        # a sync flush makes everything written so far readable, even if the process dies before close()
+        self.file.flush(zlib.Z_SYNC_FLUSH)
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.file.close()
+
+def read_recording(filepath : str) -> Iterator[Dict[str,Any]]:
+    with gzip.open(filepath, "rt", encoding = "utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError):
+            # the tail of a recording from a proxy that was killed mid-write
+            return
@@ -0,0 +1,71 @@
+import asyncio, json, time
+from typing import Any, Dict, List, Optional, Tuple
+from aiohttp import ClientSession, ClientTimeout, TCPConnector # pip install aiohttp
+
+from dev.latency_stats import LatencyStats
+from dev.telegram_updates import classify_update
+from dev.traffic_recording import WEBHOOK, decode_body, read_recording
+from dev.webhook_load import is_worker_response_ok
+
+# Re-injects the webhook side of a recording into a worker.
+# Updates for the same chat are sent one at a time in their recorded order, while different chats run in parallel.
+# speed = 1.0 keeps the recorded timing, 10.0 is ten times faster, and None sends as fast as possible.
+
+def load_webhook_updates(filepath : str) -> List[Tuple[float,Dict[str,Any]]]:
+    updates = []
+    for record in read_recording(filepath):
+        if record['direction'] != WEBHOOK or record['method'] != 'POST':
+            continue
+        try:
+            update = json.loads(decode_body(record['request_body']))
+        except ValueError:
+            continue
+        updates.append((record['t'], update))
+    updates.sort(key = lambda x: x[0])
+    return updates
+
+def chat_id_of(update : Dict[str,Any]) -> Optional[int]:
+    message = update.get('message') or (update.get('callback_query') or {}).get('message') or {}
+    return (message.get('chat') or {}).get('id')
+
+def group_by_chat(updates : List[Tuple[float,Dict[str,Any]]]) -> Dict[Optional[int],List[Tuple[float,Dict[str,Any]]]]:
+    chats : Dict[Optional[int],List[Tuple[float,Dict[str,Any]]]] = {}
+    for (t, update) in updates:
+        chats.setdefault(chat_id_of(update), []).append((t, update))
+    return chats
+
+async def replay_recording(filepath : str,
+                           worker_url : str,
+                           secret_token : str,
+                           speed : Optional[float],
+                           max_concurrency : int,
+                           bot_id : Optional[int] = None) -> Tuple[LatencyStats,float]:
+    updates = load_webhook_updates(filepath)
+    stats = LatencyStats()
+    if not updates:
+        return stats, 0.0
+    first_t = updates[0][0]
+    semaphore = asyncio.Semaphore(max_concurrency)
+    headers = { 'X-Telegram-Bot-Api-Secret-Token': secret_token, 'Content-Type': 'application/json' }
+    replay_start = time.perf_counter()
+
+    async def replay_chat(session : ClientSession, chat_updates : List[Tuple[float,Dict[str,Any]]]):
+        for (t, update) in chat_updates:
+            if speed is not None:
+                delay_s = (t - first_t) / speed - (time.perf_counter() - replay_start)
+                if delay_s > 0:
+                    await asyncio.sleep(delay_s)
+            message_type = classify_update(update, bot_id) or 'unknown'
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(worker_url, data = json.dumps(update), headers = headers) as response:
+                        await response.read()
+                        ok = is_worker_response_ok(response)
+                except Exception:
+                    ok = False
+                stats.record(message_type, time.perf_counter() - start, ok)
+
+    async with ClientSession(connector = TCPConnector(limit = max_concurrency), timeout = ClientTimeout(total = 60)) as session:
+        await asyncio.gather(*[ replay_chat(session, chat_updates) for chat_updates in group_by_chat(updates).values() ])
+    return stats, time.perf_counter() - replay_start
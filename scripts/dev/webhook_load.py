@@ -0,0 +1,95 @@
+import asyncio, json, random, re, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from aiohttp import ClientResponse, ClientSession, ClientTimeout, TCPConnector # pip install aiohttp
+
+from dev.latency_stats import LatencyStats
+from dev.telegram_updates import classify_update, make_callback_query, make_callback_query_update, make_message, make_message_update, make_private_chat, make_user
+
+# Builds a reproducible mix of webhook updates and fires them at the worker.
+# Unlike the simulator, nothing here depends on chat state - message IDs are synthetic,
+# so the same seed always produces byte-for-byte the same updates.
+
+DEFAULT_MIX = { 'command': 25, 'callback': 35, 'message': 25, 'replyToBot': 15 }
+
+# The worker always answers the webhook with a 200 (or TG would redeliver), and encodes failures in the status text
+FAKE_FAILURE_STATUS_TEXT = re.compile(r"^\d{3}:")
+
+def is_worker_response_ok(response : ClientResponse) -> bool:
+    return response.status == 200 and not FAKE_FAILURE_STATUS_TEXT.match(response.reason or '')
+
+FIRST_BENCH_USER_ID = 8_000_000_000
+FIXED_DATE = 1_700_000_000
+
+def generate_update_mix(seed : int,
+                        count : int,
+                        num_users : int,
+                        bot_id : int,
+                        menu_codes : List[str],
+                        canned_questions : List[str],
+                        commands : List[str],
+                        mix : Dict[str,int] = DEFAULT_MIX) -> List[Dict[str,Any]]:
+    rng = random.Random(seed)
+    bot_user = make_user(bot_id, first_name = "Bot", is_bot = True)
+    last_message_ids : Dict[int,int] = {}
+    updates = []
+    for update_id in range(1, count + 1):
+        user_id = FIRST_BENCH_USER_ID + rng.randrange(num_users)
+        user = make_user(user_id, first_name = "Bench", last_name = str(user_id))
+        chat = make_private_chat(user)
+        message_id = last_message_ids.get(user_id, 0) + 1
+        last_message_ids[user_id] = message_id
+        message_type = rng.choices(list(mix), weights = list(mix.values()))[0]
+        if message_type == 'command':
+            message = make_message(message_id, user, chat, text = rng.choice(commands), date = FIXED_DATE)
+            updates.append(make_message_update(update_id, message))
+        elif message_type == 'callback':
+            menu_message = make_message(max(1, message_id - 1), bot_user, chat, text = "menu", date = FIXED_DATE)
+            callback_query = make_callback_query(f"bench-{update_id}", user, menu_message, f"{rng.choice(menu_codes)}:")
+            updates.append(make_callback_query_update(update_id, callback_query))
+        elif message_type == 'message':
+            # mostly FAQ hits, with the occasional miss
+            text = rng.choice(canned_questions) if rng.random() < 0.8 else f"Unrecognized question #{rng.randrange(1_000_000)}?"
+            message = make_message(message_id, user, chat, text = text, date = FIXED_DATE)
+            updates.append(make_message_update(update_id, message))
+        elif message_type == 'replyToBot':
+            question = make_message(max(1, message_id - 1), bot_user, chat, text = "question", date = FIXED_DATE)
+            message = make_message(message_id, user, chat, text = "Bench reply", reply_to_message = question, date = FIXED_DATE)
+            updates.append(make_message_update(update_id, message))
+        else:
+            raise Exception(f"Unknown messageType in mix: {message_type}")
+    return updates
+
+ResponseObserver = Callable[[Dict[str,Any],str,ClientResponse],None]
+
+async def replay_updates(updates : List[Dict[str,Any]],
+                         worker_url : str,
+                         secret_token : str,
+                         bot_id : int,
+                         concurrency : int,
+                         on_response : Optional[ResponseObserver] = None) -> Tuple[LatencyStats,float]:
+    # Sends the updates with at most 'concurrency' in flight.  Returns the stats and the elapsed wall time.
+    stats = LatencyStats()
+    queue : "asyncio.Queue[Dict[str,Any]]" = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    headers = { 'X-Telegram-Bot-Api-Secret-Token': secret_token, 'Content-Type': 'application/json' }
+
+    async def send_all(session : ClientSession):
+        while not queue.empty():
+            update = queue.get_nowait()
+            message_type = classify_update(update, bot_id) or 'unknown'
+            start = time.perf_counter()
+            try:
+                async with session.post(worker_url, data = json.dumps(update), headers = headers) as response:
+                    await response.read()
+                    ok = is_worker_response_ok(response)
+                    if on_response is not None:
+                        on_response(update, message_type, response)
+            except Exception:
+                ok = False
+            stats.record(message_type, time.perf_counter() - start, ok)
+
+    start = time.perf_counter()
+    async with ClientSession(connector = TCPConnector(limit = concurrency), timeout = ClientTimeout(total = 60)) as session:
+        await asyncio.gather(*[ send_all(session) for _ in range(concurrency) ])
+    return stats, time.perf_counter() - start
@@ -0,0 +1,27 @@
+import re
+from typing import List
+import tomli
+
+from commands import read_bot_commands
+
+# Reads bits of the worker's menu graph out of its sources (the typescript, and questions_and_answers.toml),
+# so that simulated traffic stays in step with what the worker actually handles.
+
+MENU_CODE_FILE = "./menus/menu_code.ts"
+QUESTIONS_AND_ANSWERS_FILE = "./questions_and_answers.toml"
+
+def read_menu_codes() -> List[str]:
+    with open(MENU_CODE_FILE, "r", encoding = "utf-8") as f:
+        source = f.read()
+    enum_body = re.search(r"enum\s+MenuCode\s*\{(.*?)\}", source, re.DOTALL)
+    if enum_body is None:
+        raise Exception(f"Could not find enum MenuCode in {MENU_CODE_FILE}")
+    return re.findall(r"\w+\s*=\s*\"(\w+)\"", enum_body.group(1))
+
+def read_canned_questions() -> List[str]:
+    with open(QUESTIONS_AND_ANSWERS_FILE, "rb") as f:
+        source = tomli.load(f)
+    return [ question['question'] for question in source.get('questions', []) ]
+
+def read_commands() -> List[str]:
+    return [ "/" + command['command'] for command in read_bot_commands() ]
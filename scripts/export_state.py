@@ -0,0 +1,43 @@
+import asyncio, time
+from argparse import ArgumentParser
+
+from state_export.cloudflare_kv import CloudflareKV, get_cloudflare_credentials
+from state_export.snapshot import LOCAL_DO_STATE_GLOB, export_kv_namespace, export_local_durable_objects
+
+# Exports state to a gzipped NDJSON snapshot (one record per key), for debugging.
+#   kv:        a Workers KV namespace, through the Cloudflare API (keys listed page by page, values fetched concurrently)
+#   local_do:  the Durable Object storage of a local 'wrangler dev' (.wrangler/state), with values decoded from V8's format
+# Interrupted exports resume where they left off: run the same command again.
+
+def parse_args():
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest = "source", required = True)
+    kv = subparsers.add_parser("kv")
+    kv.add_argument("--namespace_id", type = str, required = False, default = None)
+    kv.add_argument("--namespace", type = str, required = False, default = None, help = "The namespace title, if --namespace_id isn't given")
+    kv.add_argument("--output", type = str, required = True)
+    kv.add_argument("--concurrency", type = int, required = False, default = 32)
+    kv.add_argument("--account_id", type = str, required = False, default = None)
+    kv.add_argument("--api_token", type = str, required = False, default = None)
+    local_do = subparsers.add_parser("local_do")
+    local_do.add_argument("--state_glob", type = str, required = False, default = LOCAL_DO_STATE_GLOB)
+    local_do.add_argument("--output", type = str, required = True)
+    local_do.add_argument("--workers", type = int, required = False, default = 8)
+    return parser.parse_args()
+
+async def export_kv(args) -> int:
+    if args.namespace_id is None and args.namespace is None:
+        raise Exception("Pass --namespace_id or --namespace")
+    account_id, api_token = get_cloudflare_credentials(args.account_id, args.api_token)
+    async with CloudflareKV(account_id, api_token, max_connections = args.concurrency) as kv:
+        namespace_id = args.namespace_id or await kv.get_namespace_id(args.namespace)
+        return await export_kv_namespace(kv, namespace_id, args.output, concurrency = args.concurrency)
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.monotonic()
+    if args.source == "kv":
+        keys_written = asyncio.run(export_kv(args))
+    else:
+        keys_written = export_local_durable_objects(args.output, state_glob = args.state_glob, workers = args.workers)
+    print(f"Exported {keys_written} keys to {args.output} in {time.monotonic() - start:.1f}s")
@@ -0,0 +1,76 @@
+import math
+from typing import Dict, Optional
+
+# A DDSketch-style quantile sketch: values are counted in buckets on a log scale, so any quantile it reports is within
+# 'relative_accuracy' of a value that was actually added, and memory doesn't grow with the number of values.
+# If there are ever more than max_buckets buckets, the lowest ones are merged (so the high quantiles stay accurate).
+# Sketches merge exactly, which is how the rolling windows are combined.
+# See: https://arxiv.org/abs/1908.10693
+
+MIN_POSITIVE_VALUE = 1e-9
+
+class QuantileSketch:
+
+    def __init__(self, relative_accuracy : float = 0.01, max_buckets : int = 2048):
+        if not (0 < relative_accuracy < 1):
+            raise Exception(f"relative_accuracy must be between 0 and 1 (was {relative_accuracy})")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets : Dict[int,int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min : Optional[float] = None
+        self.max : Optional[float] = None
+
+    def add(self, value : float):
+        if value < MIN_POSITIVE_VALUE:
+            self.zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+            if len(self.buckets) > self.max_buckets:
+                self._collapse_lowest_buckets()
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other : 'QuantileSketch'):
+        if other.gamma != self.gamma:
+            raise Exception("Can only merge sketches with the same relative_accuracy")
+        for (key, count) in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse_lowest_buckets()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q : float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # the middle of the bucket (gamma^(key-1), gamma^key], in the relative sense
+                return min(self.max, max(self.min, 2 * (self.gamma ** key) / (self.gamma + 1))) # type: ignore
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return (self.sum / self.count) if self.count else None
+
+    def _collapse_lowest_buckets(self):
+        keys = sorted(self.buckets)
+        lowest, next_lowest = keys[0], keys[1]
+        self.buckets[next_lowest] += self.buckets.pop(lowest)
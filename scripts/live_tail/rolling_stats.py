@@ -0,0 +1,149 @@
+import math, threading, time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from live_tail.quantile_sketch import QuantileSketch
+from live_tail.tail_events import TailEvent
+
+# Rolling per-label stats over the last window_s seconds, in bounded memory.
+# Each label keeps one small window per interval_s (sketches of wall and CPU time, plus counts), and old intervals are
+# dropped as time moves on - so a summary is a merge of at most window_s / interval_s windows per label.
+# Labels are 'route <method path>' and 'messageType <type>' (and 'ALL').
+
+MAX_TRACKED_EXCEPTIONS = 50
+# routes come from request paths, so scanners could otherwise create labels without bound
+MAX_LABELS = 200
+OTHER_ROUTES_LABEL = "route <other>"
+
+class EventTimeClock:
+    # For replaying saved tail output: the time is the latest eventTimestamp seen, so windows and rates are in event time
+    # rather than in how fast the file is read.  (Tail output is close to time ordered, so taking the latest is enough.)
+
+    def __init__(self):
+        self.now : Optional[float] = None
+
+    def advance(self, event : TailEvent):
+        if event.timestamp_ms is not None:
+            self.now = max(self.now or 0.0, event.timestamp_ms / 1000.0)
+
+    def __call__(self) -> float:
+        return self.now or 0.0
+
+class IntervalWindow:
+
+    def __init__(self, relative_accuracy : float):
+        self.wall_ms = QuantileSketch(relative_accuracy)
+        self.cpu_ms = QuantileSketch(relative_accuracy)
+        self.count = 0
+        self.errors = 0
+        self.error_logs = 0
+
+    def record(self, event : TailEvent):
+        self.count += 1
+        self.errors += 1 if event.failed() else 0
+        self.error_logs += event.error_logs
+        if event.wall_ms is not None:
+            self.wall_ms.add(event.wall_ms)
+        if event.cpu_ms is not None:
+            self.cpu_ms.add(event.cpu_ms)
+
+class RollingStats:
+
+    def __init__(self, window_s : float = 300.0, interval_s : float = 10.0, relative_accuracy : float = 0.01, clock : Callable[[],float] = time.monotonic):
+        self.window_s = window_s
+        self.interval_s = interval_s
+        self.relative_accuracy = relative_accuracy
+        self.clock = clock
+        self.num_intervals = max(1, math.ceil(window_s / interval_s))
+        self.windows : Dict[str,Deque[Tuple[int,IntervalWindow]]] = {}
+        # most recent exception messages, with how often they've been seen (over the whole run)
+        self.exceptions : Dict[str,int] = {}
+        self.total_events = 0
+        # set by the first event, so a clock that only starts with the events (EventTimeClock) works too
+        self.started_at : Optional[float] = None
+        self._lock = threading.Lock()
+
+    def labels_for(self, event : TailEvent) -> List[str]:
+        labels = [ 'ALL', f"route {event.route}" ]
+        if event.message_type is not None:
+            labels.append(f"messageType {event.message_type}")
+        return labels
+
+    def record(self, event : TailEvent):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = self.clock()
+            interval = self._current_interval()
+            for label in self.labels_for(event):
+                if label not in self.windows and label.startswith("route ") and len(self.windows) >= MAX_LABELS:
+                    label = OTHER_ROUTES_LABEL
+                windows = self.windows.setdefault(label, deque())
+                if not windows or windows[-1][0] != interval:
+                    windows.append((interval, IntervalWindow(self.relative_accuracy)))
+                windows[-1][1].record(event)
+                self._expire(windows, interval)
+            for exception in event.exceptions:
+                self.exceptions[exception] = self.exceptions.pop(exception, 0) + 1
+                if len(self.exceptions) > MAX_TRACKED_EXCEPTIONS:
+                    del self.exceptions[next(iter(self.exceptions))]
+            self.total_events += 1
+
+    def summarize(self) -> Dict[str,Dict[str,Any]]:
+        with self._lock:
+            interval = self._current_interval()
+            now = self.clock()
+            covered_s = min(self.window_s, max(self.interval_s, now - (self.started_at if self.started_at is not None else now)))
+            summary : Dict[str,Dict[str,Any]] = {}
+            for label in sorted(self.windows, key = lambda label: (label != 'ALL', label)):
+                windows = self.windows[label]
+                self._expire(windows, interval)
+                if not windows:
+                    del self.windows[label]
+                    continue
+                merged = IntervalWindow(self.relative_accuracy)
+                for (_, window) in windows:
+                    merged.count += window.count
+                    merged.errors += window.errors
+                    merged.error_logs += window.error_logs
+                    merged.wall_ms.merge(window.wall_ms)
+                    merged.cpu_ms.merge(window.cpu_ms)
+                summary[label] = {
+                    'count': merged.count,
+                    'errors': merged.errors,
+                    'error_rate': round(merged.errors / merged.count, 4) if merged.count else 0.0,
+                    'error_logs': merged.error_logs,
+                    'requests_per_s': round(merged.count / covered_s, 2),
+                    'p50_ms': _round(merged.wall_ms.quantile(0.50)),
+                    'p95_ms': _round(merged.wall_ms.quantile(0.95)),
+                    'p99_ms': _round(merged.wall_ms.quantile(0.99)),
+                    'max_ms': _round(merged.wall_ms.max),
+                    'cpu_p50_ms': _round(merged.cpu_ms.quantile(0.50)),
+                    'cpu_p99_ms': _round(merged.cpu_ms.quantile(0.99))
+                }
+            return summary
+
+    def recent_exceptions(self, limit : int = 5) -> List[Tuple[str,int]]:
+        with self._lock:
+            return list(reversed(list(self.exceptions.items())))[:limit]
+
+    def _current_interval(self) -> int:
+        return int(self.clock() // self.interval_s)
+
+    def _expire(self, windows : Deque[Tuple[int,IntervalWindow]], interval : int):
+        while windows and windows[0][0] <= interval - self.num_intervals:
+            windows.popleft()
+
+def _round(value : Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+def format_summary(summary : Dict[str,Dict[str,Any]], exceptions : List[Tuple[str,int]], title : str) -> str:
+    columns = [ 'count', 'errors', 'error_rate', 'error_logs', 'requests_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'cpu_p50_ms', 'cpu_p99_ms' ]
+    label_width = max([ len(label) for label in summary ] + [ len(title) ]) + 2
+    lines = [ title.ljust(label_width) + "".join(column.rjust(16) for column in columns) ]
+    for (label, row) in summary.items():
+        lines.append(label.ljust(label_width) + "".join(("-" if row.get(column) is None else str(row[column])).rjust(16) for column in columns))
+    if exceptions:
+        lines.append("")
+        lines.append("recent exceptions:")
+        lines += [ f"  {count} x {exception}" for (exception, count) in exceptions ]
+    return "\n".join(lines)
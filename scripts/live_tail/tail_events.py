@@ -0,0 +1,97 @@
+import json, re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+# Parses the events 'wrangler tail --format json' prints: one JSON object per worker (or Durable Object) invocation,
+# with its outcome, exceptions, console logs, the request or cron trigger, and (on recent runtimes) CPU and wall time.
+# The worker logs one ':::WEBHOOK:::' line per webhook update (see logWebhook in logging/smart_logger.ts), which says what
+# kind of update it was.
+
+WEBHOOK_LOG_MARKER = ":::WEBHOOK:::"
+MAX_EVENT_CHARS = 4 * 1024 * 1024
+
+# path segments that are IDs (numbers, hex, uuids) are collapsed, so routes don't explode into one per user
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F-]{36})$")
+
+@dataclass
+class TailEvent:
+    route : str
+    outcome : str
+    status : Optional[int] = None
+    wall_ms : Optional[float] = None
+    cpu_ms : Optional[float] = None
+    exceptions : List[str] = field(default_factory = list)
+    error_logs : int = 0
+    message_type : Optional[str] = None
+    command : Optional[str] = None
+    menu_code : Optional[str] = None
+    timestamp_ms : Optional[int] = None
+
+    def failed(self) -> bool:
+        return self.outcome != 'ok' or len(self.exceptions) > 0 or (self.status is not None and self.status >= 500)
+
+def read_json_stream(lines : Iterable[str]) -> Iterator[Dict[str,Any]]:
+    # wrangler prints each event as indented JSON over many lines (and its own messages as plain text in between),
+    # so lines are collected from a '{' until they decode as a whole object
+    decoder = json.JSONDecoder()
+    buffer = ""
+    for line in lines:
+        if not buffer and not line.lstrip().startswith("{"):
+            continue
+        buffer += line
+        if not line.rstrip().endswith("}"):
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer.lstrip())
+        except ValueError:
+            if len(buffer) > MAX_EVENT_CHARS:
+                buffer = "" # not going to be valid JSON - start over at the next '{'
+            continue
+        buffer = buffer.lstrip()[end:].lstrip()
+        if isinstance(value, dict):
+            yield value
+
+def normalize_path(path : str) -> str:
+    segments = [ ":id" if ID_SEGMENT.match(segment) else segment for segment in path.split("/") ]
+    return "/".join(segments) or "/"
+
+def describe_route(event : Dict[str,Any]) -> str:
+    trigger = event.get('event') or {}
+    if 'request' in trigger:
+        request = trigger['request']
+        return f"{request.get('method', 'GET')} {normalize_path(urlparse(request.get('url', '')).path)}"
+    if 'cron' in trigger:
+        return f"cron {trigger['cron']}"
+    if 'scheduledTime' in trigger:
+        return "alarm"
+    return event.get('eventType') or "unknown"
+
+def parse_webhook_log_line(message : str) -> Optional[Dict[str,Any]]:
+    if not message.startswith(WEBHOOK_LOG_MARKER):
+        return None
+    try:
+        return json.loads(message[len(WEBHOOK_LOG_MARKER):])
+    except ValueError:
+        return None
+
+def parse_tail_event(event : Dict[str,Any]) -> TailEvent:
+    trigger = event.get('event') or {}
+    response = trigger.get('response') or {}
+    parsed = TailEvent(route = describe_route(event),
+                       outcome = event.get('outcome', 'unknown'),
+                       status = response.get('status'),
+                       wall_ms = event.get('wallTime'),
+                       cpu_ms = event.get('cpuTime'),
+                       exceptions = [ f"{exception.get('name', 'Error')}: {exception.get('message', '')}"[:200] for exception in event.get('exceptions') or [] ],
+                       timestamp_ms = event.get('eventTimestamp'))
+    for log in event.get('logs') or []:
+        if log.get('level') == 'error':
+            parsed.error_logs += 1
+        for part in log.get('message') or []:
+            webhook = parse_webhook_log_line(part) if isinstance(part, str) else None
+            if webhook is not None:
+                parsed.message_type = webhook.get('messageType')
+                parsed.command = webhook.get('command')
+                parsed.menu_code = webhook.get('menuCode')
+    return parsed
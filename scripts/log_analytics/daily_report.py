@@ -0,0 +1,147 @@
+import csv, heapq, os, re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from live_tail.quantile_sketch import QuantileSketch
+from live_tail.tail_events import TailEvent
+
+# Per-day aggregates over trace events, small enough to send back from a worker process and merge:
+#   - volume: requests and errors by route, messageType, command and menuCode
+#   - latency: wall and CPU time sketches by messageType (or route, for anything that isn't a webhook update)
+#   - exceptions: exceptions and logError lines, grouped by signature (their text with IDs, numbers and quoted values blanked out)
+#   - slowest: the slowest individual invocations
+
+SIGNATURE_PATTERNS = [
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"\"[^\"]*\"|'[^']*'|`[^`]*`"), "<str>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}\b"), "<uuid>"),
+    (re.compile(r"\b[0-9a-fA-F]{16,}\b"), "<hex>"),
+    (re.compile(r"-?\d+(\.\d+)?"), "<n>")
+]
+MAX_SIGNATURE_LENGTH = 200
+
+def exception_signature(message : str) -> str:
+    for (pattern, replacement) in SIGNATURE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return " ".join(message.split())[:MAX_SIGNATURE_LENGTH]
+
+def day_of(timestamp_ms : Optional[int]) -> str:
+    if timestamp_ms is None:
+        return "unknown"
+    return datetime.fromtimestamp(timestamp_ms / 1000.0, tz = timezone.utc).strftime("%Y-%m-%d")
+
+def latency_label(event : TailEvent) -> str:
+    return event.message_type if event.message_type is not None else f"route {event.route}"
+
+@dataclass
+class DailyReport:
+    top_slowest : int = 20
+    volume : Dict[Tuple[str,str,str,str,str],List[int]] = field(default_factory = dict)
+    wall_ms : Dict[Tuple[str,str],QuantileSketch] = field(default_factory = dict)
+    cpu_ms : Dict[Tuple[str,str],QuantileSketch] = field(default_factory = dict)
+    exceptions : Dict[Tuple[str,str],List[Any]] = field(default_factory = dict)
+    # per day, a min-heap of (wall_ms, tiebreak, row), so the fastest of the slowest is the one replaced
+    slowest : Dict[str,List[Tuple[float,int,Dict[str,Any]]]] = field(default_factory = dict)
+    events : int = 0
+    _offered : int = 0
+
+    def record(self, event : TailEvent, error_messages : List[str]):
+        day = day_of(event.timestamp_ms)
+        self.events += 1
+        counts = self.volume.setdefault((day, event.route, event.message_type or "", event.command or "", event.menu_code or ""), [0, 0])
+        counts[0] += 1
+        counts[1] += 1 if event.failed() else 0
+        key = (day, latency_label(event))
+        if event.wall_ms is not None:
+            self.wall_ms.setdefault(key, QuantileSketch()).add(event.wall_ms)
+        if event.cpu_ms is not None:
+            self.cpu_ms.setdefault(key, QuantileSketch()).add(event.cpu_ms)
+        for message in event.exceptions + [ f"logError: {message}" for message in error_messages ]:
+            entry = self.exceptions.setdefault((day, exception_signature(message)), [0, message[:MAX_SIGNATURE_LENGTH]])
+            entry[0] += 1
+        if event.wall_ms is not None:
+            self._offer_slowest(day, event.wall_ms, {
+                'timestamp_ms': event.timestamp_ms,
+                'wall_ms': event.wall_ms,
+                'cpu_ms': event.cpu_ms,
+                'route': event.route,
+                'message_type': event.message_type,
+                'command': event.command,
+                'menu_code': event.menu_code,
+                'outcome': event.outcome
+            })
+
+    def _offer_slowest(self, day : str, wall_ms : float, row : Dict[str,Any]):
+        heap = self.slowest.setdefault(day, [])
+        self._offered += 1
+        item = (wall_ms, self._offered, row)
+        if len(heap) < self.top_slowest:
+            heapq.heappush(heap, item)
+        elif wall_ms > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def merge(self, other : 'DailyReport'):
+        for (key, (count, errors)) in other.volume.items():
+            counts = self.volume.setdefault(key, [0, 0])
+            counts[0] += count
+            counts[1] += errors
+        for (mine, theirs) in [ (self.wall_ms, other.wall_ms), (self.cpu_ms, other.cpu_ms) ]:
+            for (key, sketch) in theirs.items():
+                if key in mine:
+                    mine[key].merge(sketch)
+                else:
+                    mine[key] = sketch
+        for (key, (count, example)) in other.exceptions.items():
+            entry = self.exceptions.setdefault(key, [0, example])
+            entry[0] += count
+        for (day, heap) in other.slowest.items():
+            for (wall_ms, _, row) in heap:
+                self._offer_slowest(day, wall_ms, row)
+        self.events += other.events
+
+    def tables(self) -> Dict[str,List[Dict[str,Any]]]:
+        volume = [ { 'day': day, 'route': route, 'message_type': message_type, 'command': command, 'menu_code': menu_code, 'requests': count, 'errors': errors }
+                   for ((day, route, message_type, command, menu_code), (count, errors)) in sorted(self.volume.items(), key = lambda item: (item[0][0], -item[1][0])) ]
+        latency = []
+        for key in sorted(set(self.wall_ms) | set(self.cpu_ms)):
+            (day, label) = key
+            row : Dict[str,Any] = { 'day': day, 'label': label }
+            for (name, sketches) in [ ('wall', self.wall_ms), ('cpu', self.cpu_ms) ]:
+                sketch = sketches.get(key)
+                row[f"{name}_count"] = sketch.count if sketch else 0
+                for (column, q) in [ ('p50', 0.50), ('p95', 0.95), ('p99', 0.99) ]:
+                    row[f"{name}_{column}_ms"] = _round(sketch.quantile(q) if sketch else None)
+                row[f"{name}_max_ms"] = _round(sketch.max if sketch else None)
+            latency.append(row)
+        exceptions = [ { 'day': day, 'signature': signature, 'count': count, 'example': example }
+                       for ((day, signature), (count, example)) in sorted(self.exceptions.items(), key = lambda item: (item[0][0], -item[1][0])) ]
+        slowest = []
+        for day in sorted(self.slowest):
+            ranked = sorted(self.slowest[day], key = lambda item: -item[0])
+            slowest += [ { 'day': day, 'rank': rank + 1, **row } for (rank, (_, _, row)) in enumerate(ranked) ]
+        return { 'daily_volume': volume, 'daily_latency': latency, 'daily_exceptions': exceptions, 'slowest_updates': slowest }
+
+def _round(value : Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+def write_tables(tables : Dict[str,List[Dict[str,Any]]], output_dir : str, output_format : str) -> List[str]:
+    os.makedirs(output_dir, exist_ok = True)
+    filepaths = []
+    for (name, rows) in tables.items():
+        if output_format == "parquet":
+            try:
+                import pyarrow, pyarrow.parquet # pip install pyarrow
+            except ImportError:
+                raise Exception("Parquet output needs pyarrow: pip install pyarrow (or use --format csv)")
+            filepath = os.path.join(output_dir, f"{name}.parquet")
+            pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), filepath)
+        else:
+            filepath = os.path.join(output_dir, f"{name}.csv")
+            with open(filepath, "w", newline = "", encoding = "utf-8") as f:
+                if rows:
+                    writer = csv.DictWriter(f, fieldnames = list(rows[0].keys()))
+                    writer.writeheader()
+                    writer.writerows(rows)
+        filepaths.append(filepath)
+    return filepaths
@@ -0,0 +1,83 @@
+import glob, gzip, json, os
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import urlparse
+
+from live_tail.tail_events import TailEvent, normalize_path, parse_webhook_log_line
+
+# Reads Workers Trace Event logpush archives: gzipped (or plain) NDJSON, one invocation per line, with fields like
+# Outcome, EventTimestampMs, CPUTimeMs, WallTimeMs, Exceptions, Logs and Event (the request, or the cron trigger).
+# Files are streamed a line at a time, so their size doesn't matter.
+# See: https://developers.cloudflare.com/logs/reference/log-fields/account/workers_trace_events/
+
+LOGPUSH_FILE_SUFFIXES = (".gz", ".json", ".ndjson", ".log")
+
+def find_logpush_files(paths : List[str]) -> List[str]:
+    # paths can be files, directories (searched recursively) or globs
+    filepaths : List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for (dirpath, _, filenames) in os.walk(path):
+                filepaths += [ os.path.join(dirpath, filename) for filename in filenames if filename.endswith(LOGPUSH_FILE_SUFFIXES) ]
+        else:
+            filepaths += glob.glob(path)
+    return sorted(set(filepaths))
+
+def iter_logpush_records(filepath : str) -> Iterator[Dict[str,Any]]:
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "rt", encoding = "utf-8", errors = "replace") as f: # type: ignore
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # a truncated last line, if the file was still being written
+            if isinstance(record, dict):
+                yield record
+
+def _lower_keys(value : Any) -> Any:
+    # logpush uses PascalCase (CPUTimeMs, Event.Request.URL...) - lower-cased, so the lookups below don't depend on it
+    if isinstance(value, dict):
+        return { key.lower(): _lower_keys(item) for (key, item) in value.items() }
+    if isinstance(value, list):
+        return [ _lower_keys(item) for item in value ]
+    return value
+
+def describe_logpush_route(record : Dict[str,Any]) -> str:
+    trigger = record.get('event') or {}
+    if 'request' in trigger:
+        request = trigger['request']
+        return f"{request.get('method', 'GET')} {normalize_path(urlparse(request.get('url', '')).path)}"
+    if 'cron' in trigger:
+        return f"cron {trigger['cron']}"
+    return str(record.get('eventtype') or "unknown").lower()
+
+def parse_logpush_record(record : Dict[str,Any]) -> Tuple[TailEvent,List[str]]:
+    # the invocation, and the messages it logged with logError (smart_logger joins logError's arguments with ' // ')
+    record = _lower_keys(record)
+    parsed = TailEvent(route = describe_logpush_route(record),
+                       outcome = str(record.get('outcome', 'unknown')).lower(),
+                       status = ((record.get('event') or {}).get('response') or {}).get('status'),
+                       wall_ms = record.get('walltimems'),
+                       cpu_ms = record.get('cputimems'),
+                       exceptions = [ f"{exception.get('name', 'Error')}: {exception.get('message', '')}" for exception in record.get('exceptions') or [] ],
+                       timestamp_ms = record.get('eventtimestampms'))
+    error_messages : List[str] = []
+    for log in record.get('logs') or []:
+        messages = log.get('message') or []
+        messages = messages if isinstance(messages, list) else [ messages ]
+        if log.get('level') == 'error':
+            parsed.error_logs += 1
+            error_messages.append(" ".join(str(message) for message in messages))
+        for message in messages:
+            webhook = parse_webhook_log_line(message) if isinstance(message, str) else None
+            if webhook is not None:
+                parsed.message_type = webhook.get('messageType')
+                parsed.command = webhook.get('command')
+                parsed.menu_code = webhook.get('menuCode')
+    return parsed, error_messages
+
+def iter_logpush_events(filepath : str) -> Iterator[Tuple[TailEvent,List[str]]]:
+    for record in iter_logpush_records(filepath):
+        yield parse_logpush_record(record)
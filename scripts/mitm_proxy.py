@@ -0,0 +1,63 @@
+import asyncio, json
+from argparse import ArgumentParser
+
+from dev.latency_stats import print_summary
+from dev.local_dev_common import *
+from dev.recording_proxy import RecordingProxy
+from dev.traffic_recording import RecordingWriter
+from dev.traffic_replay import replay_recording
+from wrangler_common import get_secret
+
+# record: python scripts/mitm_proxy.py record --recording traffic.ndjson.gz
+# replay: python scripts/mitm_proxy.py replay --recording traffic.ndjson.gz --speed 10
+
+def parse_args():
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest = "mode", required = True)
+
+    record = subparsers.add_parser("record")
+    record.add_argument("--recording", type = str, required = True)
+    record.add_argument("--port", type = int, required = False, default = MITM_PROXY_SERVER_PORT)
+    record.add_argument("--telegram_upstream", type = str, required = False, default = "https://api.telegram.org")
+    record.add_argument("--webhook_upstream", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+
+    replay = subparsers.add_parser("replay")
+    replay.add_argument("--recording", type = str, required = True)
+    replay.add_argument("--worker_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    replay.add_argument("--speed", type = str, required = False, default = "1", help = "A multiple of recorded speed (1, 10, ...) or 'max'")
+    replay.add_argument("--max_concurrency", type = int, required = False, default = 64)
+    replay.add_argument("--bot_id", type = int, required = False, default = None)
+    replay.add_argument("--env", type = str, required = False, default = "dev")
+    replay.add_argument("--output", type = str, required = False, default = None)
+    return parser.parse_args()
+
+async def record(args):
+    writer = RecordingWriter(args.recording)
+    proxy = RecordingProxy(args.telegram_upstream, args.webhook_upstream, writer)
+    await proxy.start(port = args.port)
+    print(f"Recording to {args.recording}. Proxying /bot* to {args.telegram_upstream} and everything else to {args.webhook_upstream} on port {args.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await proxy.stop()
+        print(f"Recorded {writer.records_written} requests")
+
+def replay(args):
+    speed = None if args.speed.strip().lower() == 'max' else float(args.speed)
+    secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env)
+    stats, elapsed_s = asyncio.run(replay_recording(args.recording, args.worker_url, secret_token, speed, args.max_concurrency, args.bot_id))
+    summary = stats.summarize(elapsed_s)
+    print_summary(summary, title = "messageType")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent = 1)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mode == "record":
+        try:
+            asyncio.run(record(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        replay(args)
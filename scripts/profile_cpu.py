@@ -0,0 +1,66 @@
+import asyncio, json
+from argparse import ArgumentParser
+
+from dev.cpu_profile import DEFAULT_SAMPLING_INTERVAL_US, capture_cpu_profile, print_cpu_profile_summary, summarize_cpu_profile
+from dev.latency_stats import print_summary
+from dev.local_dev_common import *
+from dev.webhook_load import generate_update_mix, replay_updates
+from dev.worker_sources import read_canned_questions, read_commands, read_menu_codes
+from wrangler_common import get_secret
+
+# CPU profiles a seeded mix of webhook updates against the local worker, and reports where the time went, per function and per file.
+# Start the dev box against the fake telegram server first:
+#   python scripts/start_dev_box.py --fake_telegram_server true
+#   python scripts/profile_cpu.py
+# The profile is saved (--output) and can be opened in Chrome DevTools, or summarized again later:
+#   python scripts/profile_cpu.py --summarize worker.cpuprofile
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--count", type = int, required = False, default = 2000)
+    parser.add_argument("--warmup", type = int, required = False, default = 200, help = "Updates sent before profiling starts, so startup and JIT warmup don't dominate")
+    parser.add_argument("--concurrency", type = int, required = False, default = 16)
+    parser.add_argument("--users", type = int, required = False, default = 200)
+    parser.add_argument("--seed", type = int, required = False, default = 1)
+    parser.add_argument("--worker_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    parser.add_argument("--inspector_port", type = int, required = False, default = LOCAL_CLOUDFLARE_WORKER_INSPECTOR_PORT)
+    parser.add_argument("--sampling_interval_us", type = int, required = False, default = DEFAULT_SAMPLING_INTERVAL_US)
+    parser.add_argument("--bot_id", type = int, required = False, default = FAKE_TELEGRAM_BOT_ID)
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    parser.add_argument("--output", type = str, required = False, default = "worker.cpuprofile")
+    parser.add_argument("--top", type = int, required = False, default = 25)
+    parser.add_argument("--summarize", type = str, required = False, default = None, help = "Summarize a saved .cpuprofile instead of capturing one")
+    return parser.parse_args()
+
+def make_updates(args, seed : int, count : int):
+    return generate_update_mix(seed = seed,
+                               count = count,
+                               num_users = args.users,
+                               bot_id = args.bot_id,
+                               menu_codes = read_menu_codes(),
+                               canned_questions = read_canned_questions(),
+                               commands = read_commands())
+
+def profile_load(args):
+    secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env)
+    if args.warmup > 0:
+        print(f"Warming up with {args.warmup} updates")
+        asyncio.run(replay_updates(make_updates(args, args.seed + 1, args.warmup), args.worker_url, secret_token, args.bot_id, args.concurrency))
+    updates = make_updates(args, args.seed, args.count)
+    print(f"Profiling {len(updates)} updates with concurrency {args.concurrency}")
+    load = replay_updates(updates, args.worker_url, secret_token, args.bot_id, args.concurrency)
+    profile, (stats, elapsed_s) = asyncio.run(capture_cpu_profile(args.inspector_port, load, args.sampling_interval_us))
+    print_summary(stats.summarize(elapsed_s), title = "messageType")
+    return profile
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.summarize is not None:
+        with open(args.summarize, "r", encoding = "utf-8") as f:
+            profile = json.load(f)
+    else:
+        profile = profile_load(args)
+        with open(args.output, "w", encoding = "utf-8") as f:
+            json.dump(profile, f)
+        print(f"Wrote {args.output}")
+    print_cpu_profile_summary(summarize_cpu_profile(profile), top = args.top)
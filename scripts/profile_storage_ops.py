@@ -0,0 +1,46 @@
+import asyncio, json
+from argparse import ArgumentParser
+
+from dev.local_dev_common import *
+from dev.storage_ops_profile import StorageOpsProfiler, print_storage_ops_summary
+from dev.webhook_load import generate_update_mix, replay_updates
+from dev.worker_sources import read_canned_questions, read_commands, read_menu_codes
+from wrangler_common import get_secret
+
+# Replays a seeded mix of webhook updates and reports the UserDO round trips and storage ops each kind of update costs.
+# Start the dev box with profiling on first:
+#   python scripts/start_dev_box.py --fake_telegram_server true --storage_profiling true
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--count", type = int, required = False, default = 1000)
+    parser.add_argument("--concurrency", type = int, required = False, default = 8)
+    parser.add_argument("--users", type = int, required = False, default = 50)
+    parser.add_argument("--seed", type = int, required = False, default = 1)
+    parser.add_argument("--worker_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    parser.add_argument("--bot_id", type = int, required = False, default = FAKE_TELEGRAM_BOT_ID)
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    parser.add_argument("--output", type = str, required = False, default = None, help = "Also write the table as JSON")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    updates = generate_update_mix(seed = args.seed,
+                                  count = args.count,
+                                  num_users = args.users,
+                                  bot_id = args.bot_id,
+                                  menu_codes = read_menu_codes(),
+                                  canned_questions = read_canned_questions(),
+                                  commands = read_commands())
+    profiler = StorageOpsProfiler()
+    secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env)
+    print(f"Replaying {len(updates)} updates with concurrency {args.concurrency}")
+    asyncio.run(replay_updates(updates, args.worker_url, secret_token, args.bot_id, args.concurrency, on_response = profiler.observe))
+    if profiler.missing_header > 0:
+        print(f"{profiler.missing_header} responses had no profile. Is the worker running with STORAGE_PROFILING=true?")
+    summary = profiler.summarize()
+    print_storage_ops_summary(summary, profiler.do_fetches_by_method)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({ 'interactions': summary, 'do_fetches_by_method': profiler.do_fetches_by_method }, f, indent = 1)
+        print(f"Wrote {args.output}")
@@ -0,0 +1,74 @@
+import asyncio, json, time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from dev.latency_stats import LatencyStats, print_summary
+from dev.local_dev_common import *
+from dev.simulated_user import SimulationSettings
+from dev.spin_up_users import run_users, spin_up_users
+from dev.worker_sources import read_canned_questions, read_commands, read_menu_codes
+from wrangler_common import get_secret
+
+# Simulated users are given IDs well away from any real telegram user IDs
+FIRST_SIMULATED_USER_ID = 9_000_000_000
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--users", type = int, required = False, default = 100)
+    parser.add_argument("--processes", type = int, required = False, default = 1)
+    parser.add_argument("--steps_per_user", type = int, required = False, default = 10)
+    parser.add_argument("--ramp_up_seconds", type = float, required = False, default = 10.0)
+    parser.add_argument("--min_think_time_seconds", type = float, required = False, default = 0.5)
+    parser.add_argument("--max_think_time_seconds", type = float, required = False, default = 2.0)
+    parser.add_argument("--max_connections_per_process", type = int, required = False, default = 256)
+    parser.add_argument("--seed", type = int, required = False, default = 0)
+    parser.add_argument("--worker_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    parser.add_argument("--fake_telegram_url", type = str, required = False, default = LOCAL_FAKE_TELEGRAM_SERVER_ADDRESS)
+    parser.add_argument("--bot_id", type = int, required = False, default = FAKE_TELEGRAM_BOT_ID)
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    parser.add_argument("--output", type = str, required = False, default = None)
+    return parser.parse_args()
+
+def make_settings(args) -> SimulationSettings:
+    return SimulationSettings(worker_url = args.worker_url,
+                              fake_telegram_url = args.fake_telegram_url,
+                              secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env),
+                              bot_id = args.bot_id,
+                              steps_per_user = args.steps_per_user,
+                              min_think_time_s = args.min_think_time_seconds,
+                              max_think_time_s = args.max_think_time_seconds,
+                              seed = args.seed,
+                              menu_codes = read_menu_codes(),
+                              canned_questions = read_canned_questions(),
+                              commands = read_commands())
+
+def partition_user_ids(num_users : int, num_processes : int) -> List[List[int]]:
+    user_ids = [ FIRST_SIMULATED_USER_ID + i for i in range(num_users) ]
+    return [ user_ids[i::num_processes] for i in range(num_processes) ]
+
+def run_simulator(args) -> LatencyStats:
+    settings = make_settings(args)
+    if args.users == 1:
+        # a single user runs in-process, which is handy for stepping through it in a debugger
+        maybe_attach_debugger("simulated_user", SIMULATED_USER_DEBUG_PORT)
+        return asyncio.run(run_users(partition_user_ids(1, 1)[0], settings, 0.0, args.max_connections_per_process))
+    stats = LatencyStats()
+    partitions = [ p for p in partition_user_ids(args.users, args.processes) if p ]
+    with ProcessPoolExecutor(max_workers = len(partitions)) as pool:
+        futures = [ pool.submit(spin_up_users, i, user_ids, settings, args.ramp_up_seconds, args.max_connections_per_process) for (i,user_ids) in enumerate(partitions) ]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
+if __name__ == "__main__":
+    args = parse_args()
+    maybe_attach_debugger("run_simulator", RUN_SIMULATOR_DEBUG_PORT)
+    print(f"Simulating {args.users} users across {args.processes} process(es) against {args.worker_url}")
+    start = time.perf_counter()
+    stats = run_simulator(args)
+    summary = stats.summarize(time.perf_counter() - start)
+    print_summary(summary, title = "messageType")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent = 1)
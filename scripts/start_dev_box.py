@@ -1,20 +1,26 @@
 from argparse import ArgumentParser
-import json, os, shutil
-import requests
+import os, shlex, shutil, time
 from wrangler_common import *
-from commands import COMMANDS
+from telegram_client import TelegramAPIError, get_telegram_client
+from commands import read_bot_commands
+from deployment.deploy_plan import DeployStep, apply_plan, print_timing_breakdown
 from dev.local_dev_common import *
+from dev.fake_telegram_server import FakeTelegramServer, FakeTelegramServerThread
+from dev.supervisor import ChildSpec, ManagedChild, Supervisor
 
-def run_cloudflare_worker(args):
+def run_cloudflare_worker(args, supervisor : Supervisor) -> ManagedChild:
     ENV = "dev"
     env_vars : Dict[str,str] = convert_env_vars_to_dict(args.env_vars)   
+    if args.fake_telegram_server:
+        env_vars.setdefault('TELEGRAM_BOT_SERVER_URL', LOCAL_FAKE_TELEGRAM_SERVER_ADDRESS)
+        env_vars.setdefault('TELEGRAM_BOT_ID', str(FAKE_TELEGRAM_BOT_ID))
+    if args.storage_profiling:
+        env_vars['STORAGE_PROFILING'] = 'true'
     if 'TELEGRAM_BOT_SERVER_URL' not in env_vars:
         env_vars['TELEGRAM_BOT_SERVER_URL'] = LOCAL_TELEGRAM_BOT_API_SERVER_ADDRESS 
-    ENV_VARS = " ".join([ f'{var}:"{value}"' for (var,value) in env_vars.items() ])
-    command = f'npx wrangler dev --env {ENV} --port {LOCAL_CLOUDFLARE_WORKER_PORT} --test-scheduled --ip 127.0.0.1 --var {ENV_VARS}'
-    child_proc = execute_shell_command(command)
-    poll_until_port_is_occupied(LOCAL_CLOUDFLARE_WORKER_PORT)
-    return child_proc
+    argv = [ 'npx', 'wrangler', 'dev', '--env', ENV, '--port', str(LOCAL_CLOUDFLARE_WORKER_PORT), '--inspector-port', str(LOCAL_CLOUDFLARE_WORKER_INSPECTOR_PORT), '--test-scheduled', '--ip', '127.0.0.1' ]
+    argv += [ '--var' ] + [ f'{var}:{value}' for (var,value) in env_vars.items() ]
+    return supervisor.start_child(ChildSpec("wrangler", argv))
 
 def convert_env_vars_to_dict(env_vars):
     env_vars_dict = dict()
@@ -30,31 +36,59 @@ def convert_env_vars_to_dict(env_vars):
 def parse_args():
     parser = ArgumentParser()
     parser.add_argument("--start_local_telegram_bot", type = parse_bool, required = False, default = True)
+    parser.add_argument("--fake_telegram_server", type = parse_bool, required = False, default = False)
     parser.add_argument("--env_vars", nargs="*", type = str, default=[])
+    parser.add_argument("--cron_poller", type = parse_bool, required = False, default = False)
+    parser.add_argument("--storage_profiling", type = parse_bool, required = False, default = False, help = "Report UserDO round trips / storage ops per update (see profile_storage_ops.py)")
+    parser.add_argument("--log_file", type = str, required = False, default = None, help = "Also write the children's (prefixed) output here")
+    parser.add_argument("--metrics_file", type = str, required = False, default = None, help = "CSV time series of CPU/RSS per child process tree")
     args = parser.parse_args()
     return args
 
 def do_it(args):
 
-    child_procs = []
+    supervisor = Supervisor(log_filepath = args.log_file, metrics_filepath = args.metrics_file)
+    fake_telegram_server_thread = None
+    startup_start = time.perf_counter()
 
     try:
 
+        supervisor.start()
+
+        # Both servers are started right away, and everything after that runs as soon as what it needs is ready
         print("Starting local cloudflare worker")
-        child_procs.append(run_cloudflare_worker(args))
+        worker_proc = run_cloudflare_worker(args, supervisor)
+
+        if args.cron_poller:
+            supervisor.start_child(ChildSpec("cron_poller", shlex.split(START_CRON_POLLER_COMMAND)))
+
+        if args.fake_telegram_server:
+            print("Starting in-process fake telegram server")
+            fake_telegram_server_thread = start_fake_telegram_server()
+            results = apply_plan([
+                DeployStep("worker_ready", lambda: wait_until_http_ready("cloudflare worker", LOCAL_CLOUDFLARE_WORKER_URL, worker_proc)),
+                DeployStep("fake_telegram_server_ready", lambda: wait_until_http_ready("fake telegram server", f"{LOCAL_FAKE_TELEGRAM_SERVER_ADDRESS}/fake/stats"))
+            ])
+            print_timing_breakdown(results, time.perf_counter() - startup_start, title = "STARTUP TIMING")
+            print(f"To CPU profile the worker under load: python scripts/profile_cpu.py (inspector port {LOCAL_CLOUDFLARE_WORKER_INSPECTOR_PORT})")
+            print("Cloudflare worker and fake telegram server ARE RUNNING!")
+            print("Press any key to shut them down.")
+            wait_for_any_key()
+            return
         
         print("Starting local telegram-bot-api server")
         api_id   = get_secret("SECRET__TELEGRAM_API_ID", "dev")
         api_hash = get_secret("SECRET__TELEGRAM_API_HASH", "dev")
-        child_procs.append(fork_shell_telegram_bot_api_local_server(api_id = api_id, api_hash = api_hash))
+        bot_api_proc = fork_telegram_bot_api_local_server(supervisor, api_id = api_id, api_hash = api_hash)
 
         print("Setting up bot locally")
         bot_token = get_secret("SECRET__TELEGRAM_BOT_TOKEN", "dev")
         bot_secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", "dev")
 
-        migrate_and_configure_bot_for_local_server(bot_token, bot_secret_token)
+        results = apply_plan(make_local_startup_plan(worker_proc, bot_api_proc, bot_token, bot_secret_token))
+        print_timing_breakdown(results, time.perf_counter() - startup_start, title = "STARTUP TIMING")
 
-        print("You may wish to start the wrangler debugger now.")
+        print(f"You may wish to start the wrangler debugger now (inspector port {LOCAL_CLOUDFLARE_WORKER_INSPECTOR_PORT}).")
         print("Cloudflare worker and local bot api server ARE RUNNING!")
         print("Press any key to shut them down.")
         wait_for_any_key()
@@ -63,75 +97,67 @@ def do_it(args):
     except Exception as e:
         print(e)
     finally:
-        kill_procs(child_procs)
-
-def fork_shell_telegram_bot_api_local_server(api_id, api_hash):
+        if fake_telegram_server_thread is not None:
+            fake_telegram_server_thread.stop()
+        print("Attempting cleanup.")
+        supervisor.stop()
+        supervisor.print_resource_summary()
+
+def start_fake_telegram_server() -> FakeTelegramServerThread:
+    # No need to log the bot out of telegram or configure it - the fake server already points its webhook at the local worker
+    bot_secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", "dev")
+    server_thread = FakeTelegramServerThread(lambda: FakeTelegramServer(secret_token = bot_secret_token))
+    server_thread.start()
+    return server_thread
+
+def fork_telegram_bot_api_local_server(supervisor : Supervisor, api_id, api_hash) -> ManagedChild:
     shutil.rmtree(TELEGRAM_LOCAL_SERVER_WORKING_DIR, ignore_errors=True)
     os.makedirs(TELEGRAM_LOCAL_SERVER_WORKING_DIR, exist_ok=False)
     command = START_TELEGRAM_LOCAL_SERVER_COMMAND.format(api_id = api_id, api_hash = api_hash, working_dir=TELEGRAM_LOCAL_SERVER_WORKING_DIR)
-    print(command)
-    child_proc = execute_shell_command(command) # no shlex split here on purpose.  makes it parse the --local param weirdly.
-    poll_until_port_is_occupied(LOCAL_TELEGRAM_BOT_API_SERVER_PORT)
+    child_proc = supervisor.start_child(ChildSpec("telegram-bot-api", shlex.split(command)))
     print("Local telegram-bot-api server process forked.")
     return child_proc
                    
-def migrate_and_configure_bot_for_local_server(bot_token, bot_secret_token):
-    try:
-        log_bot_out_of_prod_telegram(bot_token)
-        register_bot_on_local_bot_api_server(bot_token, bot_secret_token)
-        configure_bot_commands(bot_token, bot_secret_token)
-        configure_webhook_for_local_bot(bot_token, bot_secret_token)
-    except Exception as e:
-        print(e)
+def make_local_startup_plan(worker_proc, bot_api_proc, bot_token, bot_secret_token) -> List[DeployStep]:
+    return [
+        DeployStep("worker_ready", lambda: wait_until_http_ready("cloudflare worker", LOCAL_CLOUDFLARE_WORKER_URL, worker_proc)),
+        DeployStep("bot_api_ready", lambda: wait_until_http_ready("telegram-bot-api", LOCAL_TELEGRAM_BOT_API_SERVER_ADDRESS, bot_api_proc)),
+        # doesn't need anything local, so it happens while the servers start
+        DeployStep("log_out_of_prod_telegram", lambda: log_bot_out_of_prod_telegram(bot_token)),
+        DeployStep("register_on_local_bot_api", lambda: register_bot_on_local_bot_api_server(bot_token, bot_secret_token), depends_on = ["bot_api_ready", "log_out_of_prod_telegram"]),
+        DeployStep("set_my_commands", lambda: configure_bot_commands(bot_token, bot_secret_token), depends_on = ["register_on_local_bot_api"]),
+        DeployStep("set_webhook", lambda: configure_webhook_for_local_bot(bot_token, bot_secret_token), depends_on = ["register_on_local_bot_api", "worker_ready"])
+    ]
 
 def log_bot_out_of_prod_telegram(bot_token):
-    request_url = f'https://api.telegram.org/bot{bot_token}/logOut'
-    response = requests.post(request_url)
-    if not response.ok:
-        not_ok_reason = json.loads(response.content.decode()).get("description")
-        if not_ok_reason != "Logged out":
-            raise Exception(str(response.text))
+    try:
+        get_telegram_client(f'https://api.telegram.org/bot{bot_token}').call('logOut')
+    except TelegramAPIError as e:
+        if e.description != "Logged out":
+            raise
     
 def register_bot_on_local_bot_api_server(bot_token, bot_secret_token):
     # Calling '/getMe' implicitly moves it to the local server
-    local_telegram_bot_api_url = get_local_telegram_bot_api_url(bot_token)
-    response = requests.get(f"{local_telegram_bot_api_url}/getMe", timeout = 5.0)
-    if not response.ok:
-        print(response.text)
-        raise Exception(str(response.text))
+    get_telegram_client(get_local_telegram_bot_api_url(bot_token)).call('getMe')
     
-def get_local_telegram_bot_api_url(bot_token):
-    return f'{LOCAL_TELEGRAM_BOT_API_SERVER_ADDRESS}/bot{bot_token}'
-
 def configure_bot_commands(bot_token, bot_secret_token):
 
-    local_telegram_bot_api_url = get_local_telegram_bot_api_url(bot_token)
-
     data = {
-        'commands': COMMANDS,
+        'commands': read_bot_commands(),
         'scope': {
             'type': 'all_private_chats'
         }
     }
-    headers = {
-        "Content-Type": "application/json"
-    }
 
-    response = requests.post(f'{local_telegram_bot_api_url}/setMyCommands', data=json.dumps(data), headers = headers)
-    if (not response.ok):
-        print(response.text)
-        raise Exception(response.text)
+    get_telegram_client(get_local_telegram_bot_api_url(bot_token)).call('setMyCommands', data)
 
 def configure_webhook_for_local_bot(bot_token, bot_secret_token):
 
-    local_telegram_bot_api_url = get_local_telegram_bot_api_url(bot_token)
+    client = get_telegram_client(get_local_telegram_bot_api_url(bot_token))
 
     # Call deleteWebhook just to make sure any existing webhook configuration is gone
     # No harm in calling this one twice.
-    response = requests.post(f'{local_telegram_bot_api_url}/deleteWebhook')
-    if (not response.ok):
-        print(response.text)
-        raise Exception(response.text)
+    client.call('deleteWebhook')
 
 
     # Set the webhook to point to local cloudflare worker
@@ -141,18 +167,9 @@ def configure_webhook_for_local_bot(bot_token, bot_secret_token):
         'allowed_updates': ['message', 'inline_query', 'chosen_inline_result', 'callback_query'],
         'drop_pending_updates': True # DO NOT set this option when configuring prod webhook
     }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f"{local_telegram_bot_api_url}/setWebhook", data=json.dumps(data), headers = headers)
-    if (not response.ok):
-        print(response.text)
-        raise Exception(response.text)
+    client.call('setWebhook', data)
     
-    check_webhook_response = requests.get(f"{local_telegram_bot_api_url}/getWebhookInfo")
-    if not check_webhook_response.ok:
-        print(response.text)
-        raise Exception(response.text)
+    client.call('getWebhookInfo')
     
 if __name__ == "__main__":
 
@@ -160,7 +177,9 @@ if __name__ == "__main__":
     
     poll_until_port_is_unoccupied(LOCAL_CLOUDFLARE_WORKER_PORT)
 
-    if args.start_local_telegram_bot:
+    if args.fake_telegram_server:
+        poll_until_port_is_unoccupied(FAKE_TELEGRAM_SERVER_PORT)
+    elif args.start_local_telegram_bot:
         poll_until_port_is_unoccupied(LOCAL_TELEGRAM_BOT_API_SERVER_PORT)
     
     do_it(args)
\ No newline at end of file
@@ -0,0 +1,53 @@
+import asyncio
+from argparse import ArgumentParser
+from dev.fake_telegram_server import DEFAULT_MAX_CONNECTIONS, FakeTelegramServer
+from dev.telegram_emulation import EmulationSettings, TelegramEmulation, print_emulation_report
+from dev.local_dev_common import *
+from wrangler_common import get_secret
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--port", type = int, required = False, default = FAKE_TELEGRAM_SERVER_PORT)
+    parser.add_argument("--webhook_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    parser.add_argument("--max_connections", type = int, required = False, default = DEFAULT_MAX_CONNECTIONS)
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    # Telegram emulation (off unless --emulate true)
+    parser.add_argument("--emulate", type = parse_bool, required = False, default = False)
+    parser.add_argument("--per_chat_rate", type = float, required = False, default = EmulationSettings.per_chat_rate, help = "messages/s per chat")
+    parser.add_argument("--global_rate", type = float, required = False, default = EmulationSettings.global_rate, help = "messages/s overall")
+    parser.add_argument("--global_burst", type = float, required = False, default = EmulationSettings.global_burst)
+    parser.add_argument("--latency", type = str, required = False, default = EmulationSettings.latency, help = "none, fixed:ms, uniform:min_ms:max_ms or lognormal:median_ms:sigma")
+    parser.add_argument("--error_rate", type = float, required = False, default = EmulationSettings.error_rate)
+    parser.add_argument("--seed", type = int, required = False, default = None)
+    return parser.parse_args()
+
+async def run_fake_telegram_server(args):
+    emulation = None
+    if args.emulate:
+        emulation = TelegramEmulation(EmulationSettings(per_chat_rate = args.per_chat_rate,
+                                                        global_rate = args.global_rate,
+                                                        global_burst = args.global_burst,
+                                                        latency = args.latency,
+                                                        error_rate = args.error_rate,
+                                                        seed = args.seed))
+    server = FakeTelegramServer(webhook_url = args.webhook_url,
+                                secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env),
+                                max_connections = args.max_connections,
+                                emulation = emulation)
+    await server.start(port = args.port)
+    print(f"Fake telegram server listening on {args.port}, delivering updates to {args.webhook_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(server.stats())
+        if server.emulation is not None:
+            print_emulation_report(server.emulation.report())
+        await server.stop()
+
+if __name__ == "__main__":
+    args = parse_args()
+    maybe_attach_debugger("fake_telegram_server", FAKE_TELEGRAM_DEBUG_PORT)
+    try:
+        asyncio.run(run_fake_telegram_server(args))
+    except KeyboardInterrupt:
+        pass
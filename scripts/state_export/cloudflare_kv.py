@@ -0,0 +1,94 @@
+import asyncio, os, random
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from aiohttp import ClientSession, ClientTimeout, TCPConnector # pip install aiohttp
+
+# Workers KV over the Cloudflare REST API, instead of one 'npx wrangler kv:key get' process per key.
+# Uses the same environment variables as a non-interactive wrangler: CLOUDFLARE_API_TOKEN and CLOUDFLARE_ACCOUNT_ID.
+# (CLOUDFLARE_ACCOUNT_ID in wrangler.toml is the workers.dev subdomain, not the account id)
+
+CLOUDFLARE_API_URL = "https://api.cloudflare.com/client/v4"
+LIST_KEYS_PAGE_SIZE = 1000
+MAX_RETRIES = 6
+
+class CloudflareAPIError(Exception):
+    def __init__(self, status : int, message : str):
+        super().__init__(f"Cloudflare API error ({status}): {message}")
+        self.status = status
+
+def get_cloudflare_credentials(account_id : Optional[str] = None, api_token : Optional[str] = None) -> Tuple[str,str]:
+    account_id = account_id or os.environ.get("CLOUDFLARE_ACCOUNT_ID")
+    api_token = api_token or os.environ.get("CLOUDFLARE_API_TOKEN")
+    if not account_id or not api_token:
+        raise Exception("Set CLOUDFLARE_ACCOUNT_ID and CLOUDFLARE_API_TOKEN (or pass --account_id / --api_token)")
+    return account_id, api_token
+
+class CloudflareKV:
+
+    def __init__(self, account_id : str, api_token : str, max_connections : int = 32):
+        self.account_id = account_id
+        self.api_token = api_token
+        self.max_connections = max_connections
+        self._session : Optional[ClientSession] = None
+
+    async def __aenter__(self):
+        self._session = ClientSession(connector = TCPConnector(limit = self.max_connections),
+                                      timeout = ClientTimeout(total = 120),
+                                      headers = { 'Authorization': f'Bearer {self.api_token}' })
+        return self
+
+    async def __aexit__(self, *args):
+        if self._session is not None:
+            await self._session.close()
+
+    def _url(self, path : str) -> str:
+        return f"{CLOUDFLARE_API_URL}/accounts/{self.account_id}/storage/kv/namespaces{path}"
+
+    async def _request(self, url : str, params : Optional[Dict[str,Any]] = None, raw : bool = False) -> Any:
+        attempt = 0
+        while True:
+            async with self._session.get(url, params = params) as response: # type: ignore
+                body = await response.read()
+                # rate limited or a hiccup on Cloudflare's side: back off and try again
+                if (response.status == 429 or response.status >= 500) and attempt < MAX_RETRIES:
+                    retry_after = response.headers.get('Retry-After')
+                    delay_s = float(retry_after) if retry_after and retry_after.isdigit() else random.uniform(0, min(30.0, 0.5 * (2 ** attempt)))
+                    attempt += 1
+                    await asyncio.sleep(delay_s)
+                    continue
+                if raw:
+                    if response.status >= 400:
+                        raise CloudflareAPIError(response.status, body.decode('utf-8', errors = 'replace')[:500])
+                    return body
+                parsed = await response.json(content_type = None)
+                if not parsed.get('success', False):
+                    raise CloudflareAPIError(response.status, str(parsed.get('errors')))
+                return parsed
+
+    async def list_namespaces(self) -> List[Dict[str,Any]]:
+        namespaces, page = [], 1
+        while True:
+            parsed = await self._request(self._url(""), { 'page': page, 'per_page': 100 })
+            namespaces += parsed['result']
+            result_info = parsed.get('result_info') or {}
+            if page >= result_info.get('total_pages', 1):
+                return namespaces
+            page += 1
+
+    async def get_namespace_id(self, title : str) -> str:
+        for namespace in await self.list_namespaces():
+            if namespace['title'] == title:
+                return namespace['id']
+        raise Exception(f"No namespace called {title}")
+
+    async def list_keys_page(self, namespace_id : str, cursor : Optional[str] = None) -> Tuple[List[Dict[str,Any]],Optional[str]]:
+        # returns the keys, and the cursor for the next page (None after the last page)
+        params : Dict[str,Any] = { 'limit': LIST_KEYS_PAGE_SIZE }
+        if cursor:
+            params['cursor'] = cursor
+        parsed = await self._request(self._url(f"/{namespace_id}/keys"), params)
+        next_cursor = (parsed.get('result_info') or {}).get('cursor') or None
+        return parsed['result'], next_cursor
+
+    async def get_value(self, namespace_id : str, key : str) -> bytes:
+        return await self._request(self._url(f"/{namespace_id}/values/{quote(key, safe = '')}"), raw = True)
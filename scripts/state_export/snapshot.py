@@ -0,0 +1,132 @@
+import asyncio, base64, glob, json, os, sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Set
+from tqdm import tqdm # pip install tqdm
+
+from dev.traffic_recording import RecordingWriter, read_recording
+from state_export.cloudflare_kv import CloudflareKV
+from state_export.v8_deserializer import V8DeserializeError, deserialize_v8
+
+# Snapshots are gzipped, newline-delimited JSON (one record per key), appended to in gzip members like traffic recordings.
+# Next to the snapshot is a checkpoint file. If an export is interrupted, running it again with the same snapshot path
+# picks up from the last completed page, and skips any keys that already made it into the snapshot.
+
+LOCAL_DO_STATE_GLOB = os.path.join(".wrangler", "state", "v3", "do", "*", "*.sqlite")
+
+def checkpoint_filepath(snapshot_filepath : str) -> str:
+    return snapshot_filepath + ".checkpoint.json"
+
+def read_checkpoint(snapshot_filepath : str) -> Optional[Dict[str,Any]]:
+    filepath = checkpoint_filepath(snapshot_filepath)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, "r") as f:
+        return json.load(f)
+
+def write_checkpoint(snapshot_filepath : str, checkpoint : Dict[str,Any]):
+    # write-then-rename, so a crash never leaves a half-written checkpoint
+    filepath = checkpoint_filepath(snapshot_filepath)
+    with open(filepath + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(filepath + ".tmp", filepath)
+
+def encode_value(value : bytes) -> Dict[str,Any]:
+    try:
+        return { 'text': value.decode('utf-8') }
+    except UnicodeDecodeError:
+        return { 'base64': base64.b64encode(value).decode('ascii') }
+
+def read_snapshot(snapshot_filepath : str) -> Iterator[Dict[str,Any]]:
+    if not os.path.exists(snapshot_filepath):
+        return iter([])
+    return read_recording(snapshot_filepath)
+
+async def export_kv_namespace(kv : CloudflareKV, namespace_id : str, snapshot_filepath : str, concurrency : int = 32) -> int:
+    checkpoint = read_checkpoint(snapshot_filepath)
+    if checkpoint is not None and checkpoint['namespace_id'] != namespace_id:
+        raise Exception(f"{snapshot_filepath} is a snapshot of namespace {checkpoint['namespace_id']}, not {namespace_id}")
+    if checkpoint is not None and checkpoint.get('done'):
+        print(f"{snapshot_filepath} is already complete ({checkpoint['keys_written']} keys)")
+        return 0
+    already_written : Set[str] = { record['key'] for record in read_snapshot(snapshot_filepath) } if checkpoint is not None else set()
+    cursor = checkpoint['cursor'] if checkpoint is not None else None
+    keys_written = len(already_written)
+    if checkpoint is not None:
+        print(f"Resuming export of {namespace_id}: {keys_written} keys already in {snapshot_filepath}")
+    else:
+        write_checkpoint(snapshot_filepath, { 'namespace_id': namespace_id, 'cursor': None, 'keys_written': 0, 'done': False })
+
+    semaphore = asyncio.Semaphore(concurrency)
+    writer = RecordingWriter(snapshot_filepath)
+    progress = tqdm(unit = " keys", initial = keys_written)
+
+    async def fetch_and_write(key_info : Dict[str,Any]):
+        async with semaphore:
+            value = await kv.get_value(namespace_id, key_info['name'])
+        record = { 'key': key_info['name'], 'value': encode_value(value) }
+        for field in ('expiration', 'metadata'):
+            if field in key_info:
+                record[field] = key_info[field]
+        writer.write(record)
+        progress.update(1)
+
+    page_task = asyncio.ensure_future(kv.list_keys_page(namespace_id, cursor))
+    try:
+        while True:
+            keys, next_cursor = await page_task
+            # list the next page while this one's values are being fetched
+            if next_cursor is not None:
+                page_task = asyncio.ensure_future(kv.list_keys_page(namespace_id, next_cursor))
+            todo = [ key_info for key_info in keys if key_info['name'] not in already_written ]
+            await asyncio.gather(*[ fetch_and_write(key_info) for key_info in todo ])
+            keys_written += len(todo)
+            writer.flush()
+            write_checkpoint(snapshot_filepath, { 'namespace_id': namespace_id, 'cursor': next_cursor, 'keys_written': keys_written, 'done': next_cursor is None })
+            if next_cursor is None:
+                return keys_written
+    finally:
+        page_task.cancel()
+        writer.close()
+        progress.close()
+
+def read_local_durable_object(sqlite_filepath : str) -> List[Dict[str,Any]]:
+    # .wrangler/state/v3/do/<script>-<class>/<object id>.sqlite
+    class_dir = os.path.basename(os.path.dirname(sqlite_filepath))
+    object_id = os.path.splitext(os.path.basename(sqlite_filepath))[0]
+    connection = sqlite3.connect(f"file:{sqlite_filepath}?mode=ro", uri = True)
+    try:
+        rows = connection.execute("SELECT key, value FROM _cf_KV ORDER BY key").fetchall()
+    except sqlite3.OperationalError:
+        return [] # not a storage database (ex: no _cf_KV table yet)
+    finally:
+        connection.close()
+    records = []
+    for (key, value) in rows:
+        record : Dict[str,Any] = { 'durable_object': class_dir, 'object_id': object_id, 'key': key, 'value_bytes': len(value) }
+        try:
+            record['value'] = deserialize_v8(bytes(value))
+        except V8DeserializeError as e:
+            record['value_base64'] = base64.b64encode(bytes(value)).decode('ascii')
+            record['error'] = str(e)
+        records.append(record)
+    return records
+
+def export_local_durable_objects(snapshot_filepath : str, state_glob : str = LOCAL_DO_STATE_GLOB, workers : int = 8) -> int:
+    # The checkpoint is the set of exported object ids: each object is written in one go and flushed before it is recorded
+    checkpoint = read_checkpoint(snapshot_filepath) or { 'exported_object_ids': [] }
+    exported = set(checkpoint['exported_object_ids'])
+    filepaths = sorted([ filepath for filepath in glob.glob(state_glob) if os.path.splitext(os.path.basename(filepath))[0] not in exported ])
+    writer = RecordingWriter(snapshot_filepath)
+    keys_written = 0
+    try:
+        with ThreadPoolExecutor(max_workers = workers) as executor:
+            for (filepath, records) in tqdm(zip(filepaths, executor.map(read_local_durable_object, filepaths)), total = len(filepaths), unit = " objects"):
+                for record in records:
+                    writer.write(record)
+                keys_written += len(records)
+                writer.flush()
+                exported.add(os.path.splitext(os.path.basename(filepath))[0])
+                write_checkpoint(snapshot_filepath, { 'exported_object_ids': sorted(exported) })
+    finally:
+        writer.close()
+    return keys_written
@@ -0,0 +1,181 @@
+import json, sqlite3, time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Mirrors the key scheme of SessionTracker (durable_objects/user/trackers/session_tracker.ts):
+#   messageID:<messageID>                -> sessionID
+#   sessionID:<sessionID>                -> [sessionKey, ...]
+#   sessionKey:<sessionID>:<sessionKey>  -> value
+# The worker only ever deletes these through deleteSession(messageID), so anything it can no longer reach
+# (or will never be asked about again) stays in storage, and is loaded by storage.list() on every cold start.
+
+MESSAGE_ID_PREFIX = "messageID"
+SESSION_ID_PREFIX = "sessionID"
+SESSION_KEY_PREFIX = "sessionKey"
+
+@dataclass
+class UserDOStorage:
+    durable_object : str
+    object_id : str
+    key_bytes : Dict[str,int] = field(default_factory = dict)
+    telegram_user_id : Optional[int] = None
+    session_ids : Dict[int,str] = field(default_factory = dict)             # messageID -> sessionID
+    session_keys : Dict[str,List[str]] = field(default_factory = dict)     # sessionID -> sessionKeys
+    session_values : Dict[Tuple[str,str],str] = field(default_factory = dict) # (sessionID, sessionKey) -> storage key
+    # sessionKey:... keys that the worker parses into a different key than the stored one (ex: a sessionKey containing ':'),
+    # so it can never read or delete them
+    mangled_keys : List[str] = field(default_factory = list)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.key_bytes.values())
+
+@dataclass
+class UserDOAnalysis:
+    storage : UserDOStorage
+    dangling_message_keys : List[str]   # messageID:* whose session doesn't exist
+    orphaned_session_keys : List[str]   # sessionID:* / sessionKey:* no messageID points to
+    stale_session_keys : List[str]      # reachable, but for messages older than the newest keep_latest_sessions
+    stale_sessions : int
+    orphaned_sessions : int
+
+    def keys_to_delete(self) -> List[str]:
+        return sorted(set(self.dangling_message_keys + self.orphaned_session_keys + self.stale_session_keys + self.storage.mangled_keys))
+
+    def bytes_to_free(self) -> int:
+        return sum(self.storage.key_bytes.get(key, 0) for key in self.keys_to_delete())
+
+def _record_bytes(record : Dict[str,Any]) -> int:
+    # key + stored value, as workerd keeps it (V8-serialized)
+    value_bytes = record.get('value_bytes')
+    if value_bytes is None:
+        value_bytes = len(json.dumps(record.get('value')).encode('utf-8'))
+    return len(record['key'].encode('utf-8')) + value_bytes
+
+def load_user_do_storage(records : Iterable[Dict[str,Any]], durable_object_class : str = "UserDO") -> List[UserDOStorage]:
+    # records are from a local_do snapshot (export_state.py local_do), or read_local_durable_object
+    objects : Dict[Tuple[str,str],UserDOStorage] = {}
+    for record in records:
+        if not record['durable_object'].endswith(durable_object_class):
+            continue
+        object_key = (record['durable_object'], record['object_id'])
+        if object_key not in objects:
+            objects[object_key] = UserDOStorage(record['durable_object'], record['object_id'])
+        storage = objects[object_key]
+        key, value = record['key'], record.get('value')
+        storage.key_bytes[key] = _record_bytes(record)
+        # same parsing as MessageIDKey.parse / SessionIDKey.parse / SessionKeyKey.parse
+        tokens = key.split(":")
+        if key == "telegramUserID":
+            storage.telegram_user_id = value
+        elif tokens[0] == MESSAGE_ID_PREFIX and len(tokens) > 1 and tokens[1].lstrip("-").isdigit():
+            storage.session_ids[int(tokens[1])] = value
+        elif tokens[0] == SESSION_ID_PREFIX and len(tokens) > 1:
+            storage.session_keys[tokens[1]] = value if isinstance(value, list) else []
+        elif tokens[0] == SESSION_KEY_PREFIX and len(tokens) > 2:
+            if len(tokens) > 3:
+                storage.mangled_keys.append(key)
+            else:
+                storage.session_values[(tokens[1], tokens[2])] = key
+    return list(objects.values())
+
+def _session_storage_keys(storage : UserDOStorage, session_id : str) -> List[str]:
+    keys = [ key for ((value_session_id, _), key) in storage.session_values.items() if value_session_id == session_id ]
+    if session_id in storage.session_keys:
+        keys.append(f"{SESSION_ID_PREFIX}:{session_id}")
+    return keys
+
+def analyze_user_do(storage : UserDOStorage, keep_latest_sessions : Optional[int] = None) -> UserDOAnalysis:
+    referenced_session_ids = set(storage.session_ids.values())
+
+    dangling_message_keys = [ f"{MESSAGE_ID_PREFIX}:{message_id}" for (message_id, session_id) in storage.session_ids.items() if session_id not in storage.session_keys ]
+
+    orphaned_session_ids = (set(storage.session_keys) | { session_id for (session_id, _) in storage.session_values }) - referenced_session_ids
+    orphaned_session_keys = []
+    for session_id in orphaned_session_ids:
+        orphaned_session_keys += _session_storage_keys(storage, session_id)
+
+    # a session is stale if its message isn't among the newest keep_latest_sessions (message IDs increase within a chat)
+    stale_session_keys : List[str] = []
+    stale_sessions = 0
+    if keep_latest_sessions is not None:
+        live_message_ids = sorted([ message_id for (message_id, session_id) in storage.session_ids.items() if session_id in storage.session_keys ], reverse = True)
+        keep_session_ids = { storage.session_ids[message_id] for message_id in live_message_ids[:keep_latest_sessions] }
+        for message_id in live_message_ids[keep_latest_sessions:]:
+            session_id = storage.session_ids[message_id]
+            stale_session_keys.append(f"{MESSAGE_ID_PREFIX}:{message_id}")
+            if session_id not in keep_session_ids:
+                stale_session_keys += _session_storage_keys(storage, session_id)
+                stale_sessions += 1
+
+    return UserDOAnalysis(storage,
+                          dangling_message_keys = dangling_message_keys,
+                          orphaned_session_keys = orphaned_session_keys,
+                          stale_session_keys = stale_session_keys,
+                          stale_sessions = stale_sessions,
+                          orphaned_sessions = len(orphaned_session_ids))
+
+def print_storage_report(analyses : List[UserDOAnalysis], top : int = 20):
+    print("")
+    print("===USER DO STORAGE===")
+    print("")
+    total_keys = sum(len(analysis.storage.key_bytes) for analysis in analyses)
+    total_bytes = sum(analysis.storage.total_bytes for analysis in analyses)
+    print(f"{len(analyses)} users, {total_keys} keys, {total_bytes/1e6:.2f}MB")
+    if not analyses:
+        return
+    keys_per_user = sorted(len(analysis.storage.key_bytes) for analysis in analyses)
+    print(f"keys per user: median {keys_per_user[len(keys_per_user)//2]}, p99 {keys_per_user[min(len(keys_per_user)-1, int(len(keys_per_user)*0.99))]}, max {keys_per_user[-1]}")
+    print(f"sessions: {sum(len(analysis.storage.session_keys) for analysis in analyses)} "
+          f"({sum(analysis.orphaned_sessions for analysis in analyses)} orphaned, {sum(analysis.stale_sessions for analysis in analyses)} stale)")
+    print(f"dangling messageID keys: {sum(len(analysis.dangling_message_keys) for analysis in analyses)}")
+    print(f"unreachable sessionKey keys (contain ':'): {sum(len(analysis.storage.mangled_keys) for analysis in analyses)}")
+    reclaimable_keys = sum(len(analysis.keys_to_delete()) for analysis in analyses)
+    reclaimable_bytes = sum(analysis.bytes_to_free() for analysis in analyses)
+    print(f"reclaimable: {reclaimable_keys} keys ({100*reclaimable_keys/max(1,total_keys):.1f}%), {reclaimable_bytes/1e6:.2f}MB ({100*reclaimable_bytes/max(1,total_bytes):.1f}%)")
+    print("")
+    print(f"Largest {min(top, len(analyses))} (everything here is read by storage.list() on a cold start):")
+    print(f"{'object id':<20} {'user id':>12} {'keys':>7} {'KB':>9} {'sessions':>9} {'orphaned':>9} {'stale':>6} {'reclaim KB':>11}")
+    for analysis in sorted(analyses, key = lambda analysis: analysis.storage.total_bytes, reverse = True)[:top]:
+        storage = analysis.storage
+        print(f"{storage.object_id[:20]:<20} {str(storage.telegram_user_id):>12} {len(storage.key_bytes):>7} {storage.total_bytes/1e3:>9.1f} "
+              f"{len(storage.session_keys):>9} {analysis.orphaned_sessions:>9} {analysis.stale_sessions:>6} {analysis.bytes_to_free()/1e3:>11.1f}")
+
+def make_compaction_plan(analyses : List[UserDOAnalysis], source : str, keep_latest_sessions : Optional[int]) -> Dict[str,Any]:
+    objects = []
+    for analysis in analyses:
+        keys = analysis.keys_to_delete()
+        if not keys:
+            continue
+        objects.append({
+            'durable_object': analysis.storage.durable_object,
+            'object_id': analysis.storage.object_id,
+            'telegram_user_id': analysis.storage.telegram_user_id,
+            'delete': keys,
+            'bytes_freed': analysis.bytes_to_free()
+        })
+    return {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'source': source,
+        'keep_latest_sessions': keep_latest_sessions,
+        'keys_deleted': sum(len(obj['delete']) for obj in objects),
+        'bytes_freed': sum(obj['bytes_freed'] for obj in objects),
+        'objects': objects
+    }
+
+def apply_compaction_plan_to_sqlite(plan : Dict[str,Any], sqlite_filepaths : Dict[str,str]) -> int:
+    # sqlite_filepaths: object id -> .sqlite file. Each object's deletes are one transaction.
+    deleted = 0
+    for obj in plan['objects']:
+        filepath = sqlite_filepaths.get(obj['object_id'])
+        if filepath is None:
+            print(f"Skipping {obj['object_id']}: no local storage for it")
+            continue
+        connection = sqlite3.connect(filepath)
+        try:
+            with connection:
+                cursor = connection.executemany("DELETE FROM _cf_KV WHERE key = ?", [ (key,) for key in obj['delete'] ])
+                deleted += cursor.rowcount
+        finally:
+            connection.close()
+    return deleted
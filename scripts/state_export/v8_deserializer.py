@@ -0,0 +1,204 @@
+import base64, datetime, math, struct
+from typing import Any, Dict, List
+
+# A minimal reader for V8's ValueSerializer format, which is how workerd/miniflare store Durable Object values
+# (the 'value' column of the _cf_KV table in .wrangler/state/v3/do/**/*.sqlite).
+# It handles what structuredClone can produce from plain data: primitives, strings, objects, arrays, Map, Set, Date,
+# BigInt, RegExp, ArrayBuffers/typed arrays and back-references.
+# Values come out JSON-friendly: Map/Set/Date/BigInt/bytes become {"$map": ...}, {"$set": ...} and so on.
+# See: https://github.com/v8/v8/blob/main/src/objects/value-serializer.cc
+
+class V8DeserializeError(Exception):
+    pass
+
+class _Reader:
+
+    def __init__(self, data : bytes):
+        self.data = data
+        self.pos = 0
+        self.version = 0
+        self.objects : List[Any] = []
+
+    def byte(self) -> int:
+        if self.pos >= len(self.data):
+            raise V8DeserializeError("Unexpected end of data")
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def peek(self) -> int:
+        while self.pos < len(self.data) and self.data[self.pos] == 0x00: # padding
+            self.pos += 1
+        if self.pos >= len(self.data):
+            raise V8DeserializeError("Unexpected end of data")
+        return self.data[self.pos]
+
+    def bytes(self, n : int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise V8DeserializeError("Unexpected end of data")
+        chunk = self.data[self.pos:self.pos+n]
+        self.pos += n
+        return chunk
+
+    def varint(self) -> int:
+        result, shift = 0, 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            shift += 7
+            if not (b & 0x80):
+                return result
+
+    def zigzag(self) -> int:
+        n = self.varint()
+        return (n >> 1) ^ -(n & 1)
+
+    def double(self) -> float:
+        return struct.unpack("<d", self.bytes(8))[0]
+
+    def tag(self) -> str:
+        self.peek()
+        return chr(self.byte())
+
+    def register(self, obj : Any) -> Any:
+        self.objects.append(obj)
+        return obj
+
+    def value(self) -> Any:
+        tag = self.tag()
+        if tag == '_':
+            return None # undefined
+        if tag == '0':
+            return None
+        if tag == 'T':
+            return True
+        if tag == 'F':
+            return False
+        if tag == 'I':
+            return self.zigzag()
+        if tag == 'U':
+            return self.varint()
+        if tag == 'N':
+            return _json_number(self.double())
+        if tag == 'Z':
+            return { '$bigint': str(self.bigint()) }
+        if tag == '"':
+            return self.bytes(self.varint()).decode('latin-1')
+        if tag == 'c':
+            return self.bytes(self.varint()).decode('utf-16-le')
+        if tag == 'S':
+            return self.bytes(self.varint()).decode('utf-8')
+        if tag == '^':
+            index = self.varint()
+            if index >= len(self.objects):
+                raise V8DeserializeError(f"Bad object reference {index}")
+            return self.objects[index]
+        if tag == 'o':
+            obj = self.register({})
+            self.properties(obj, '{')
+            return obj
+        if tag == 'A':
+            length = self.varint()
+            arr = self.register([])
+            for _ in range(length):
+                if self.peek() == ord('-'): # hole
+                    self.byte()
+                    arr.append(None)
+                else:
+                    arr.append(self.value())
+            extra : Dict[str,Any] = {}
+            self.properties(extra, '$')
+            self.varint() # length again
+            return arr
+        if tag == 'a':
+            length = self.varint()
+            arr = self.register([None]*length)
+            extra = {}
+            self.properties(extra, '@')
+            self.varint()
+            for (k, v) in extra.items():
+                if k.isdigit() and int(k) < length:
+                    arr[int(k)] = v
+            return arr
+        if tag == 'D':
+            ms = self.double()
+            return self.register({ '$date': _format_date(ms) })
+        if tag in ('y', 'x'):
+            return self.register(tag == 'y')
+        if tag == 'n':
+            return self.register(_json_number(self.double()))
+        if tag == 'z':
+            return self.register({ '$bigint': str(self.bigint()) })
+        if tag == 's':
+            index = len(self.objects)
+            self.register(None)
+            self.objects[index] = self.value()
+            return self.objects[index]
+        if tag == 'R':
+            obj = self.register({})
+            obj['$regexp'] = self.value()
+            obj['flags'] = self.varint()
+            return obj
+        if tag == ';':
+            entries : List[Any] = []
+            obj = self.register({ '$map': entries })
+            while self.peek() != ord(':'):
+                entries.append([ self.value(), self.value() ])
+            self.byte()
+            self.varint()
+            return obj
+        if tag == "'":
+            items : List[Any] = []
+            obj = self.register({ '$set': items })
+            while self.peek() != ord(','):
+                items.append(self.value())
+            self.byte()
+            self.varint()
+            return obj
+        if tag == 'B':
+            buffer = self.bytes(self.varint())
+            obj = self.register({ '$bytes': base64.b64encode(buffer).decode('ascii') })
+            if self.pos < len(self.data) and self.peek() == ord('V'):
+                self.byte()
+                return self.view(buffer)
+            return obj
+        raise V8DeserializeError(f"Unsupported tag {tag!r} at offset {self.pos - 1}")
+
+    def view(self, buffer : bytes) -> Any:
+        subtag = chr(self.byte())
+        offset = self.varint()
+        length = self.varint()
+        if self.version >= 14:
+            self.varint() # flags
+        return self.register({ '$view': subtag, '$bytes': base64.b64encode(buffer[offset:offset+length]).decode('ascii') })
+
+    def bigint(self) -> int:
+        bitfield = self.varint()
+        negative = bitfield & 1
+        digits = self.bytes(bitfield >> 1)
+        value = int.from_bytes(digits, 'little')
+        return -value if negative else value
+
+    def properties(self, obj : Dict[str,Any], end_tag : str):
+        while self.peek() != ord(end_tag):
+            key = self.value()
+            obj[str(key)] = self.value()
+        self.byte()
+        self.varint() # number of properties
+
+def _json_number(x : float) -> Any:
+    if math.isnan(x) or math.isinf(x):
+        return { '$number': str(x) }
+    return int(x) if x.is_integer() and abs(x) < 2**53 else x
+
+def _format_date(ms : float) -> str:
+    if math.isnan(ms):
+        return "Invalid Date"
+    return (datetime.datetime(1970, 1, 1, tzinfo = datetime.timezone.utc) + datetime.timedelta(milliseconds = ms)).isoformat()
+
+def deserialize_v8(data : bytes) -> Any:
+    reader = _Reader(data)
+    if data[:1] == b'\xff':
+        reader.byte()
+        reader.version = reader.varint()
+    return reader.value()
@@ -0,0 +1,104 @@
+import json, subprocess, sys, threading, time
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Optional
+
+from live_tail.rolling_stats import EventTimeClock, RollingStats, format_summary
+from live_tail.tail_events import parse_tail_event, read_json_stream
+
+# Live latency and error rates from production, while it's happening:
+# runs 'wrangler tail --format json' and keeps rolling p50/p95/p99 wall time (and CPU time, where the runtime reports it),
+# error rates and recent exceptions per route and per messageType, over the last --window_s seconds.
+#   python3 scripts/tail_stats.py --env prod
+#   python3 scripts/tail_stats.py --env prod --http_port 9400     # also serve the numbers at http://127.0.0.1:9400/stats
+#   python3 scripts/tail_stats.py --input saved_tail_output.json   # summarize saved 'wrangler tail --format json' output
+# Under heavy load, wrangler tail samples events (see --sampling_rate), so counts are approximate but percentiles hold up.
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--env", type = str, required = False, default = "prod")
+    parser.add_argument("--input", type = str, required = False, default = None, help = "Read tail output from this file ('-' for stdin) instead of running wrangler tail")
+    parser.add_argument("--window_s", type = float, required = False, default = 300.0)
+    parser.add_argument("--interval_s", type = float, required = False, default = 10.0)
+    parser.add_argument("--refresh_s", type = float, required = False, default = 2.0)
+    parser.add_argument("--sampling_rate", type = float, required = False, default = None, help = "Passed on to wrangler tail")
+    parser.add_argument("--http_port", type = int, required = False, default = None)
+    return parser.parse_args()
+
+def start_wrangler_tail(args) -> subprocess.Popen:
+    argv = [ 'npx', 'wrangler', 'tail', '--env', args.env, '--format', 'json' ]
+    if args.sampling_rate is not None:
+        argv += [ '--sampling-rate', str(args.sampling_rate) ]
+    return subprocess.Popen(argv, stdout = subprocess.PIPE, stdin = subprocess.DEVNULL, text = True, bufsize = 1, encoding = "utf-8", errors = "replace")
+
+def consume(lines : Iterable[str], stats : RollingStats, event_clock : Optional[EventTimeClock] = None):
+    for event in read_json_stream(lines):
+        tail_event = parse_tail_event(event)
+        if event_clock is not None:
+            event_clock.advance(tail_event)
+        stats.record(tail_event)
+
+def make_snapshot(stats : RollingStats) -> Dict[str,Any]:
+    return {
+        'window_s': stats.window_s,
+        'total_events': stats.total_events,
+        'summary': stats.summarize(),
+        'recent_exceptions': [ { 'exception': exception, 'count': count } for (exception, count) in stats.recent_exceptions() ]
+    }
+
+def render(stats : RollingStats) -> str:
+    return format_summary(stats.summarize(), stats.recent_exceptions(), title = f"last {stats.window_s:.0f}s ({stats.total_events} events)")
+
+def serve_stats(stats : RollingStats, port : int) -> ThreadingHTTPServer:
+
+    class StatsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/stats"):
+                body, content_type = json.dumps(make_snapshot(stats)).encode("utf-8"), "application/json"
+            else:
+                body, content_type = (render(stats) + "\n").encode("utf-8"), "text/plain; charset=utf-8"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StatsRequestHandler)
+    threading.Thread(target = server.serve_forever, daemon = True, name = "tail-stats-http").start()
+    print(f"Serving stats at http://127.0.0.1:{port}/stats")
+    return server
+
+if __name__ == "__main__":
+    args = parse_args()
+    process, event_clock = None, None
+    if args.input is None:
+        stats = RollingStats(window_s = args.window_s, interval_s = args.interval_s)
+        process = start_wrangler_tail(args)
+        source = process.stdout
+    else:
+        # saved output is read much faster than it happened, so the windows follow the events' own timestamps
+        event_clock = EventTimeClock()
+        stats = RollingStats(window_s = args.window_s, interval_s = args.interval_s, clock = event_clock)
+        source = sys.stdin if args.input == "-" else open(args.input, "r", encoding = "utf-8")
+    reader = threading.Thread(target = consume, args = (source, stats, event_clock), daemon = True, name = "tail-reader")
+    reader.start()
+    if args.http_port is not None:
+        serve_stats(stats, args.http_port)
+    redraw = sys.stdout.isatty()
+    try:
+        while reader.is_alive():
+            reader.join(timeout = args.refresh_s)
+            if redraw:
+                # clear the screen and draw the table in place
+                sys.stdout.write("\033[2J\033[H" + render(stats) + "\n")
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if process is not None:
+            process.terminate()
+    print("")
+    print(render(stats))
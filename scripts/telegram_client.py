@@ -0,0 +1,165 @@
+import asyncio, json, random, threading, time
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+# One pooled client per bot url for calling the Telegram Bot API from scripts.
+#   - connections are kept alive and reused between calls
+#   - each method gets its own timeout (see METHOD_TIMEOUTS_S)
+#   - a 429 waits for the 'retry_after' Telegram sends back, 5xx and connection errors back off exponentially, anything else raises
+# TelegramClient is for plain scripts, AsyncTelegramClient is the same thing for asyncio code.
+
+DEFAULT_TIMEOUT_S = 10.0
+METHOD_TIMEOUTS_S = {
+    'getMe': 5.0,
+    'getWebhookInfo': 5.0,
+    'logOut': 15.0,
+    'close': 15.0,
+    'setWebhook': 15.0,
+    'deleteWebhook': 15.0,
+    'getUpdates': 60.0
+}
+
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE_S = 0.5
+MAX_BACKOFF_S = 30.0
+
+class TelegramAPIError(Exception):
+    def __init__(self, method : str, status : int, error_code : Optional[int], description : str, retry_after : Optional[float] = None):
+        super().__init__(f"{method} failed ({status}): {description}")
+        self.method = method
+        self.status = status
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+def method_timeout_s(method : str) -> float:
+    return METHOD_TIMEOUTS_S.get(method, DEFAULT_TIMEOUT_S)
+
+def backoff_s(attempt : int) -> float:
+    # full jitter, so that concurrent callers don't retry in lockstep
+    return random.uniform(0, min(MAX_BACKOFF_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+def _parse_response(method : str, status : int, body : bytes) -> Any:
+    try:
+        parsed = json.loads(body.decode('utf-8'))
+    except ValueError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        raise TelegramAPIError(method, status, None, body.decode('utf-8', errors = 'replace')[:500] or f"HTTP {status}")
+    if status < 400 and parsed.get('ok', False):
+        return parsed.get('result')
+    retry_after = (parsed.get('parameters') or {}).get('retry_after')
+    raise TelegramAPIError(method, status, parsed.get('error_code'), parsed.get('description', ''), retry_after)
+
+def _retry_delay_s(error : TelegramAPIError, attempt : int) -> Optional[float]:
+    # None means: don't retry
+    if error.status == 429:
+        return float(error.retry_after) if error.retry_after is not None else backoff_s(attempt)
+    if error.status >= 500:
+        return backoff_s(attempt)
+    return None
+
+class TelegramClient:
+
+    def __init__(self, bot_url : str, max_retries : int = DEFAULT_MAX_RETRIES, pool_maxsize : int = 16):
+        self.bot_url = bot_url.rstrip("/")
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def call(self, method : str, params : Optional[Dict[str,Any]] = None, timeout_s : Optional[float] = None, max_retries : Optional[int] = None, files : Optional[Dict[str,Any]] = None) -> Any:
+        # files (ex: { 'photo': (filename, bytes) }) sends the call as multipart/form-data instead of JSON
+        url = f"{self.bot_url}/{method}"
+        timeout_s = timeout_s if timeout_s is not None else method_timeout_s(method)
+        max_retries = max_retries if max_retries is not None else self.max_retries
+        attempt = 0
+        while True:
+            try:
+                if files is not None:
+                    response = self.session.post(url, data = params or {}, files = files, timeout = timeout_s)
+                else:
+                    response = self.session.post(url, json = params or {}, timeout = timeout_s)
+                return _parse_response(method, response.status_code, response.content)
+            except TelegramAPIError as e:
+                delay_s = _retry_delay_s(e, attempt)
+                if delay_s is None or attempt >= max_retries:
+                    raise
+                print(f"{method}: {e.description} (HTTP {e.status}), retrying in {delay_s:.1f}s")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    raise
+                delay_s = backoff_s(attempt)
+                print(f"{method}: {type(e).__name__}, retrying in {delay_s:.1f}s")
+            time.sleep(delay_s)
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class AsyncTelegramClient:
+
+    def __init__(self, bot_url : str, max_retries : int = DEFAULT_MAX_RETRIES, max_connections : int = 16):
+        self.bot_url = bot_url.rstrip("/")
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self._session = None
+
+    async def _get_session(self):
+        import aiohttp # pip install aiohttp
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector = aiohttp.TCPConnector(limit = self.max_connections))
+        return self._session
+
+    async def call(self, method : str, params : Optional[Dict[str,Any]] = None, timeout_s : Optional[float] = None, max_retries : Optional[int] = None) -> Any:
+        import aiohttp # pip install aiohttp
+        session = await self._get_session()
+        url = f"{self.bot_url}/{method}"
+        timeout = aiohttp.ClientTimeout(total = timeout_s if timeout_s is not None else method_timeout_s(method))
+        max_retries = max_retries if max_retries is not None else self.max_retries
+        attempt = 0
+        while True:
+            try:
+                async with session.post(url, json = params or {}, timeout = timeout) as response:
+                    return _parse_response(method, response.status, await response.read())
+            except TelegramAPIError as e:
+                delay_s = _retry_delay_s(e, attempt)
+                if delay_s is None or attempt >= max_retries:
+                    raise
+                print(f"{method}: {e.description} (HTTP {e.status}), retrying in {delay_s:.1f}s")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= max_retries:
+                    raise
+                delay_s = backoff_s(attempt)
+                print(f"{method}: {type(e).__name__}, retrying in {delay_s:.1f}s")
+            await asyncio.sleep(delay_s)
+            attempt += 1
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+_clients : Dict[str,TelegramClient] = {}
+_clients_lock = threading.Lock()
+
+def get_telegram_client(bot_url : str) -> TelegramClient:
+    # shared per bot url, so every call in a run reuses the same connections
+    with _clients_lock:
+        if bot_url not in _clients:
+            _clients[bot_url] = TelegramClient(bot_url)
+        return _clients[bot_url]
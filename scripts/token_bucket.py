@@ -0,0 +1,52 @@
+import asyncio, threading, time
+from typing import Callable
+
+# A token bucket: 'rate' tokens per second, holding at most 'burst'.
+# Used to model Telegram's rate limits in the fake server, and to stay under them when sending for real.
+
+class TokenBucket:
+
+    def __init__(self, rate : float, burst : float, clock : Callable[[],float] = time.monotonic):
+        if rate <= 0 or burst <= 0:
+            raise Exception(f"rate and burst must be positive (rate: {rate}, burst: {burst})")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.last_refill = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def wait_time(self, tokens : float = 1.0) -> float:
+        # seconds until 'tokens' are available (0.0 if they already are). Doesn't take anything.
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def consume(self, tokens : float = 1.0):
+        # takes tokens whether or not they're there, so the bucket can go into debt
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+
+    def pause(self, seconds : float):
+        # puts the bucket at least 'seconds' of refill into debt. Unlike consume, pausing again for the same window doesn't add up
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def try_acquire(self, tokens : float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    async def acquire(self, tokens : float = 1.0):
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(max(0.001, self.wait_time(tokens)))
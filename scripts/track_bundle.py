@@ -0,0 +1,57 @@
+import sys
+from argparse import ArgumentParser
+
+from bench import get_git_commit
+from deployment.bundle_size import *
+
+# Builds the worker bundle (wrangler deploy --dry-run), reports its size by module and package,
+# optionally times cold 'wrangler dev' starts, and compares everything with the last entry in the history file.
+# Exits with 1 when a threshold is crossed, so it can gate a deploy or run in CI.
+#   python3 scripts/track_bundle.py                       # measure, compare and record
+#   python3 scripts/track_bundle.py --cold_start_runs 3   # ...and time 3 cold starts (stop the dev box first)
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--env", type = str, required = False, default = "dev")
+    parser.add_argument("--outdir", type = str, required = False, default = DEFAULT_OUTDIR)
+    parser.add_argument("--history", type = str, required = False, default = DEFAULT_HISTORY_FILE)
+    parser.add_argument("--skip_build", action = "store_true", help = "Measure what's already in --outdir")
+    parser.add_argument("--cold_start_runs", type = int, required = False, default = 0)
+    parser.add_argument("--warn_growth_pct", type = float, required = False, default = 2.0)
+    parser.add_argument("--fail_growth_pct", type = float, required = False, default = 10.0)
+    parser.add_argument("--max_new_modules", type = int, required = False, default = 10)
+    parser.add_argument("--fail_on_new_packages", action = "store_true")
+    parser.add_argument("--max_gzip_kb", type = int, required = False, default = None)
+    parser.add_argument("--top", type = int, required = False, default = 15)
+    parser.add_argument("--no_record", action = "store_true", help = "Don't append this measurement to --history")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    script_filepath = find_bundle_script(args.outdir) if args.skip_build else build_bundle(args.env, args.outdir)
+    measurement = measure_bundle(script_filepath)
+    cold_start = None
+    if args.cold_start_runs > 0:
+        from dev.cold_start import time_cold_starts
+        cold_start = time_cold_starts(args.cold_start_runs)
+    entry = make_history_entry(args.env, get_git_commit(), measurement, cold_start)
+    baseline = latest_entry(read_history(args.history), args.env)
+    print_bundle_report(entry, baseline, top = args.top)
+    warnings, failures = check_for_regressions(baseline,
+                                               entry,
+                                               warn_growth_pct = args.warn_growth_pct,
+                                               fail_growth_pct = args.fail_growth_pct,
+                                               max_new_modules = args.max_new_modules,
+                                               fail_on_new_packages = args.fail_on_new_packages,
+                                               max_gzip_bytes = None if args.max_gzip_kb is None else 1024 * args.max_gzip_kb)
+    for warning in warnings:
+        print(f"WARNING: {warning}")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if not args.no_record:
+        # a failed measurement is kept for the record, but isn't used as the baseline for the next run
+        entry['failed'] = len(failures) > 0
+        append_history(args.history, entry)
+        print(f"Recorded in {args.history}")
+    if failures:
+        sys.exit(1)
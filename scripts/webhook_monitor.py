@@ -0,0 +1,91 @@
+import json, time
+from argparse import ArgumentParser
+
+from deployment.bot_configure_webhook import DEFAULT_WEBHOOK_MAX_CONNECTIONS, make_set_webhook_params
+from deployment.webhook_backlog import BacklogTracker, format_backlog_line, print_tuning_report, recommend_max_connections, run_tuning_step, sample_webhook_info
+from dev.local_dev_common import *
+from dev.webhook_load import generate_update_mix
+from dev.worker_sources import read_canned_questions, read_commands, read_menu_codes
+from telegram_client import get_telegram_client
+from wrangler_common import get_secret, make_telegram_bot_url
+
+# The backlog of updates Telegram is holding for our webhook.
+#   monitor: polls getWebhookInfo and prints the pending update count, how fast it's draining, when it'll be empty, and any new webhook errors.
+#       python3 scripts/webhook_monitor.py monitor --env prod
+#   tune: with the dev box running against the fake telegram server, sends the same burst of updates at each --max_connections
+#       and recommends the value that drains it fastest without raising the error rate.  Then pass it to deploy.py --webhook_max_connections.
+#       python3 scripts/start_dev_box.py --fake_telegram_server true
+#       python3 scripts/webhook_monitor.py tune --max_connections 5 10 20 40 60 80 100
+# Start the fake server with --emulate (start_fake_telegram_server.py) to tune against Telegram's latency and rate limits.
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("mode", type = str, choices = [ "monitor", "tune" ])
+    parser.add_argument("--env", type = str, required = False, default = None, help = "Defaults to prod for monitor, dev for tune")
+    parser.add_argument("--bot_url", type = str, required = False, default = None, help = "Overrides the Bot API url for --env")
+    parser.add_argument("--poll_s", type = float, required = False, default = None, help = "Defaults to 5s for monitor, 0.25s for tune")
+    # monitor
+    parser.add_argument("--window_s", type = float, required = False, default = 60.0, help = "How far back the drain rate is estimated over")
+    parser.add_argument("--output", type = str, required = False, default = None, help = "Also append every sample to this .jsonl file")
+    # tune
+    parser.add_argument("--max_connections", type = int, nargs = "+", required = False, default = [ 5, 10, 20, 40, 60, 80, 100 ])
+    parser.add_argument("--burst", type = int, required = False, default = 2000, help = "Updates sent at each step")
+    parser.add_argument("--users", type = int, required = False, default = 200)
+    parser.add_argument("--seed", type = int, required = False, default = 1)
+    parser.add_argument("--timeout_s", type = float, required = False, default = 300.0)
+    parser.add_argument("--fake_server_url", type = str, required = False, default = LOCAL_FAKE_TELEGRAM_SERVER_ADDRESS)
+    parser.add_argument("--webhook_url", type = str, required = False, default = LOCAL_CLOUDFLARE_WORKER_URL)
+    parser.add_argument("--restore_max_connections", type = int, required = False, default = DEFAULT_WEBHOOK_MAX_CONNECTIONS, help = "Set once tuning is done")
+    return parser.parse_args()
+
+def monitor(args, client):
+    tracker = BacklogTracker(window_s = args.window_s)
+    poll_s = args.poll_s or 5.0
+    output = open(args.output, "a", encoding = "utf-8") if args.output is not None else None
+    try:
+        while True:
+            sample = sample_webhook_info(client)
+            new_error = tracker.add(sample)
+            print(format_backlog_line(tracker, new_error), flush = True)
+            if output is not None:
+                output.write(json.dumps({ 'timestamp': time.time(), **sample.__dict__, 'net_drain_per_s': tracker.net_drain_per_s() }) + "\n")
+                output.flush()
+            time.sleep(poll_s)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not None:
+            output.close()
+    print("")
+    print(f"{tracker.sample_count} samples, peak backlog {tracker.peak_pending}, {len(tracker.errors)} webhook errors seen")
+    for (error_date, error_message) in tracker.errors[-10:]:
+        print(f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(error_date))}: {error_message}")
+
+def tune(args, client):
+    secret_token = get_secret("SECRET__TELEGRAM_BOT_WEBHOOK_SECRET_TOKEN", args.env)
+    steps = []
+    try:
+        for (i, max_connections) in enumerate(args.max_connections):
+            updates = generate_update_mix(seed = args.seed + i,
+                                          count = args.burst,
+                                          num_users = args.users,
+                                          bot_id = FAKE_TELEGRAM_BOT_ID,
+                                          menu_codes = read_menu_codes(),
+                                          canned_questions = read_canned_questions(),
+                                          commands = read_commands())
+            print(f"max_connections {max_connections}: sending {len(updates)} updates")
+            step = run_tuning_step(client, args.fake_server_url, args.webhook_url, secret_token, max_connections, updates, args.poll_s or 0.25, args.timeout_s)
+            print(f"  drained in {step.drain_s}s ({step.drain_rate_per_s}/s), error rate {step.error_rate():.2%}" + (" - TIMED OUT" if step.timed_out else ""))
+            steps.append(step)
+    finally:
+        client.call('setWebhook', make_set_webhook_params(args.webhook_url, secret_token, args.restore_max_connections))
+    print_tuning_report(steps, recommend_max_connections(steps))
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.env is None:
+        args.env = "prod" if args.mode == "monitor" else "dev"
+    if args.mode == "monitor":
+        monitor(args, get_telegram_client(args.bot_url or make_telegram_bot_url(args.env)))
+    else:
+        tune(args, get_telegram_client(args.bot_url or f"{args.fake_server_url}/botX"))
@@ -1,7 +1,8 @@
-import json, subprocess, requests
+import json, os, subprocess, requests, threading
 import tomli
-from typing import Dict, Union
+from typing import Any, Dict, Optional, Tuple, Union
 from urllib.parse import urljoin
+from telegram_client import TelegramClient, get_telegram_client
 
 
 LOGIN_COMMAND                         = "npx wrangler login"
@@ -9,6 +10,116 @@ LOGOUT_COMMAND                        = "npx wrangler logout"
 WHOAMI_COMMAND                        = "npx wrangler whoami"
 FETCH_KV_COMMAND                      = "npx wrangler kv:key --namespace-id={namespace_id} get {key}"
 LIST_NAMESPACE_COMMAND                = "npx wrangler kv:namespace list"
+WRANGLER_TOML_FILEPATH                = "./wrangler.toml"
+DEV_VARS_FILEPATH                     = ".dev.vars.{env}"
+
+class CachedTomlFile:
+    # Parses the file once, and again only if its mtime or size changes
+    def __init__(self, filepath : str):
+        self.filepath = filepath
+        self._lock = threading.Lock()
+        self._stamp : Union[Tuple[int,int],None] = None
+        self._parsed : Dict[str,Any] = {}
+
+    def load(self) -> Dict[str,Any]:
+        stat = os.stat(self.filepath)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._stamp:
+                self._parsed = _parse_toml_file(self.filepath)
+                self._stamp = stamp
+            return self._parsed
+
+class EnvironmentConfig:
+    # Access to wrangler.toml and .dev.vars.{env} for one environment.  str_var/int_var/bool_var and secret check the value's type,
+    # and raise naming the key if it's missing or the wrong type
+    def __init__(self, env : str, wrangler_toml : CachedTomlFile, dev_vars : CachedTomlFile):
+        self.env = env
+        self._wrangler_toml = wrangler_toml
+        self._dev_vars = dev_vars
+
+    def toml(self) -> Dict[str,Any]:
+        return self._wrangler_toml.load()
+
+    def toml_property(self, property_path : str) -> Any:
+        obj : Any = self.toml()
+        path_so_far = []
+        for token in property_path.split("."):
+            path_so_far.append(token)
+            if not isinstance(obj, dict) or obj.get(token) is None:
+                raise Exception(f"wrangler.toml: {'.'.join(path_so_far)} was None")
+            obj = obj[token]
+        return obj
+
+    # copies, so callers can't change the cached file
+    def vars(self) -> Dict[str,Any]:
+        return dict(self.toml_property(f"env.{self.env}.vars"))
+
+    def var(self, key : str) -> Any:
+        # as written in wrangler.toml (usually a string, but TOML allows ints and bools too)
+        value = self.vars().get(key)
+        if value is None or (isinstance(value, str) and is_empty_or_none(value)):
+            raise Exception(f"'{self.env}': '{key}' not found")
+        return value
+
+    def str_var(self, key : str) -> str:
+        value = self.var(key)
+        if not isinstance(value, str):
+            raise Exception(f"'{self.env}': '{key}' should be a string, but is {type(value).__name__}: {value!r}")
+        return value
+
+    def int_var(self, key : str) -> int:
+        # the worker only sees strings, so "123" is as good as 123
+        value = self.var(key)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+            return int(value.strip())
+        raise Exception(f"'{self.env}': '{key}' should be an integer, but is {type(value).__name__}: {value!r}")
+
+    def bool_var(self, key : str) -> bool:
+        value = self.var(key)
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+        raise Exception(f"'{self.env}': '{key}' should be true or false, but is {type(value).__name__}: {value!r}")
+
+    def secrets(self) -> Dict[str,Any]:
+        return dict(self._dev_vars.load())
+
+    def secret(self, key : str) -> str:
+        secret = self.secrets().get(key)
+        if secret is None:
+            raise Exception(f"'{self.env}': '{key}' not found")
+        if not isinstance(secret, str):
+            raise Exception(f"'{self.env}': '{key}' in .dev.vars.{self.env} should be a string (quote it), but is {type(secret).__name__}")
+        if is_empty_or_none(secret):
+            raise Exception(f"'{self.env}': '{key}' not found")
+        return secret
+
+    def worker_name(self) -> str:
+        # wrangler uses the environment's name, if it has one
+        return self.toml().get("env", {}).get(self.env, {}).get("name") or self.toml_property("name")
+
+    def telegram_bot_url(self) -> str:
+        return f"{self.str_var('TELEGRAM_BOT_SERVER_URL')}/bot{self.secret('SECRET__TELEGRAM_BOT_TOKEN')}"
+
+    def telegram_api_method_url(self, method : str) -> str:
+        return f"{self.telegram_bot_url()}/{method}"
+
+_cached_toml_files : Dict[str,CachedTomlFile] = {}
+_cached_toml_files_lock = threading.Lock()
+
+def _get_cached_toml_file(filepath : str) -> CachedTomlFile:
+    filepath = os.path.abspath(filepath)
+    with _cached_toml_files_lock:
+        if filepath not in _cached_toml_files:
+            _cached_toml_files[filepath] = CachedTomlFile(filepath)
+        return _cached_toml_files[filepath]
+
+def get_config(env : str) -> EnvironmentConfig:
+    return EnvironmentConfig(env, _get_cached_toml_file(WRANGLER_TOML_FILEPATH), _get_cached_toml_file(DEV_VARS_FILEPATH.format(env = env)))
 
 def do_wrangler_login():
     subprocess.run(LOGIN_COMMAND,                    
@@ -26,8 +137,7 @@ def wrangler_whoami():
                    shell = True)
     
 def print_wrangler_environment_variables(env : str):
-    parsed_toml = _parse_toml_file("./wrangler.toml")
-    environment_variables = parsed_toml["env"][env]["vars"]
+    environment_variables = get_config(env).vars()
     max_key_length = max(map(len,environment_variables))
     print("")
     print(f"===ENVIRONMENT VARIABLES for '{env}'===")
@@ -44,15 +154,10 @@ def is_empty_or_none(string : Union[str,None]):
     return string is None or string.strip() == ''
 
 def get_secrets(env : str) -> Dict[str,str]:
-    with open(f".dev.vars.{env}", "rb") as f:
-        return tomli.load(f)
+    return get_config(env).secrets()
     
 def get_secret(key : str, env : str):
-    toml_vars = get_secrets(env)
-    secret = toml_vars.get(key)
-    if is_empty_or_none(secret):
-        raise Exception(f"'{env}': '{key}' not found")
-    return secret
+    return get_config(env).secret(key)
 
 
 def determine_workers_url(env : str, test = True):
@@ -71,46 +176,32 @@ def _test_workers_url(workers_url : str, env : str):
         raise Exception(f"Workers URL {workers_url} doesn't work")
 
 def make_telegram_api_method_url(method : str, env : str):
-    url = make_telegram_bot_url(env)
-    return f"{url}/{method}"
+    return get_config(env).telegram_api_method_url(method)
 
 def make_telegram_bot_url(env : str):
-    bot_token = get_secret("SECRET__TELEGRAM_BOT_TOKEN", env)
-    telegram_url = get_environment_variable("TELEGRAM_BOT_SERVER_URL", env)
-    return f"{telegram_url}/bot{bot_token}"
+    return get_config(env).telegram_bot_url()
+
+def get_env_telegram_client(env : str) -> TelegramClient:
+    return get_telegram_client(make_telegram_bot_url(env))
 
 def get_wrangler_toml_property(property_path : str, env : str):
-    path_tokens = property_path.split(".")
-    parsed_toml = _parse_toml_file("./wrangler.toml")
-    obj = parsed_toml
-    pathSoFar = ""
-    for token in path_tokens:
-        pathSoFar += token
-        obj = obj.get(token)
-        if obj is None:
-            raise Exception("{pathSoFar} was None")
-    return obj
+    return get_config(env).toml_property(property_path)
 
 def get_environment_variables(env : str):
-    parsed_toml = _parse_toml_file("./wrangler.toml")
-    return parsed_toml["env"][env]["vars"]
+    return get_config(env).vars()
 
 def get_worker_name(env : str):
-    parsed_toml = _parse_toml_file("./wrangler.toml")
-    return parsed_toml["name"]
+    return get_config(env).worker_name()
 
 def _parse_toml_file(filepath : str):
     with open(filepath, "rb") as f:
         return tomli.load(f)
 
-def get_environment_variable(key : str, env : str):
-    env_vars = get_environment_variables(env)
-    value = env_vars.get(key)
-    if is_empty_or_none(value):
-        raise Exception(f"'{env}': '{key}' not found")
-    return value
+def get_environment_variable(key : str, env : str) -> str:
+    return get_config(env).str_var(key)
 
 def get_KV_from_cloudflare(namespace_id, key):
+    # one key at a time: for more than a handful of keys, use export_state.py kv
     value = subprocess.run(FETCH_KV_COMMAND.format(key=key, namespace_id=namespace_id), 
                      check = True, 
                      shell = True,
@@ -118,16 +209,26 @@ def get_KV_from_cloudflare(namespace_id, key):
                      text = True).stdout
     return value
 
+# namespaces don't come and go during a run, so they're listed at most once
+_namespaces_by_title : Optional[Dict[str,Any]] = None
+_namespaces_lock = threading.Lock()
+
+def list_namespaces() -> Dict[str,Any]:
+    global _namespaces_by_title
+    with _namespaces_lock:
+        if _namespaces_by_title is None:
+            result = subprocess.run(LIST_NAMESPACE_COMMAND, 
+                           check = True, 
+                           shell = True,
+                           capture_output = True,
+                           text = True)
+            if result.returncode != 0:
+                raise Exception("Nonzero returncode for LIST_NAMESPACE_COMMAND")
+            _namespaces_by_title = { namespace["title"]:  namespace for namespace in json.loads(result.stdout) }
+        return _namespaces_by_title
+
 def get_namespace_id(env):
-    result = subprocess.run(LIST_NAMESPACE_COMMAND, 
-                   check = True, 
-                   shell = True,
-                   capture_output = True,
-                   text = True)
-    if result.returncode != 0:
-        raise Exception("Nonzero returncode for LIST_NAMESPACE_COMMAND")
-    namespaces = json.loads(result.stdout)
-    namespaces = { namespace["title"]:  namespace for namespace in namespaces }
+    namespaces = list_namespaces()
     if env not in namespaces:
         raise Exception(f"No namespace called {env}")
     return namespaces[env]["id"]
@@ -3,7 +3,6 @@ import { makeFakeFailedRequestResponse, makeJSONRequest, makeSuccessResponse } f
 import { logError } from "../logging";
 import { MenuCode } from "../menus";
 import { CallbackData } from "../menus/callback_data";
-import { sleep } from "../util";
 import { CallbackButton } from "./callback_button";
 import { subInEmojis } from "./emojis";
 
@@ -35,6 +34,9 @@ export interface SuccessfulTgMessageSentInfo {
 
 export interface FailedTgMessageSentInfo {
     success : false
+    // from Telegram's error response, when there was one (retryAfterS comes with a 429)
+    errorCode ?: number
+    retryAfterS ?: number
 }
 
 export type TgMessageSentInfo = FailedTgMessageSentInfo | SuccessfulTgMessageSentInfo
@@ -57,24 +59,13 @@ export function escapeTGText(text : string, parseMode : 'MarkdownV2'|'HTML') : s
     return text;
 }
 
+/* Questions that time out are deleted by the user's UserDO (see scheduleMessageDeletion), not by this invocation */
 export async function sendQuestionToTG(chatID : number,
     question: string,
-    context : FetchEvent,
     env: Env,
-    parseMode : 'HTML'|'MarkdownV2' = 'HTML',
-    timeout_ms ?: number) : Promise<TgMessageSentInfo> {
+    parseMode : 'HTML'|'MarkdownV2' = 'HTML') : Promise<TgMessageSentInfo> {
     const request = makeTelegramSendQuestionRequest(chatID, question, env, parseMode);
-    return await transformToTGMessageSentInfo(fetch(request)).then(async result => {
-        if (result.success) {
-            if (timeout_ms != null && timeout_ms > 0) {
-                // deliberate lack of 'await' here.
-                context.waitUntil(sleep(timeout_ms).then(async () => {
-                    await deleteTGMessage(result.messageID, chatID, env);
-                }));
-            }
-        }
-        return result;
-    });
+    return await transformToTGMessageSentInfo(fetch(request));
 }
 
 function makeTelegramSendQuestionRequest(chatID : number, question : string, env : Env, parseMode : 'HTML'|'MarkdownV2') {
@@ -107,7 +98,11 @@ async function transformToTGMessageSentInfo(response : Promise<Response>) : Prom
         else {
             const responseDescription = (await response.json().catch(r => null));
             logError("Failed to send TG message: ", responseDescription);
-            const failure : FailedTgMessageSentInfo = { success: false };
+            const failure : FailedTgMessageSentInfo = {
+                success: false,
+                errorCode: responseDescription?.error_code ?? response.status,
+                retryAfterS: responseDescription?.parameters?.retry_after
+            };
             return failure;
         }
     }).catch(() => {
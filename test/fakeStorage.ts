@@ -7,7 +7,11 @@ export class FakeDurableObjectStorage {
     list() {
         return this.entries;
     }
-    async put(entries : Record<string,any>) {
+    async put(entries : Record<string,any>|string, value ?: any) {
+        if (typeof entries === 'string') {
+            // single key form, as used by ChangeTrackedValue
+            entries = { [entries]: value };
+        }
         this.puts = entries;
         for (const key of Object.keys(entries)) {
             this.entries.set(key, entries[key]);
@@ -0,0 +1,79 @@
+import { DurableObjectStorage } from "@cloudflare/workers-types";
+import { InboxTracker } from "../durable_objects/user/trackers/inbox_tracker";
+import { FakeDurableObjectStorage } from "./fakeStorage";
+
+test("enqueue_flush_is_put", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new InboxTracker();
+    tracker.enqueue("a", "alice", 1, "hi", 1000);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    expect(fakeStorage.puts).toMatchObject({ "inbox:000000000001": { messageKey: "a", from: "alice", message: "hi", attempts: 0 } });
+    expect(fakeStorage.deletes).toHaveLength(0);
+})
+
+test("head_is_oldest_message", () => {
+    const tracker = new InboxTracker();
+    tracker.enqueue("a", "alice", 1, "first", 1000);
+    tracker.enqueue("b", "bob", 2, "second", 1000);
+    expect(tracker.head()!!.message).toBe("first");
+    tracker.markDelivered(tracker.head()!!, 1000);
+    expect(tracker.head()!!.message).toBe("second");
+})
+
+test("duplicate_message_key_is_ignored", () => {
+    const tracker = new InboxTracker();
+    expect(tracker.enqueue("a", "alice", 1, "hi", 1000)).toBe(true);
+    expect(tracker.enqueue("a", "alice", 1, "hi", 1100)).toBe(false);
+    expect(tracker.size).toBe(1);
+    tracker.markDelivered(tracker.head()!!, 1200);
+    expect(tracker.enqueue("a", "alice", 1, "hi", 1300)).toBe(false);
+    expect(tracker.size).toBe(0);
+})
+
+test("sends_are_rate_limited", () => {
+    const tracker = new InboxTracker(1000);
+    tracker.enqueue("a", "alice", 1, "first", 1000);
+    tracker.enqueue("b", "alice", 1, "second", 1000);
+    expect(tracker.nextAttemptMS()).toBe(1000);
+    tracker.markDelivered(tracker.head()!!, 1000);
+    expect(tracker.nextAttemptMS()).toBe(2000);
+})
+
+test("failed_send_backs_off_at_least_retry_after", () => {
+    const tracker = new InboxTracker();
+    tracker.enqueue("a", "alice", 1, "hi", 1000);
+    expect(tracker.markFailed(tracker.head()!!, 1000, 429, 30)).toBe('retrying');
+    expect(tracker.nextAttemptMS()).toBe(31000);
+    expect(tracker.markFailed(tracker.head()!!, 31000, 500)).toBe('retrying');
+    expect(tracker.nextAttemptMS()).toBe(35000);
+})
+
+test("permanent_failure_is_dropped", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new InboxTracker();
+    tracker.enqueue("a", "alice", 1, "hi", 1000);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    expect(tracker.markFailed(tracker.head()!!, 1000, 403)).toBe('dropped');
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    expect(fakeStorage.deletes).toEqual(["inbox:000000000001"]);
+    expect(tracker.nextAttemptMS()).toBeNull();
+})
+
+test("survives_reload_from_storage", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new InboxTracker();
+    tracker.enqueue("a", "alice", 1, "first", 1000);
+    tracker.enqueue("b", "bob", 2, "second", 1000);
+    tracker.enqueue("c", "carol", 3, "third", 1000);
+    tracker.markDelivered(tracker.head()!!, 1000);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    fakeStorage.entries.set("messageDeletion:1:10", { chatID: 1, messageID: 10, deleteAtMS: 0 });
+    const reloaded = new InboxTracker();
+    reloaded.initialize(fakeStorage.list());
+    expect(reloaded.size).toBe(2);
+    expect(reloaded.head()!!.message).toBe("second");
+    expect(reloaded.enqueue("a", "alice", 1, "first", 2000)).toBe(false);
+    reloaded.enqueue("d", "dave", 4, "fourth", 2000);
+    expect(reloaded.head()!!.message).toBe("second");
+    expect([...reloaded.messages.values()].map(message => message.seq)).toContain(4);
+})
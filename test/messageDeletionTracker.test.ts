@@ -0,0 +1,66 @@
+import { DurableObjectStorage } from "@cloudflare/workers-types";
+import { MessageDeletionTracker } from "../durable_objects/user/trackers/message_deletion_tracker";
+import { FakeDurableObjectStorage } from "./fakeStorage";
+
+test("schedule_flush_is_put", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new MessageDeletionTracker();
+    tracker.schedule(1, 10, 5000);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    expect(fakeStorage.puts).toMatchObject({ "messageDeletion:1:10": { chatID: 1, messageID: 10, deleteAtMS: 5000 } });
+    expect(fakeStorage.deletes).toHaveLength(0);
+})
+
+test("nothing_scheduled_flush_is_noop", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new MessageDeletionTracker();
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    expect(Object.keys(fakeStorage.puts)).toHaveLength(0);
+    expect(fakeStorage.entries.size).toBe(0);
+})
+
+test("take_due_takes_only_due_in_order", () => {
+    const tracker = new MessageDeletionTracker();
+    tracker.schedule(1, 12, 3000);
+    tracker.schedule(1, 10, 1000);
+    tracker.schedule(1, 11, 2000);
+    tracker.schedule(1, 13, 60000);
+    const due = tracker.takeDue(2500, 500);
+    expect(due.map(deletion => deletion.messageID)).toEqual([10, 11, 12]);
+    expect(tracker.size).toBe(1);
+    expect(tracker.nextDueMS()).toBe(60000);
+})
+
+test("take_due_flush_is_delete", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new MessageDeletionTracker();
+    tracker.schedule(1, 10, 1000);
+    tracker.schedule(1, 11, 9000);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    tracker.takeDue(1000);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    expect(fakeStorage.deletes).toEqual(["messageDeletion:1:10"]);
+    expect([...fakeStorage.entries.keys()]).toEqual(["messageDeletion:1:11"]);
+})
+
+test("survives_reload_from_storage", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const tracker = new MessageDeletionTracker();
+    tracker.schedule(1, 10, 1000);
+    tracker.schedule(2, 20, 500);
+    await tracker.flushToStorage(fakeStorage as unknown as DurableObjectStorage);
+    fakeStorage.entries.set("messageID:10", "not-a-deletion");
+    const reloaded = new MessageDeletionTracker();
+    reloaded.initialize(fakeStorage.list());
+    expect(reloaded.size).toBe(2);
+    expect(reloaded.nextDueMS()).toBe(500);
+})
+
+test("reschedule_replaces_due_time", () => {
+    const tracker = new MessageDeletionTracker();
+    tracker.schedule(1, 10, 1000);
+    tracker.schedule(1, 10, 4000);
+    expect(tracker.size).toBe(1);
+    expect(tracker.takeDue(2000)).toHaveLength(0);
+    expect(tracker.nextDueMS()).toBe(4000);
+})
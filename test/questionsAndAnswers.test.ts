@@ -0,0 +1,24 @@
+import { findByQuestion, listQuestions, normalizeQuestion } from "../questions_and_answers";
+
+test("find_by_question_matches_every_listed_question", () => {
+    for (const question of listQuestions()) {
+        expect(findByQuestion(question)?.question).toEqual(question);
+    }
+})
+
+test("find_by_question_ignores_case_and_punctuation", () => {
+    expect(normalizeQuestion("  CAN I partner with Solana?! ")).toEqual("can i partner with solana");
+    expect(findByQuestion("CAN I partner with Solana")?.code).toEqual("CAN_I_PARTNER");
+})
+
+test("find_by_question_matches_aliases_and_near_misses", () => {
+    expect(findByQuestion("I have a technical issue")?.code).toEqual("I_HAVE_TECHNICAL_ISSUE");
+    expect(findByQuestion("how can i apply for a grant")?.code).toEqual("CAN_I_APPLY_FOR_GRANT");
+})
+
+test("find_by_question_does_not_match_unrelated_messages", () => {
+    expect(findByQuestion("hi")).toBeNull();
+    expect(findByQuestion("grant")).toBeNull();
+    expect(findByQuestion("Can I partner with Ethereum?")).toBeNull();
+    expect(findByQuestion("???")).toBeNull();
+})
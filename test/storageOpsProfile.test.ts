@@ -0,0 +1,46 @@
+import { DurableObjectStorage } from "@cloudflare/workers-types";
+import { STORAGE_OPS_HEADER, attachStorageOpCounts, countStorageOps, makeCountingStorage, makeStorageOpCounts } from "../profiling";
+import { FakeDurableObjectStorage } from "./fakeStorage";
+
+test("counting_storage_counts_puts_and_deletes", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    const counts = makeStorageOpCounts();
+    const storage = makeCountingStorage(fakeStorage as unknown as DurableObjectStorage, counts);
+    await storage.put({ "a": 1, "b": "xy" });
+    await storage.delete(["a"]);
+    expect(fakeStorage.entries.get("b")).toEqual("xy");
+    expect(fakeStorage.entries.has("a")).toBe(false);
+    expect(counts).toMatchObject({ puts: 1, putKeys: 2, putBytes: "a".length + "1".length + "b".length + '"xy"'.length, deletes: 1, deleteKeys: 1 });
+})
+
+test("counting_storage_counts_listed_keys", async () => {
+    const fakeStorage = new FakeDurableObjectStorage();
+    fakeStorage.entries.set("a", 1);
+    fakeStorage.entries.set("b", 2);
+    const counts = makeStorageOpCounts();
+    const storage = makeCountingStorage(fakeStorage as unknown as DurableObjectStorage, counts);
+    const entries = await storage.list();
+    expect(entries.size).toEqual(2);
+    expect(counts).toMatchObject({ lists: 1, listedKeys: 2 });
+})
+
+test("attach_storage_op_counts_resets_counts", async () => {
+    const counts = makeStorageOpCounts();
+    counts.puts = 3;
+    const response = attachStorageOpCounts(new Response("{}"), counts);
+    expect(JSON.parse(response.headers.get(STORAGE_OPS_HEADER) || '{}')).toMatchObject({ puts: 3 });
+    expect(counts.puts).toEqual(0);
+})
+
+test("count_storage_ops_is_per_request", async () => {
+    const storage = makeCountingStorage(new FakeDurableObjectStorage() as unknown as DurableObjectStorage);
+    const handle = (keys : string[]) => countStorageOps(async () => {
+        for (const key of keys) {
+            await storage.put({ [key]: 1 });
+        }
+        return new Response("{}");
+    });
+    const [a, b] = await Promise.all([handle(["a1", "a2", "a3"]), handle(["b1"])]);
+    expect(JSON.parse(a.headers.get(STORAGE_OPS_HEADER) || '{}')).toMatchObject({ puts: 3, putKeys: 3 });
+    expect(JSON.parse(b.headers.get(STORAGE_OPS_HEADER) || '{}')).toMatchObject({ puts: 1, putKeys: 1 });
+})